@@ -0,0 +1,92 @@
+import logging
+import time
+from logging.config import fileConfig
+
+from sqlalchemy import engine_from_config
+from sqlalchemy import pool
+from sqlalchemy import text
+
+from alembic import context
+
+from config.database import DATABASE_URL
+from models.models import Base
+
+config = context.config
+
+# Clave del advisory lock que serializa las migraciones entre procesos (por
+# ejemplo, varios contenedores que arrancan a la vez con scripts/migrar.py)
+CLAVE_BLOQUEO = 7_270_004
+
+# La URL de la base de datos sale de DATABASE_URL (igual que la aplicación)
+config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Genera el SQL de las migraciones sin conectarse a la base de datos"""
+    url = config.get_main_option("sqlalchemy.url")
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def esperar_bloqueo(connection) -> None:
+    """
+    Obtiene el advisory lock de las migraciones reintentando con
+    pg_try_advisory_lock fuera de transacción: esperar con pg_advisory_lock
+    dejaría abierta una transacción por la que CREATE INDEX CONCURRENTLY del
+    proceso que migra esperaría a su vez (interbloqueo)
+    """
+    while True:
+        obtenido = connection.scalar(text("SELECT pg_try_advisory_lock(:clave)"), {"clave": CLAVE_BLOQUEO})
+        connection.commit()
+        if obtenido:
+            return
+        logging.getLogger("alembic.env").info("Otro proceso está aplicando las migraciones; esperando")
+        time.sleep(2)
+
+
+def run_migrations_online() -> None:
+    """Aplica las migraciones sobre una conexión a la base de datos"""
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+
+    with connectable.connect() as connection:
+        # Bloqueo de sesión (no de transacción): se mantiene durante los
+        # autocommit_block de los índices CONCURRENTLY. Quien espera lee la
+        # versión después de obtenerlo y no repite las migraciones ya aplicadas
+        postgres = connection.dialect.name == "postgresql"
+        if postgres:
+            esperar_bloqueo(connection)
+
+        try:
+            context.configure(
+                connection=connection, target_metadata=target_metadata
+            )
+
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if postgres:
+                connection.rollback()
+                connection.execute(text("SELECT pg_advisory_unlock(:clave)"), {"clave": CLAVE_BLOQUEO})
+                connection.commit()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
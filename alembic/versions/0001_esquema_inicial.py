@@ -0,0 +1,84 @@
+"""esquema inicial
+
+Tablas clientes, prestamos y pagos tal como las creaba Base.metadata.create_all.
+En una base de datos ya existente: alembic stamp 0001 y luego alembic upgrade head.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'clientes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nombre', sa.String(length=100), nullable=False),
+        sa.Column('apellido', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.Column('telefono', sa.String(length=20), nullable=False),
+        sa.Column('direccion', sa.Text(), nullable=False),
+        sa.Column('documento_identidad', sa.String(length=20), nullable=False),
+        sa.Column('fecha_registro', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('activo', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('documento_identidad'),
+        sa.UniqueConstraint('email'),
+    )
+    op.create_index(op.f('ix_clientes_id'), 'clientes', ['id'], unique=False)
+
+    op.create_table(
+        'prestamos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cliente_id', sa.Integer(), nullable=False),
+        sa.Column('monto', sa.Float(), nullable=False),
+        sa.Column('tasa_interes', sa.Float(), nullable=False),
+        sa.Column('plazo_meses', sa.Integer(), nullable=False),
+        sa.Column('fecha_inicio', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('fecha_vencimiento', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('estado', sa.Enum('ACTIVO', 'PAGADO', 'VENCIDO', 'CANCELADO', name='estadoprestamo'), nullable=True),
+        sa.Column('saldo_pendiente', sa.Float(), nullable=False),
+        sa.Column('cuota_mensual', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['cliente_id'], ['clientes.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_prestamos_id'), 'prestamos', ['id'], unique=False)
+
+    op.create_table(
+        'pagos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('prestamo_id', sa.Integer(), nullable=False),
+        sa.Column('monto', sa.Float(), nullable=False),
+        sa.Column('fecha_pago', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('fecha_vencimiento', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('estado', sa.Enum('PENDIENTE', 'REALIZADO', 'VENCIDO', name='estadopago'), nullable=True),
+        sa.Column('numero_cuota', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['prestamo_id'], ['prestamos.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_pagos_id'), 'pagos', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_pagos_id'), table_name='pagos')
+    op.drop_table('pagos')
+    op.drop_index(op.f('ix_prestamos_id'), table_name='prestamos')
+    op.drop_table('prestamos')
+    op.drop_index(op.f('ix_clientes_id'), table_name='clientes')
+    op.drop_table('clientes')
+    sa.Enum(name='estadopago').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='estadoprestamo').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,57 @@
+"""contadores de cuotas en prestamos
+
+Agrega cuotas_pagadas, cuotas_pendientes, cuotas_vencidas y total_pagado a
+prestamos y los calcula a partir de pagos. Los índices de pagos por
+prestamo_id los crea 0003 con CREATE INDEX CONCURRENTLY.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('prestamos', sa.Column('cuotas_pagadas', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('prestamos', sa.Column('cuotas_pendientes', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('prestamos', sa.Column('cuotas_vencidas', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('prestamos', sa.Column('total_pagado', sa.Float(), server_default='0', nullable=False))
+
+    # Valores iniciales (scripts/reconciliar_contadores.py hace lo mismo por lotes)
+    op.execute("""
+        UPDATE prestamos
+        SET cuotas_pagadas = conteo.pagadas,
+            cuotas_pendientes = conteo.pendientes,
+            cuotas_vencidas = conteo.vencidas,
+            total_pagado = conteo.total
+        FROM (
+            SELECT prestamo_id,
+                   count(*) FILTER (WHERE estado = 'REALIZADO') AS pagadas,
+                   count(*) FILTER (WHERE estado = 'PENDIENTE') AS pendientes,
+                   count(*) FILTER (WHERE estado = 'VENCIDO') AS vencidas,
+                   coalesce(sum(monto) FILTER (WHERE estado = 'REALIZADO'), 0) AS total
+            FROM pagos
+            GROUP BY prestamo_id
+        ) AS conteo
+        WHERE prestamos.id = conteo.prestamo_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('prestamos', 'total_pagado')
+    op.drop_column('prestamos', 'cuotas_vencidas')
+    op.drop_column('prestamos', 'cuotas_pendientes')
+    op.drop_column('prestamos', 'cuotas_pagadas')
@@ -0,0 +1,69 @@
+"""indices de las consultas frecuentes
+
+Índices compuestos para las búsquedas de cuotas por préstamo, los listados de
+préstamos por cliente y estado y el barrido de vencimientos (ux_pagos_prestamo_cuota
+cubre también las búsquedas solo por prestamo_id). Se construyen con
+CREATE INDEX CONCURRENTLY (fuera de transacción) para no bloquear escrituras.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # El índice único falla si hay cuotas duplicadas: se informa antes de empezar
+    duplicadas = op.get_bind().execute(sa.text(
+        "SELECT prestamo_id, numero_cuota FROM pagos "
+        "GROUP BY prestamo_id, numero_cuota HAVING count(*) > 1 LIMIT 5"
+    )).all()
+    if duplicadas:
+        raise RuntimeError(
+            f"Hay cuotas duplicadas (prestamo_id, numero_cuota), por ejemplo {duplicadas}; "
+            "corregirlas antes de crear ux_pagos_prestamo_cuota"
+        )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ux_pagos_prestamo_cuota', 'pagos', ['prestamo_id', 'numero_cuota'],
+            unique=True, postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_pagos_prestamo_estado', 'pagos', ['prestamo_id', 'estado'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_pagos_pendientes_vencimiento', 'pagos', ['fecha_vencimiento', 'id'],
+            postgresql_where=sa.text("estado = 'PENDIENTE'"), postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_prestamos_cliente_estado', 'prestamos', ['cliente_id', 'estado'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_prestamos_estado_vencimiento', 'prestamos', ['estado', 'fecha_vencimiento'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_prestamos_estado_vencimiento', table_name='prestamos', postgresql_concurrently=True)
+        op.drop_index('ix_prestamos_cliente_estado', table_name='prestamos', postgresql_concurrently=True)
+        op.drop_index('ix_pagos_pendientes_vencimiento', table_name='pagos', postgresql_concurrently=True)
+        op.drop_index('ix_pagos_prestamo_estado', table_name='pagos', postgresql_concurrently=True)
+        op.drop_index('ux_pagos_prestamo_cuota', table_name='pagos', postgresql_concurrently=True)
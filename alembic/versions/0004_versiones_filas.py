@@ -0,0 +1,35 @@
+"""versiones de fila para ETag y control optimista
+
+Agrega la columna version a clientes, prestamos y pagos. Es el version_id_col
+de cada modelo: el ORM la incrementa en cada UPDATE y las sentencias masivas
+la incrementan explícitamente. Con un valor por defecto constante PostgreSQL
+agrega la columna sin reescribir la tabla.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for tabla in ('clientes', 'prestamos', 'pagos'):
+        op.add_column(tabla, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for tabla in ('pagos', 'prestamos', 'clientes'):
+        op.drop_column(tabla, 'version')
@@ -0,0 +1,56 @@
+"""indices de busqueda de clientes
+
+Índices GiST de trigramas (pg_trgm) sobre nombre, apellido, email y
+documento_identidad para GET /clientes/buscar (filtran por subcadena o
+similitud y sirven el ORDER BY por distancia de la búsqueda), y un índice B-tree sobre
+documento_identidad con COLLATE "C" para la búsqueda de documentos por prefijo.
+Se construyen con CREATE INDEX CONCURRENTLY (fuera de transacción) para no
+bloquear escrituras.
+
+pg_trgm se incluye en los paquetes contrib de PostgreSQL y desde la versión 13
+puede instalarla el propietario de la base de datos.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNAS = ('nombre', 'apellido', 'email', 'documento_identidad')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        for columna in COLUMNAS:
+            op.create_index(
+                f'ix_clientes_{columna}_trgm', 'clientes', [columna],
+                postgresql_using='gist', postgresql_ops={columna: 'gist_trgm_ops'},
+                postgresql_concurrently=True
+            )
+        op.create_index(
+            'ix_clientes_documento_prefijo', 'clientes', [sa.text('(documento_identidad COLLATE "C")')],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # La extensión pg_trgm se conserva: puede usarla otra base de datos u otro esquema
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_clientes_documento_prefijo', table_name='clientes', postgresql_concurrently=True)
+        for columna in reversed(COLUMNAS):
+            op.drop_index(f'ix_clientes_{columna}_trgm', table_name='clientes', postgresql_concurrently=True)
@@ -0,0 +1,72 @@
+"""resumenes diarios de cartera y cobranza
+
+Tablas cartera_diaria (foto diaria de la cartera por mes de originación,
+estado y tramo de mora) y cobranza_diaria (cuotas exigibles y cobradas por día
+de vencimiento) para GET /reportes/cartera, e índices de pagos para
+refrescarlas de forma incremental: por fecha de vencimiento y, para las cuotas
+cobradas, por fecha de pago. Los índices se construyen con CREATE INDEX
+CONCURRENTLY (fuera de transacción) para no bloquear escrituras.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'cartera_diaria',
+        sa.Column('fecha', sa.Date(), nullable=False),
+        sa.Column('mes_originacion', sa.Date(), nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('tramo', sa.String(length=10), nullable=False),
+        sa.Column('prestamos', sa.Integer(), nullable=False),
+        sa.Column('monto_desembolsado', sa.Float(), nullable=False),
+        sa.Column('saldo_pendiente', sa.Float(), nullable=False),
+        sa.Column('cuotas_vencidas', sa.Integer(), nullable=False),
+        sa.Column('generado', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('fecha', 'mes_originacion', 'estado', 'tramo')
+    )
+    op.create_table(
+        'cobranza_diaria',
+        sa.Column('fecha_vencimiento', sa.Date(), nullable=False),
+        sa.Column('cuotas', sa.Integer(), nullable=False),
+        sa.Column('cuotas_cobradas', sa.Integer(), nullable=False),
+        sa.Column('monto_exigible', sa.Float(), nullable=False),
+        sa.Column('monto_cobrado', sa.Float(), nullable=False),
+        sa.Column('monto_cobrado_a_tiempo', sa.Float(), nullable=False),
+        sa.Column('actualizado', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('fecha_vencimiento')
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_pagos_vencimiento', 'pagos', ['fecha_vencimiento'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_pagos_realizados_fecha_pago', 'pagos', ['fecha_pago'],
+            postgresql_where=sa.text("estado = 'REALIZADO'"), postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_pagos_realizados_fecha_pago', table_name='pagos', postgresql_concurrently=True)
+        op.drop_index('ix_pagos_vencimiento', table_name='pagos', postgresql_concurrently=True)
+    op.drop_table('cobranza_diaria')
+    op.drop_table('cartera_diaria')
@@ -0,0 +1,138 @@
+"""pagos particionada
+
+Convierte pagos en una tabla particionada de PostgreSQL (ver
+services/particiones.py). La estrategia se elige al migrar con
+PAGOS_PARTICIONES:
+
+* hash (por defecto): PAGOS_PARTICIONES_HASH particiones por prestamo_id. La
+  clave primaria pasa a ser (id, prestamo_id) y la unicidad de la cuota no
+  cambia.
+* rango: una partición por mes de fecha_vencimiento (UTC) desde la cuota más
+  antigua hasta PAGOS_MESES_FUTUROS meses después del actual, más
+  pagos_default. La clave primaria pasa a ser (id, fecha_vencimiento) y la
+  unicidad de la cuota, (prestamo_id, numero_cuota, fecha_vencimiento): un
+  índice único de una tabla particionada debe incluir la clave de partición,
+  así que la base de datos deja de impedir dos cuotas con el mismo número en
+  un préstamo si vencen en fechas distintas.
+
+Las cuotas se copian a la tabla nueva dentro de la transacción de la
+migración (pagos queda bloqueada mientras dura) y los índices se construyen
+después de la copia.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+import os
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ESTRATEGIA = os.getenv('PAGOS_PARTICIONES', 'hash').strip().lower()
+PARTICIONES_HASH = int(os.getenv('PAGOS_PARTICIONES_HASH', '16'))
+MESES_FUTUROS = int(os.getenv('PAGOS_MESES_FUTUROS', '24'))
+
+INDICES = ('ix_pagos_id', 'ux_pagos_prestamo_cuota', 'ix_pagos_prestamo_estado', 'ix_pagos_pendientes_vencimiento',
+           'ix_pagos_vencimiento', 'ix_pagos_realizados_fecha_pago')
+
+
+def _mes_siguiente(mes: date) -> date:
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def _eliminar_indices(tabla: str) -> None:
+    op.drop_constraint('pagos_prestamo_id_fkey', tabla, type_='foreignkey')
+    op.drop_constraint('pagos_pkey', tabla, type_='primary')
+    for indice in INDICES:
+        op.drop_index(indice, table_name=tabla)
+
+
+def _crear_indices(clave: list, unica: list) -> None:
+    op.create_primary_key('pagos_pkey', 'pagos', ['id'] + clave)
+    op.create_index('ix_pagos_id', 'pagos', ['id'])
+    op.create_index('ux_pagos_prestamo_cuota', 'pagos', ['prestamo_id', 'numero_cuota'] + unica, unique=True)
+    op.create_index('ix_pagos_prestamo_estado', 'pagos', ['prestamo_id', 'estado'])
+    op.create_index(
+        'ix_pagos_pendientes_vencimiento', 'pagos', ['fecha_vencimiento', 'id'],
+        postgresql_where=sa.text("estado = 'PENDIENTE'")
+    )
+    op.create_index('ix_pagos_vencimiento', 'pagos', ['fecha_vencimiento'])
+    op.create_index(
+        'ix_pagos_realizados_fecha_pago', 'pagos', ['fecha_pago'],
+        postgresql_where=sa.text("estado = 'REALIZADO'")
+    )
+    op.create_foreign_key('pagos_prestamo_id_fkey', 'pagos', 'prestamos', ['prestamo_id'], ['id'])
+
+
+def _mover_a(anterior: str) -> None:
+    """Copia las cuotas, traspasa la secuencia de ids y elimina la tabla anterior"""
+    op.execute(f"INSERT INTO pagos SELECT * FROM {anterior}")
+    op.execute("ALTER SEQUENCE pagos_id_seq OWNED BY pagos.id")
+    op.execute(f"DROP TABLE {anterior} CASCADE")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if ESTRATEGIA not in ('rango', 'hash'):
+        raise ValueError(f"PAGOS_PARTICIONES debe ser 'rango' o 'hash' (no '{ESTRATEGIA}')")
+
+    op.execute("ALTER TABLE pagos RENAME TO pagos_anterior")
+    _eliminar_indices('pagos_anterior')
+
+    if ESTRATEGIA == 'rango':
+        op.execute(
+            "CREATE TABLE pagos (LIKE pagos_anterior INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            "PARTITION BY RANGE (fecha_vencimiento)"
+        )
+        primero, actual = op.get_bind().execute(sa.text(
+            "SELECT min(date_trunc('month', fecha_vencimiento AT TIME ZONE 'UTC'))::date, "
+            "date_trunc('month', now() AT TIME ZONE 'UTC')::date FROM pagos_anterior"
+        )).one()
+        mes = min(primero or actual, actual)
+        ultimo = actual
+        for _ in range(MESES_FUTUROS):
+            ultimo = _mes_siguiente(ultimo)
+        while mes <= ultimo:
+            siguiente = _mes_siguiente(mes)
+            op.execute(
+                f"CREATE TABLE pagos_{mes:%Y_%m} PARTITION OF pagos "
+                f"FOR VALUES FROM ('{mes:%Y-%m-%d} 00:00:00+00') TO ('{siguiente:%Y-%m-%d} 00:00:00+00')"
+            )
+            mes = siguiente
+        op.execute("CREATE TABLE pagos_default PARTITION OF pagos DEFAULT")
+        clave, unica = ['fecha_vencimiento'], ['fecha_vencimiento']
+    else:
+        op.execute(
+            "CREATE TABLE pagos (LIKE pagos_anterior INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            "PARTITION BY HASH (prestamo_id)"
+        )
+        for resto in range(PARTICIONES_HASH):
+            op.execute(
+                f"CREATE TABLE pagos_h{resto:02d} PARTITION OF pagos "
+                f"FOR VALUES WITH (MODULUS {PARTICIONES_HASH}, REMAINDER {resto})"
+            )
+        clave, unica = ['prestamo_id'], []
+
+    _mover_a('pagos_anterior')
+    _crear_indices(clave, unica)
+    op.execute("ANALYZE pagos")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE pagos RENAME TO pagos_particionada")
+    _eliminar_indices('pagos_particionada')
+    op.execute("CREATE TABLE pagos (LIKE pagos_particionada INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    _mover_a('pagos_particionada')
+    _crear_indices([], [])
+    op.execute("ANALYZE pagos")
@@ -0,0 +1,63 @@
+"""pagos actualizado
+
+Columna pagos.actualizado (instante de la última escritura de la cuota) e
+índice ix_pagos_actualizado para el refresco incremental de cobranza_diaria,
+que deja de buscar las cuotas cobradas por fecha_pago: un pago importado o
+corregido con una fecha de pago anterior al último refresco también cambia
+su día. Sustituye a ix_pagos_realizados_fecha_pago.
+
+Las filas existentes toman como valor el instante de la migración (sin
+reescribir la tabla), así que el primer refresco incremental posterior
+recalcula todos los días hasta la fecha.
+
+pagos es una tabla particionada y no admite CREATE INDEX CONCURRENTLY: el
+índice se crea en la tabla padre con ON ONLY (vacío e inválido) y en cada
+partición con CONCURRENTLY, y el padre pasa a ser válido al adjuntar la última.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _crear_indice(nombre: str, columna: str, where: Optional[str] = None) -> None:
+    """Índice de pagos construido partición a partición sin bloquear escrituras"""
+    filtro = f" WHERE {where}" if where else ""
+    op.execute(f"CREATE INDEX {nombre} ON ONLY pagos ({columna}){filtro}")
+    particiones = op.get_bind().execute(sa.text(
+        "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'pagos'::regclass ORDER BY 1"
+    )).scalars().all()
+
+    with op.get_context().autocommit_block():
+        for particion in particiones:
+            op.execute(f"CREATE INDEX CONCURRENTLY {particion}_{columna}_idx ON {particion} ({columna}){filtro}")
+            op.execute(f"ALTER INDEX {nombre} ATTACH PARTITION {particion}_{columna}_idx")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'pagos',
+        sa.Column('actualizado', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False)
+    )
+    _crear_indice('ix_pagos_actualizado', 'actualizado')
+    op.drop_index('ix_pagos_realizados_fecha_pago', table_name='pagos')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _crear_indice('ix_pagos_realizados_fecha_pago', 'fecha_pago', "estado = 'REALIZADO'")
+    op.drop_index('ix_pagos_actualizado', table_name='pagos')
+    op.drop_column('pagos', 'actualizado')
@@ -0,0 +1,193 @@
+"""
+Arranque de los workers: pool propio tras el fork, calentamiento y preparación
+
+Con preload_app = True gunicorn importa la aplicación (y crea los motores de
+config/database.py) en el proceso maestro antes del fork. Cada worker llama a
+tras_fork() desde el hook post_fork: descarta el pool heredado sin cerrar sus
+conexiones (pertenecen al maestro) y empieza a calentar el suyo en segundo
+plano, así que el worker acepta peticiones sin esperar a la base de datos.
+
+Los workers no ejecutan DDL: el esquema lo gestiona solo Alembic, con un paso
+de migración previo al arranque (scripts/migrar.py). Al calentar el pool se
+comprueba que la base de datos está en la revisión head de alembic/versions.
+
+GET /ready responde 503 hasta que el pool está caliente y las migraciones
+aplicadas; GET /health solo indica que el proceso responde.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from config import database, replicas
+
+logger = logging.getLogger(__name__)
+
+# Conexiones que cada worker abre al arrancar (como máximo pool_size: las de
+# overflow se cerrarían al devolverlas); el resto se abre con la demanda
+CONEXIONES_CALENTAR = min(int(os.getenv("DB_POOL_CALENTAR", "5")), database.POOL_CONFIG["pool_size"])
+
+# Segundos entre reintentos mientras la base de datos no está disponible o migrada
+REINTENTO_S = float(os.getenv("DB_POOL_CALENTAR_REINTENTO", "2"))
+
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONSULTA_REVISION = text("SELECT version_num FROM alembic_version")
+
+class EstadoArranque:
+    """
+    Preparación del worker (por proceso)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.pool_caliente = False
+            self.conexiones = 0
+            self.revision = None
+            self.error = None
+            self.inicio = time.perf_counter()
+            self.duracion_ms = None
+
+    def registrar(self, conexiones: int, revision: Optional[str], esperada: str):
+        with self._lock:
+            self.conexiones = conexiones
+            self.revision = revision
+            if revision != esperada:
+                self.error = f"Migraciones pendientes: la base de datos está en {revision}, se espera {esperada}"
+                return
+            self.pool_caliente = True
+            self.error = None
+            self.duracion_ms = round((time.perf_counter() - self.inicio) * 1000, 3)
+
+    def fallo(self, error: Exception):
+        with self._lock:
+            self.error = f"{type(error).__name__}: {str(error).splitlines()[0]}"
+
+    def resumen(self) -> dict:
+        with self._lock:
+            return {
+                "listo": self.pool_caliente,
+                "pool_caliente": self.pool_caliente,
+                "conexiones": self.conexiones,
+                "revision": self.revision,
+                "revision_esperada": _revision_esperada,
+                "calentamiento_ms": self.duracion_ms,
+                "error": self.error,
+            }
+
+estado = EstadoArranque()
+
+_revision_esperada = None
+_hilo = None
+_lock_hilo = threading.Lock()
+
+def revision_esperada() -> str:
+    """
+    Revisión head de las migraciones del código (Alembic se importa aquí, fuera
+    del camino de arranque)
+    """
+    global _revision_esperada
+    if _revision_esperada is None:
+        from alembic.config import Config
+        from alembic.script import ScriptDirectory
+        configuracion = Config(os.path.join(_RAIZ, "alembic.ini"))
+        configuracion.set_main_option("script_location", os.path.join(_RAIZ, "alembic"))
+        _revision_esperada = ScriptDirectory.from_config(configuracion).get_current_head()
+    return _revision_esperada
+
+def tras_fork():
+    """
+    Hook post_fork de gunicorn: pools nuevos para este worker (primaria y
+    réplicas), medición del retraso de las réplicas y calentamiento en segundo
+    plano (en modo async lo lanza el evento startup, que tiene el bucle)
+    """
+    global _hilo
+    database.engine.dispose(close=False)
+    if database.async_engine is not None:
+        database.async_engine.sync_engine.dispose(close=False)
+    replicas.tras_fork()
+    estado.reiniciar()
+    _hilo = None
+    if not database.ASYNC_DB:
+        calentar_en_segundo_plano()
+
+def calentar():
+    """
+    Abre CONEXIONES_CALENTAR conexiones del motor síncrono y las devuelve al
+    pool; reintenta hasta que la base de datos responde y está migrada
+    """
+    esperada = revision_esperada()
+    while True:
+        conexiones = []
+        try:
+            for _ in range(CONEXIONES_CALENTAR):
+                conexiones.append(database.engine.connect())
+            revision = conexiones[0].execute(CONSULTA_REVISION).scalar() if conexiones else None
+            estado.registrar(len(conexiones), revision, esperada)
+        except Exception as e:
+            estado.fallo(e)
+        finally:
+            for conexion in conexiones:
+                conexion.close()
+        if estado.pool_caliente:
+            return
+        logger.warning("Pool sin calentar, reintentando en %s s: %s", REINTENTO_S, estado.error)
+        time.sleep(REINTENTO_S)
+
+def calentar_en_segundo_plano():
+    """
+    Lanza calentar() en un hilo (una vez por proceso)
+    """
+    global _hilo
+    with _lock_hilo:
+        if _hilo is None:
+            _hilo = threading.Thread(target=calentar, name="calentar-pool", daemon=True)
+            _hilo.start()
+
+async def calentar_async():
+    """
+    Igual que calentar() para el motor asíncrono (DB_MODE=async)
+    """
+    esperada = await asyncio.to_thread(revision_esperada)
+    while True:
+        conexiones = []
+        try:
+            resultados = await asyncio.gather(
+                *(database.async_engine.connect() for _ in range(CONEXIONES_CALENTAR)),
+                return_exceptions=True
+            )
+            conexiones = [r for r in resultados if not isinstance(r, BaseException)]
+            errores = [r for r in resultados if isinstance(r, BaseException)]
+            if errores:
+                raise errores[0]
+            revision = (await conexiones[0].execute(CONSULTA_REVISION)).scalar() if conexiones else None
+            estado.registrar(len(conexiones), revision, esperada)
+        except Exception as e:
+            estado.fallo(e)
+        finally:
+            for conexion in conexiones:
+                await conexion.close()
+        if estado.pool_caliente:
+            return
+        logger.warning("Pool sin calentar, reintentando en %s s: %s", REINTENTO_S, estado.error)
+        await asyncio.sleep(REINTENTO_S)
+
+def iniciar() -> Optional[asyncio.Task]:
+    """
+    Evento startup: calienta el pool si post_fork no lo hizo (uvicorn sin
+    gunicorn) y, en modo async, devuelve la tarea para cancelarla al apagar
+    """
+    replicas.iniciar_monitor()
+    if database.ASYNC_DB:
+        return asyncio.create_task(calentar_async())
+    calentar_en_segundo_plano()
+    return None
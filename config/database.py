@@ -2,6 +2,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+from config.pool import configuracion_pool, EstadisticasPool, PoolMedido, PoolMedidoAsync, instrumentar_pool
 
 # Configuración de la base de datos
 DATABASE_URL = os.getenv(
@@ -14,12 +15,42 @@ DATABASE_URL = os.getenv(
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+# Modo de acceso a datos: "sync" (SessionLocal, por defecto) o "async" (asyncpg)
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+ASYNC_DB = DB_MODE == "async"
+
+# URL para el motor asíncrono; por defecto se deriva de DATABASE_URL
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+if not ASYNC_DATABASE_URL and DATABASE_URL.startswith("postgresql://"):
+    ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+# Parámetros del pool (ver config/pool.py y variables DB_POOL_*). Cada worker
+# abre el engine sync y, en modo async, también el async contra el mismo
+# servidor (igual en cada réplica): ambos se reparten su presupuesto
+MOTORES_POR_WORKER = 2 if ASYNC_DB else 1
+POOL_CONFIG = configuracion_pool(MOTORES_POR_WORKER)
+
 # Crear el motor de la base de datos
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, poolclass=PoolMedido, **POOL_CONFIG)
+estadisticas_pool = EstadisticasPool()
+instrumentar_pool(engine, estadisticas_pool)
 
 # Crear la sesión local
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor y sesión asíncronos (solo se crean en modo async para no exigir asyncpg)
+async_engine = None
+AsyncSessionLocal = None
+estadisticas_pool_async = None
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=PoolMedidoAsync, **POOL_CONFIG)
+    estadisticas_pool_async = EstadisticasPool()
+    instrumentar_pool(async_engine.sync_engine, estadisticas_pool_async)
+    # expire_on_commit=False: tras el commit no se puede recargar de forma perezosa
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Crear la base declarativa
 Base = declarative_base()
 
@@ -30,3 +61,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Función para obtener la sesión asíncrona de la base de datos
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,186 @@
+"""
+Configuración y medición del pool de conexiones
+
+El tamaño del pool se calcula por worker a partir de un tope global de
+conexiones (DB_MAX_CONNECTIONS) y del número de workers de gunicorn, de modo que
+la suma de todos los procesos no supere el max_connections de PostgreSQL.
+Cualquier valor puede fijarse explícitamente con su variable de entorno.
+"""
+
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+def _env_bool(nombre: str, defecto: bool) -> bool:
+    valor = os.getenv(nombre)
+    if valor is None:
+        return defecto
+    return valor.strip().lower() in ("1", "true", "yes", "si", "on")
+
+def numero_workers() -> int:
+    """
+    Número de procesos worker que comparten el tope global de conexiones
+    (gunicorn.conf.py exporta GUNICORN_WORKERS; WEB_CONCURRENCY como alternativa)
+    """
+    valor = os.getenv("GUNICORN_WORKERS") or os.getenv("WEB_CONCURRENCY") or "1"
+    return max(1, int(valor))
+
+def configuracion_pool(motores: int = 1) -> dict:
+    """
+    Calcula los parámetros de cada pool de este worker. motores es el número de
+    engines que cada worker abre contra un mismo servidor (sync y, en modo
+    async, también el async) y que se reparten el presupuesto del worker.
+    """
+    max_conexiones = int(os.getenv("DB_MAX_CONNECTIONS", "90"))
+    workers = numero_workers()
+
+    # Presupuesto de conexiones por pool: 2/3 fijas y el resto como overflow.
+    # Con más pools que conexiones el presupuesto se queda en 1 (pool_size=0
+    # significaría un pool sin límite en SQLAlchemy)
+    presupuesto = max(1, max_conexiones // (workers * max(1, motores)))
+    pool_size_defecto = max(1, (presupuesto * 2) // 3)
+
+    pool_size = int(os.getenv("DB_POOL_SIZE", pool_size_defecto))
+    max_overflow = int(os.getenv("DB_MAX_OVERFLOW", max(0, presupuesto - pool_size)))
+
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+        "pool_use_lifo": _env_bool("DB_POOL_LIFO", True),
+    }
+
+def presupuesto_conexiones(motores: int = 1) -> dict:
+    """
+    Resumen del reparto del tope global entre workers y engines por servidor
+    """
+    max_conexiones = int(os.getenv("DB_MAX_CONNECTIONS", "90"))
+    workers = numero_workers()
+    return {
+        "max_conexiones_global": max_conexiones,
+        "workers": workers,
+        "motores_por_worker": motores,
+        "presupuesto_por_pool": max(1, max_conexiones // (workers * max(1, motores))),
+    }
+
+class EstadisticasPool:
+    """
+    Contadores acumulados de un pool (por proceso)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.esperas = 0
+        self.tiempo_espera_total = 0.0
+        self.tiempo_espera_max = 0.0
+        self.timeouts = 0
+        self.conexiones_creadas = 0
+        self.conexiones_invalidadas = 0
+        # Funciones (segundos, timeout) avisadas de cada espera (p. ej. el histograma de /metrics)
+        self.oyentes = []
+
+    def registrar_espera(self, segundos: float, timeout: bool = False):
+        with self._lock:
+            self.esperas += 1
+            self.tiempo_espera_total += segundos
+            if segundos > self.tiempo_espera_max:
+                self.tiempo_espera_max = segundos
+            if timeout:
+                self.timeouts += 1
+        for oyente in self.oyentes:
+            oyente(segundos, timeout)
+
+    def registrar_conexion(self):
+        with self._lock:
+            self.conexiones_creadas += 1
+
+    def registrar_invalidacion(self):
+        with self._lock:
+            self.conexiones_invalidadas += 1
+
+    def resumen(self) -> dict:
+        with self._lock:
+            promedio = self.tiempo_espera_total / self.esperas if self.esperas else 0.0
+            return {
+                "esperas": self.esperas,
+                "tiempo_espera_total_ms": round(self.tiempo_espera_total * 1000, 3),
+                "tiempo_espera_promedio_ms": round(promedio * 1000, 3),
+                "tiempo_espera_max_ms": round(self.tiempo_espera_max * 1000, 3),
+                "timeouts": self.timeouts,
+                "conexiones_creadas": self.conexiones_creadas,
+                "conexiones_invalidadas": self.conexiones_invalidadas,
+            }
+
+class _MedicionEspera:
+    """
+    Mide el tiempo que tarda el pool en entregar una conexión
+    (incluye la espera en cola cuando el pool y el overflow están agotados)
+    """
+
+    estadisticas = None
+
+    def _do_get(self):
+        if self.estadisticas is None:
+            return super()._do_get()
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except PoolTimeoutError:
+            self.estadisticas.registrar_espera(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.estadisticas.registrar_espera(time.perf_counter() - inicio)
+        return conexion
+
+    def recreate(self):
+        nuevo = super().recreate()
+        nuevo.estadisticas = self.estadisticas
+        return nuevo
+
+class PoolMedido(_MedicionEspera, QueuePool):
+    """
+    QueuePool con medición del tiempo de espera
+    """
+
+class PoolMedidoAsync(_MedicionEspera, AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool con medición del tiempo de espera
+    """
+
+def instrumentar_pool(motor, estadisticas: EstadisticasPool):
+    """
+    Asocia las estadísticas al pool del motor y registra los eventos de conexión
+    """
+    motor.pool.estadisticas = estadisticas
+
+    @event.listens_for(motor, "connect")
+    def _al_conectar(dbapi_connection, connection_record):
+        estadisticas.registrar_conexion()
+
+    @event.listens_for(motor, "invalidate")
+    def _al_invalidar(dbapi_connection, connection_record, exception):
+        estadisticas.registrar_invalidacion()
+
+def estado_pool(motor) -> dict:
+    """
+    Estado actual del pool de un motor: conexiones en uso, libres y overflow
+    """
+    pool = motor.pool
+    estado = {
+        "clase": type(pool).__name__,
+        "tamano": pool.size(),
+        "en_uso": pool.checkedout(),
+        "libres": pool.checkedin(),
+        # overflow() es negativo mientras el pool no está completo
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": getattr(pool, "_max_overflow", None),
+        "timeout_s": getattr(pool, "_timeout", None),
+    }
+    estadisticas = getattr(pool, "estadisticas", None)
+    if estadisticas is not None:
+        estado.update(estadisticas.resumen())
+    return estado
@@ -0,0 +1,294 @@
+"""
+Réplicas de lectura: enrutado de las rutas de solo lectura
+
+Con DATABASE_READ_URLS (URLs separadas por comas) las rutas GET de listados,
+detalle y exportación abren su sesión contra una réplica, por turnos entre las
+que están al día; las escrituras siguen yendo siempre a la primaria. Sin
+réplicas configuradas todo va a la primaria, como hasta ahora.
+
+Un hilo por proceso mide el retraso de cada réplica cada REPLICA_LAG_INTERVALO_S
+segundos. Una réplica con más de REPLICA_MAX_LAG_S segundos de retraso, que no
+responde o cuya última medición es antigua deja de recibir lecturas hasta que
+se recupera; si no queda ninguna disponible se lee de la primaria.
+
+Lectura de las propias escrituras: tras una escritura correcta (POST, PUT,
+PATCH, DELETE) la respuesta fija la cookie leer_primaria durante
+LECTURA_PROPIA_S segundos, y mientras dure las lecturas de ese cliente van a
+la primaria. Los clientes sin cookies pueden enviar la cabecera
+X-Lectura-Primaria: 1. Cada respuesta indica en X-Origen-Lectura de dónde leyó.
+"""
+
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from typing import List, Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from config import database
+from config.pool import EstadisticasPool, PoolMedido, PoolMedidoAsync, instrumentar_pool
+
+logger = logging.getLogger(__name__)
+
+def _urls(nombre: str) -> List[str]:
+    urls = [url.strip() for url in os.getenv(nombre, "").split(",") if url.strip()]
+    return [url.replace("postgres://", "postgresql://", 1) if url.startswith("postgres://") else url for url in urls]
+
+READ_URLS = _urls("DATABASE_READ_URLS")
+
+# URLs para el motor asíncrono; por defecto se derivan de DATABASE_READ_URLS
+ASYNC_READ_URLS = _urls("ASYNC_DATABASE_READ_URLS") or [
+    url.replace("postgresql://", "postgresql+asyncpg://", 1) for url in READ_URLS
+]
+
+# Retraso máximo (segundos) con el que una réplica sigue recibiendo lecturas
+RETRASO_MAXIMO_S = float(os.getenv("REPLICA_MAX_LAG_S", "5"))
+
+# Segundos entre mediciones del retraso
+INTERVALO_S = float(os.getenv("REPLICA_LAG_INTERVALO_S", "1"))
+
+# Segundos que un cliente lee de la primaria tras escribir (por defecto, el
+# retraso máximo admitido más el tiempo hasta detectarlo)
+LECTURA_PROPIA_S = float(os.getenv("LECTURA_PROPIA_S", RETRASO_MAXIMO_S + INTERVALO_S))
+
+COOKIE = "leer_primaria"
+CABECERA_PRIMARIA = "X-Lectura-Primaria"
+CABECERA_ORIGEN = "X-Origen-Lectura"
+PRIMARIA = "primaria"
+
+# Retraso de la réplica: 0 si ya aplicó todo lo recibido (una réplica sin
+# escrituras recientes en la primaria no está retrasada aunque su última
+# transacción aplicada sea antigua); NULL si aún no ha aplicado nada
+CONSULTA_RETRASO = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+class Replica:
+    """
+    Motor, sesiones y último retraso medido de una réplica
+    """
+
+    def __init__(self, nombre: str, url: str, url_async: Optional[str]):
+        self.nombre = nombre
+        self.engine = create_engine(url, poolclass=PoolMedido, **database.POOL_CONFIG)
+        self.estadisticas = EstadisticasPool()
+        instrumentar_pool(self.engine, self.estadisticas)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+        self.async_engine = None
+        self.AsyncSessionLocal = None
+        self.estadisticas_async = None
+        if database.ASYNC_DB:
+            from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+            self.async_engine = create_async_engine(url_async, poolclass=PoolMedidoAsync, **database.POOL_CONFIG)
+            self.estadisticas_async = EstadisticasPool()
+            instrumentar_pool(self.async_engine.sync_engine, self.estadisticas_async)
+            self.AsyncSessionLocal = async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False)
+
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.retraso = None
+            self.medido = None
+            self.error = None
+            self.lecturas = 0
+
+    def medir(self):
+        """
+        Mide el retraso con el motor síncrono (también en modo async: el
+        monitor es un hilo). Si la consulta falla la réplica queda no disponible.
+        """
+        try:
+            with self.engine.connect() as conexion:
+                valor = conexion.execute(CONSULTA_RETRASO).scalar()
+            retraso, error = (math.inf if valor is None else float(valor)), None
+        except Exception as e:
+            retraso, error = math.inf, f"{type(e).__name__}: {str(e).splitlines()[0]}"
+        with self._lock:
+            if error and not self.error:
+                logger.warning("Réplica %s no disponible: %s", self.nombre, error)
+            self.retraso = retraso
+            self.error = error
+            self.medido = time.monotonic()
+
+    def disponible(self) -> bool:
+        with self._lock:
+            if self.medido is None or time.monotonic() - self.medido > 3 * INTERVALO_S + 1:
+                return False
+            return self.retraso <= RETRASO_MAXIMO_S
+
+    def registrar_lectura(self):
+        with self._lock:
+            self.lecturas += 1
+
+    def resumen(self) -> dict:
+        disponible = self.disponible()
+        with self._lock:
+            return {
+                "disponible": disponible,
+                "retraso_s": None if self.retraso in (None, math.inf) else round(self.retraso, 3),
+                "medido_hace_s": None if self.medido is None else round(time.monotonic() - self.medido, 3),
+                "error": self.error,
+                "lecturas": self.lecturas,
+            }
+
+REPLICAS = [
+    Replica(f"replica{numero}", url, ASYNC_READ_URLS[numero - 1] if numero <= len(ASYNC_READ_URLS) else None)
+    for numero, url in enumerate(READ_URLS, start=1)
+]
+HABILITADO = bool(REPLICAS)
+
+_turno = itertools.count()
+_lock_monitor = threading.Lock()
+_pid_monitor = None
+_lecturas_primaria = {"lectura_propia": 0, "sin_replica": 0}
+
+def _contar_primaria(motivo: str):
+    with _lock_monitor:
+        _lecturas_primaria[motivo] += 1
+
+def _vigilar():
+    while True:
+        for replica in REPLICAS:
+            replica.medir()
+        time.sleep(INTERVALO_S)
+
+def iniciar_monitor():
+    """
+    Lanza el hilo que mide el retraso (uno por proceso: tras un fork el hilo
+    del padre no existe en el hijo y se lanza de nuevo)
+    """
+    global _pid_monitor
+    if not HABILITADO or _pid_monitor == os.getpid():
+        return
+    with _lock_monitor:
+        if _pid_monitor != os.getpid():
+            threading.Thread(target=_vigilar, name="retraso-replicas", daemon=True).start()
+            _pid_monitor = os.getpid()
+
+def tras_fork():
+    """
+    Pools nuevos para este worker (las conexiones heredadas pertenecen al maestro)
+    """
+    for replica in REPLICAS:
+        replica.engine.dispose(close=False)
+        if replica.async_engine is not None:
+            replica.async_engine.sync_engine.dispose(close=False)
+        replica.reiniciar()
+    with _lock_monitor:
+        for motivo in _lecturas_primaria:
+            _lecturas_primaria[motivo] = 0
+    iniciar_monitor()
+
+def leer_de_primaria(request: Request) -> bool:
+    """
+    True si el cliente escribió hace menos de LECTURA_PROPIA_S segundos
+    (cookie) o pide leer de la primaria (cabecera)
+    """
+    if request.headers.get(CABECERA_PRIMARIA, "").strip().lower() in ("1", "true", "yes", "si", "on"):
+        return True
+    try:
+        return float(request.cookies.get(COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def elegir(request: Request) -> Optional[Replica]:
+    """
+    Réplica para la lectura de esta petición, o None para leer de la primaria.
+    Guarda el origen elegido en request.state.origen_lectura.
+    """
+    replica = None
+    if HABILITADO:
+        iniciar_monitor()
+        if leer_de_primaria(request):
+            _contar_primaria("lectura_propia")
+        else:
+            disponibles = [r for r in REPLICAS if r.disponible()]
+            if disponibles:
+                replica = disponibles[next(_turno) % len(disponibles)]
+                replica.registrar_lectura()
+            else:
+                _contar_primaria("sin_replica")
+    request.state.origen_lectura = replica.nombre if replica else PRIMARIA
+    return replica
+
+def motor_lectura(request: Request):
+    """
+    Motor síncrono para lecturas fuera de una sesión (p. ej. la exportación en streaming)
+    """
+    replica = elegir(request)
+    return replica.engine if replica else database.engine
+
+def get_db_lectura(request: Request):
+    """
+    Como get_db, pero contra una réplica cuando hay una disponible
+    """
+    replica = elegir(request)
+    db = (replica.SessionLocal if replica else database.SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db_lectura(request: Request):
+    """
+    Como get_async_db, pero contra una réplica cuando hay una disponible
+    """
+    replica = elegir(request)
+    async with (replica.AsyncSessionLocal if replica else database.AsyncSessionLocal)() as db:
+        yield db
+
+def resumen() -> dict:
+    return {
+        "retraso_maximo_s": RETRASO_MAXIMO_S,
+        "lectura_propia_s": LECTURA_PROPIA_S,
+        "lecturas_primaria": _copiar_contadores(),
+        "replicas": {replica.nombre: replica.resumen() for replica in REPLICAS},
+    }
+
+def _copiar_contadores() -> dict:
+    with _lock_monitor:
+        return dict(_lecturas_primaria)
+
+class MiddlewareLecturaPropia:
+    """
+    Middleware ASGI: tras una escritura correcta fija la cookie que manda las
+    lecturas del cliente a la primaria, y añade X-Origen-Lectura a las lecturas
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        escritura = scope["method"] not in ("GET", "HEAD", "OPTIONS")
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                cabeceras = list(mensaje.get("headers", []))
+                if escritura and mensaje["status"] < 400:
+                    hasta = time.time() + LECTURA_PROPIA_S
+                    cookie = f"{COOKIE}={hasta:.3f}; Max-Age={math.ceil(LECTURA_PROPIA_S)}; Path=/; HttpOnly; SameSite=Lax"
+                    cabeceras.append((b"set-cookie", cookie.encode()))
+                origen = scope.get("state", {}).get("origen_lectura")
+                if origen:
+                    cabeceras.append((CABECERA_ORIGEN.lower().encode(), origen.encode()))
+                mensaje = {**mensaje, "headers": cabeceras}
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
@@ -1,12 +1,21 @@
 # Configuración de Gunicorn para producción
 import multiprocessing
 import os
+import shutil
+import tempfile
 
 # Configuración del servidor
 bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
-workers = multiprocessing.cpu_count() * 2 + 1
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+# La aplicación reparte DB_MAX_CONNECTIONS entre los workers (ver config/pool.py)
+os.environ["GUNICORN_WORKERS"] = str(workers)
 worker_class = "uvicorn.workers.UvicornWorker"
 
+# Métricas de Prometheus en modo multiproceso: cada worker escribe sus valores en
+# este directorio y GET /metrics los agrega (debe definirse antes de cargar la app)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "microcreditos-metricas"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
 # Configuración de workers
 worker_connections = 1000
 max_requests = 1000
@@ -27,6 +36,23 @@ limit_request_line = 4094
 limit_request_fields = 100
 limit_request_field_size = 8190
 
-# Configuración de rendimiento
+# Configuración de rendimiento: la aplicación se importa una vez en el maestro
+# y cada worker nace con ella ya cargada (post_fork le da su propio pool)
 preload_app = True
 forwarded_allow_ips = "*"
+
+def on_starting(server):
+    """Vaciar las métricas de una ejecución anterior (los workers aún no existen)"""
+    directorio = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directorio, ignore_errors=True)
+    os.makedirs(directorio, exist_ok=True)
+
+def post_fork(server, worker):
+    """Pool propio del worker: descartar las conexiones heredadas y calentarlo en segundo plano"""
+    from config import arranque
+    arranque.tras_fork()
+
+def child_exit(server, worker):
+    """Descartar los valores de los gauges del worker que terminó"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,8 +1,12 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from config.database import engine
-from models.models import Base
-from routers import clientes, prestamos, pagos
+from fastapi.responses import JSONResponse
+from config import arranque, database, replicas
+from config.database import engine, ASYNC_DB
+from routers import metricas, admin, debug, reportes
+from services import trazas, vencimientos
+from services.metricas import MiddlewareMetricas, instrumentar_motor
 
 app = FastAPI(
     title="API de Microcréditos",
@@ -17,22 +21,68 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", replicas.CABECERA_ORIGEN],
 )
 
-# Incluir los routers
+# Lecturas en réplicas y lectura de las propias escrituras (DATABASE_READ_URLS)
+if replicas.HABILITADO:
+    app.add_middleware(replicas.MiddlewareLecturaPropia)
+
+# Latencia, tamaño de respuesta y consultas por ruta (GET /metrics)
+app.add_middleware(MiddlewareMetricas)
+instrumentar_motor(engine, "sync", database.estadisticas_pool)
+if ASYNC_DB:
+    instrumentar_motor(database.async_engine.sync_engine, "async", database.estadisticas_pool_async)
+for replica in replicas.REPLICAS:
+    instrumentar_motor(replica.engine, replica.nombre, replica.estadisticas)
+    if ASYNC_DB:
+        instrumentar_motor(replica.async_engine.sync_engine, f"{replica.nombre}_async", replica.estadisticas_async)
+
+# Trazas de SQL por petición y detector de N+1 (solo desarrollo: TRAZAS_SQL=1)
+if trazas.HABILITADO:
+    app.add_middleware(trazas.MiddlewareTrazas)
+    trazas.instrumentar_motor(engine)
+    if ASYNC_DB:
+        trazas.instrumentar_motor(database.async_engine.sync_engine)
+    for replica in replicas.REPLICAS:
+        trazas.instrumentar_motor(replica.engine)
+        if ASYNC_DB:
+            trazas.instrumentar_motor(replica.async_engine.sync_engine)
+
+# Incluir los routers (DB_MODE=async usa las versiones asíncronas sobre asyncpg)
+if ASYNC_DB:
+    from routers import clientes_async as clientes, prestamos_async as prestamos, pagos_async as pagos
+else:
+    from routers import clientes, prestamos, pagos
+
 app.include_router(clientes.router)
 app.include_router(prestamos.router)
 app.include_router(pagos.router)
+app.include_router(metricas.router)
+app.include_router(reportes.router)
+app.include_router(admin.router)
+if trazas.HABILITADO:
+    app.include_router(debug.router)
 
 @app.on_event("startup")
 async def startup_event():
-    """Crear las tablas al iniciar la aplicación"""
-    try:
-        Base.metadata.create_all(bind=engine)
-        print("✅ Base de datos inicializada correctamente")
-    except Exception as e:
-        print(f"⚠️  Error al conectar con la base de datos: {e}")
-        print("   Asegúrate de que PostgreSQL esté ejecutándose")
+    """
+    Calentar el pool en segundo plano (el esquema lo crea scripts/migrar.py:
+    los workers no ejecutan DDL al arrancar)
+    """
+    app.state.tarea_calentar = arranque.iniciar()
+
+    # Barrido diario de vencimientos (BARRIDO_VENCIDOS_HORA vacío lo desactiva)
+    if vencimientos.HORA_BARRIDO:
+        app.state.tarea_barrido = asyncio.create_task(vencimientos.programar_barrido())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Detener el barrido programado y el calentamiento del pool"""
+    for nombre in ("tarea_barrido", "tarea_calentar"):
+        tarea = getattr(app.state, nombre, None)
+        if tarea:
+            tarea.cancel()
 
 @app.get("/")
 def read_root():
@@ -49,4 +99,13 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "message": "API funcionando correctamente"}
\ No newline at end of file
+    return {"status": "healthy", "message": "API funcionando correctamente"}
+
+@app.get("/ready")
+def readiness_check():
+    """
+    Preparación del worker: 200 cuando el pool está caliente y la base de datos
+    en la revisión de migraciones del código, 503 mientras tanto
+    """
+    estado = arranque.estado.resumen()
+    return JSONResponse(status_code=200 if estado["listo"] else 503, content=estado)
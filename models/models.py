@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum, Text, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from config.database import Base
@@ -28,8 +28,28 @@ class Cliente(Base):
     fecha_registro = Column(DateTime(timezone=True), server_default=func.now())
     activo = Column(Boolean, default=True)
     
+    # Versión de la fila: ETag de las respuestas y control optimista de escrituras
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
     # Relaciones
     prestamos = relationship("Prestamo", back_populates="cliente")
+    
+    __table_args__ = tuple(
+        # Búsqueda por subcadena o aproximada, ordenada por distancia
+        # (GET /clientes/buscar, extensión pg_trgm)
+        Index(
+            f"ix_clientes_{columna}_trgm", columna,
+            postgresql_using="gist", postgresql_ops={columna: "gist_trgm_ops"}
+        ).ddl_if(dialect="postgresql")
+        for columna in ("nombre", "apellido", "email", "documento_identidad")
+    )
+    
+    __mapper_args__ = {"version_id_col": version}
+
+# Búsqueda de documentos por prefijo en orden de bytes (LIKE 'prefijo%' y ORDER BY con COLLATE "C")
+Index(
+    "ix_clientes_documento_prefijo", Cliente.documento_identidad.collate("C")
+).ddl_if(dialect="postgresql")
 
 class Prestamo(Base):
     __tablename__ = "prestamos"
@@ -45,10 +65,32 @@ class Prestamo(Base):
     saldo_pendiente = Column(Float, nullable=False)
     cuota_mensual = Column(Float, nullable=False)
     
+    # Contadores de cuotas, mantenidos en cada cambio de estado de un pago
+    # (se reconstruyen con scripts/reconciliar_contadores.py)
+    cuotas_pagadas = Column(Integer, nullable=False, default=0, server_default="0")
+    cuotas_pendientes = Column(Integer, nullable=False, default=0, server_default="0")
+    cuotas_vencidas = Column(Integer, nullable=False, default=0, server_default="0")
+    total_pagado = Column(Float, nullable=False, default=0, server_default="0")
+    
+    # Versión de la fila (también sube con cada cambio en sus cuotas)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
     # Relaciones
     cliente = relationship("Cliente", back_populates="prestamos")
     pagos = relationship("Pago", back_populates="prestamo")
+    
+    __table_args__ = (
+        # Listado de préstamos por cliente y estado
+        Index("ix_prestamos_cliente_estado", "cliente_id", "estado"),
+        # Préstamos activos con la fecha final superada (barrido de vencimientos)
+        Index("ix_prestamos_estado_vencimiento", "estado", "fecha_vencimiento"),
+    )
+    
+    __mapper_args__ = {"version_id_col": version}
 
+# En PostgreSQL, pagos es una tabla particionada (migración 0007, ver
+# services/particiones.py): la clave primaria y ux_pagos_prestamo_cuota incluyen
+# además la clave de partición. El modelo describe la tabla lógica.
 class Pago(Base):
     __tablename__ = "pagos"
     
@@ -60,5 +102,58 @@ class Pago(Base):
     estado = Column(Enum(EstadoPago), default=EstadoPago.PENDIENTE)
     numero_cuota = Column(Integer, nullable=False)
     
+    # Versión de la fila
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
+    # Última escritura de la fila (alta o cualquier UPDATE emitido por SQLAlchemy):
+    # el refresco incremental de la cobranza busca por esta columna los días afectados
+    actualizado = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    
     # Relaciones
     prestamo = relationship("Prestamo", back_populates="pagos")
+    
+    __table_args__ = (
+        # Una cuota por número dentro de cada préstamo (registrar_pago busca por este par)
+        Index("ux_pagos_prestamo_cuota", "prestamo_id", "numero_cuota", unique=True),
+        # Cuotas de un préstamo por estado
+        Index("ix_pagos_prestamo_estado", "prestamo_id", "estado"),
+        # Cuotas pendientes por fecha de vencimiento (barrido de vencimientos y listados)
+        Index(
+            "ix_pagos_pendientes_vencimiento", "fecha_vencimiento", "id",
+            postgresql_where=text("estado = 'PENDIENTE'")
+        ),
+        # Cuotas por día de vencimiento en cualquier estado (resúmenes de cobranza)
+        Index("ix_pagos_vencimiento", "fecha_vencimiento"),
+        # Cuotas escritas desde un instante (refresco incremental de la cobranza)
+        Index("ix_pagos_actualizado", "actualizado"),
+    )
+    
+    __mapper_args__ = {"version_id_col": version}
+
+# Foto diaria de la cartera (services/reportes.py): préstamos y saldos por mes
+# de originación, estado y tramo de mora a la fecha de corte
+class CarteraDiaria(Base):
+    __tablename__ = "cartera_diaria"
+    
+    fecha = Column(Date, primary_key=True)
+    mes_originacion = Column(Date, primary_key=True)
+    estado = Column(String(20), primary_key=True)
+    tramo = Column(String(10), primary_key=True)
+    prestamos = Column(Integer, nullable=False)
+    monto_desembolsado = Column(Float, nullable=False)
+    saldo_pendiente = Column(Float, nullable=False)
+    cuotas_vencidas = Column(Integer, nullable=False)
+    generado = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+# Cuotas exigibles y cobradas por día de vencimiento (services/reportes.py)
+class CobranzaDiaria(Base):
+    __tablename__ = "cobranza_diaria"
+    
+    fecha_vencimiento = Column(Date, primary_key=True)
+    cuotas = Column(Integer, nullable=False)
+    cuotas_cobradas = Column(Integer, nullable=False)
+    monto_exigible = Column(Float, nullable=False)
+    monto_cobrado = Column(Float, nullable=False)
+    # Cobrado hasta la fecha de vencimiento incluida
+    monto_cobrado_a_tiempo = Column(Float, nullable=False)
+    actualizado = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, status
+from config.database import engine
+from services import particiones, vencimientos
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+def _barrido_en_segundo_plano():
+    try:
+        vencimientos.ejecutar_barrido()
+    except vencimientos.BarridoEnCurso:
+        pass
+    except Exception:
+        # El error queda registrado en el progreso del barrido
+        pass
+
+@router.post("/barrido-vencidos", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+def lanzar_barrido_vencidos(background_tasks: BackgroundTasks):
+    """
+    Lanzar el barrido de vencimientos en segundo plano
+    Consultar el avance con GET /admin/barrido-vencidos
+    """
+    if vencimientos.progreso.en_curso:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ya hay un barrido de vencimientos en curso"
+        )
+
+    background_tasks.add_task(_barrido_en_segundo_plano)
+    return {"message": "Barrido de vencimientos iniciado"}
+
+@router.get("/barrido-vencidos", response_model=dict)
+def obtener_progreso_barrido():
+    """
+    Progreso del último barrido de vencimientos de este worker
+    """
+    return vencimientos.progreso.resumen()
+
+@router.get("/particiones", response_model=dict)
+def obtener_particiones_pagos():
+    """
+    Estrategia de particionado de pagos y sus particiones con el número
+    estimado de filas
+    """
+    with engine.connect() as conexion:
+        return {
+            "estrategia": particiones.estrategia(conexion),
+            "particiones": particiones.particiones(conexion) if engine.dialect.name == "postgresql" else [],
+        }
+
+@router.post("/particiones", response_model=dict)
+def crear_particiones_pagos(meses: int = Query(particiones.MESES_FUTUROS, ge=0, le=120, description="Meses hacia delante a cubrir")):
+    """
+    Crear las particiones mensuales de pagos que falten hasta dentro de
+    `meses` meses, como mucho 120 (solo con particiones por rango)
+    """
+    return {"creadas": particiones.crear_particiones_futuras(engine, meses)}
@@ -1,20 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from config.database import get_db
+from config.replicas import get_db_lectura
 from models.models import Cliente, Prestamo, Pago
-from schemas.schemas import ClienteCreate, ClienteUpdate, Cliente as ClienteSchema, ClienteConPrestamos
+from schemas.schemas import ClienteCreate, ClienteUpdate, Cliente as ClienteSchema, ClienteConPrestamos, ClienteBusqueda, ResultadoLoteClientes
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from services.paginacion import aplicar_paginacion, recortar_pagina
+from services import busqueda, cache, clientes_lote, lectura, versiones
 
 router = APIRouter(prefix="/clientes", tags=["clientes"])
 
+# Máximo de clientes por llamada a POST /clientes/bulk
+MAX_LOTE_CLIENTES = 50000
+
 @router.post("/", response_model=ClienteSchema, status_code=status.HTTP_201_CREATED)
 def crear_cliente(cliente: ClienteCreate, db: Session = Depends(get_db)):
     """
     Crear un nuevo cliente
     """
     try:
-        db_cliente = Cliente(**cliente.dict())
+        db_cliente = Cliente(**cliente.model_dump())
         db.add(db_cliente)
         db.commit()
         db.refresh(db_cliente)
@@ -26,60 +33,156 @@ def crear_cliente(cliente: ClienteCreate, db: Session = Depends(get_db)):
             detail="El email o documento de identidad ya existe"
         )
 
+@router.post("/bulk", response_model=ResultadoLoteClientes)
+def guardar_clientes_lote(
+    clientes: List[ClienteCreate],
+    clave: str = "documento_identidad",
+    db: Session = Depends(get_db)
+):
+    """
+    Crear o actualizar clientes en lote (sincronización con el sistema KYC)
+    Cada cliente se identifica por ?clave=documento_identidad (por defecto) o email
+    Los elementos con errores se informan individualmente y no impiden guardar el resto
+    """
+    if len(clientes) > MAX_LOTE_CLIENTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El lote no puede superar {MAX_LOTE_CLIENTES} clientes"
+        )
+    
+    try:
+        resultados = clientes_lote.guardar_clientes(db, clientes, clave)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    # Respuesta con orjson: el lote puede tener decenas de miles de resultados
+    return lectura.respuesta(clientes_lote.resumen(resultados))
+
 @router.get("/", response_model=List[ClienteSchema])
 def obtener_clientes(
     skip: int = 0, 
     limit: int = 100, 
     activo: bool = True,  # Por defecto solo clientes activos
-    db: Session = Depends(get_db)
+    after: Optional[str] = None,
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Obtener lista de clientes con paginación y filtros
     Por defecto muestra solo clientes activos (activo=True)
     Para ver todos los clientes incluyendo inactivos, usar ?activo=
+    Paginación por cursor: ?after=<valor de la cabecera X-Next-Cursor> (ignora skip)
     """
-    query = db.query(Cliente)
+    # Solo lectura: filas de Core serializadas con orjson, sin objetos ORM
+    query = lectura.consulta_clientes()
     
     if activo is not None:
-        query = query.filter(Cliente.activo == activo)
+        query = query.where(Cliente.activo == activo)
+    
+    orden = [Cliente.id]
+    try:
+        query = aplicar_paginacion(query, orden, limit, skip, after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    clientes = query.offset(skip).limit(limit).all()
-    return clientes
+    filas, siguiente = recortar_pagina(db.execute(query).all(), orden, limit)
+    return lectura.respuesta(lectura.clientes(filas), siguiente)
+
+@router.get("/buscar", response_model=List[ClienteBusqueda])
+def buscar_clientes(
+    q: str,
+    limit: int = 20,
+    activo: bool = True,
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Buscar clientes por nombre, apellido, email o documento de identidad
+    Admite texto parcial o con erratas; resultados ordenados por relevancia
+    Un número de documento se busca primero por prefijo (el exacto primero)
+    """
+    try:
+        consultas = busqueda.consultas(q, activo, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    for consulta in consultas:
+        filas = db.execute(consulta).all()
+        if filas:
+            break
+    return lectura.respuesta(busqueda.clientes(filas))
 
 @router.get("/{cliente_id}", response_model=ClienteSchema)
-def obtener_cliente(cliente_id: int, db: Session = Depends(get_db)):
+def obtener_cliente(cliente_id: int, request: Request, db: Session = Depends(get_db_lectura)):
     """
-    Obtener un cliente por ID
+    Obtener un cliente por ID (servido desde la caché de lectura)
+    Responde 304 si If-None-Match coincide con el ETag actual
     """
-    cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
-    if not cliente:
+    version = db.execute(versiones.consulta_cliente(cliente_id)).first()
+    if version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cliente no encontrado"
         )
-    return cliente
+    etag = versiones.etag(*version)
+    no_modificado = versiones.no_modificado(request.headers, etag)
+    if no_modificado:
+        return no_modificado
+    
+    def cargar():
+        cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+        if not cliente:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Cliente no encontrado"
+            )
+        return {
+            "etag": versiones.etag_cliente(cliente),
+            "datos": ClienteSchema.model_validate(cliente).model_dump(mode="json"),
+        }
+    
+    valor = cache.obtener_vigente(cache.clave_de(cache.CLIENTE, cliente_id), etag, cargar)
+    return lectura.respuesta(valor["datos"], headers={"ETag": valor["etag"]})
 
 @router.get("/{cliente_id}/prestamos", response_model=ClienteConPrestamos)
-def obtener_cliente_con_prestamos(cliente_id: int, db: Session = Depends(get_db)):
+def obtener_cliente_con_prestamos(cliente_id: int, db: Session = Depends(get_db_lectura)):
     """
     Obtener un cliente con todos sus préstamos
     """
-    cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
-    if not cliente:
+    fila = db.execute(lectura.consulta_clientes().where(Cliente.id == cliente_id)).first()
+    if not fila:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cliente no encontrado"
         )
-    return cliente
+    
+    # Los préstamos se leen en una sola consulta adicional y comparten el cliente ya leído
+    cliente = lectura.clientes([fila])[0]
+    filas = db.execute(
+        lectura.consulta_prestamos_sin_cliente()
+        .where(Prestamo.cliente_id == cliente_id)
+        .order_by(Prestamo.id)
+    ).all()
+    cliente["prestamos"] = lectura.prestamos(filas, dict(cliente))
+    return lectura.respuesta(cliente)
 
 @router.put("/{cliente_id}", response_model=ClienteSchema)
 def actualizar_cliente(
     cliente_id: int, 
     cliente_update: ClienteUpdate, 
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
     Actualizar un cliente existente
+    Con If-Match solo se aplica si el cliente no cambió desde ese ETag (si no, 412)
     """
     db_cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
     if not db_cliente:
@@ -88,13 +191,23 @@ def actualizar_cliente(
             detail="Cliente no encontrado"
         )
     
-    update_data = cliente_update.dict(exclude_unset=True)
+    if versiones.precondicion_fallida(request.headers, versiones.etag_cliente(db_cliente)):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="El cliente fue modificado (el ETag no coincide con If-Match)"
+        )
+    
+    update_data = cliente_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_cliente, field, value)
     
     try:
         db.commit()
+        # Los préstamos incluyen al cliente en su respuesta
+        prestamos_ids = [p[0] for p in db.query(Prestamo.id).filter(Prestamo.cliente_id == cliente_id).all()]
+        cache.invalidar_cliente(cliente_id, prestamos_ids)
         db.refresh(db_cliente)
+        response.headers["ETag"] = versiones.etag_cliente(db_cliente)
         return db_cliente
     except IntegrityError:
         db.rollback()
@@ -102,6 +215,13 @@ def actualizar_cliente(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Error de integridad en los datos"
         )
+    except StaleDataError:
+        # Otra petición modificó el cliente entre la lectura y el UPDATE
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED if request.headers.get("if-match") else status.HTTP_409_CONFLICT,
+            detail="El cliente fue modificado por otra petición"
+        )
 
 @router.delete("/{cliente_id}", status_code=status.HTTP_204_NO_CONTENT)
 def eliminar_cliente(cliente_id: int, db: Session = Depends(get_db)):
@@ -130,6 +250,7 @@ def eliminar_cliente(cliente_id: int, db: Session = Depends(get_db)):
         # Eliminar el cliente
         db.delete(cliente)
         db.commit()
+        cache.invalidar_cliente(cliente_id, prestamos_ids)
         
         return None
         
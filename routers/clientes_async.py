@@ -0,0 +1,263 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from typing import List, Optional
+from config.database import get_async_db
+from config.replicas import get_async_db_lectura
+from models.models import Cliente, Prestamo, Pago
+from schemas.schemas import ClienteCreate, ClienteUpdate, Cliente as ClienteSchema, ClienteConPrestamos, ClienteBusqueda, ResultadoLoteClientes
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from services.paginacion import aplicar_paginacion, recortar_pagina
+from services import busqueda, cache, clientes_lote, lectura, versiones
+from routers.clientes import MAX_LOTE_CLIENTES
+
+router = APIRouter(prefix="/clientes", tags=["clientes"])
+
+@router.post("/", response_model=ClienteSchema, status_code=status.HTTP_201_CREATED)
+async def crear_cliente(cliente: ClienteCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Crear un nuevo cliente
+    """
+    try:
+        db_cliente = Cliente(**cliente.model_dump())
+        db.add(db_cliente)
+        await db.commit()
+        await db.refresh(db_cliente)
+        return db_cliente
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El email o documento de identidad ya existe"
+        )
+
+@router.post("/bulk", response_model=ResultadoLoteClientes)
+async def guardar_clientes_lote(
+    clientes: List[ClienteCreate],
+    clave: str = "documento_identidad",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Crear o actualizar clientes en lote (sincronización con el sistema KYC)
+    Cada cliente se identifica por ?clave=documento_identidad (por defecto) o email
+    Los elementos con errores se informan individualmente y no impiden guardar el resto
+    """
+    if len(clientes) > MAX_LOTE_CLIENTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El lote no puede superar {MAX_LOTE_CLIENTES} clientes"
+        )
+
+    try:
+        resultados = await db.run_sync(clientes_lote.guardar_clientes, clientes, clave)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    # Respuesta con orjson: el lote puede tener decenas de miles de resultados
+    return lectura.respuesta(clientes_lote.resumen(resultados))
+
+@router.get("/", response_model=List[ClienteSchema])
+async def obtener_clientes(
+    skip: int = 0,
+    limit: int = 100,
+    activo: bool = True,  # Por defecto solo clientes activos
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    """
+    Obtener lista de clientes con paginación y filtros
+    Por defecto muestra solo clientes activos (activo=True)
+    Para ver todos los clientes incluyendo inactivos, usar ?activo=
+    Paginación por cursor: ?after=<valor de la cabecera X-Next-Cursor> (ignora skip)
+    """
+    # Solo lectura: filas de Core serializadas con orjson, sin objetos ORM
+    query = lectura.consulta_clientes()
+
+    if activo is not None:
+        query = query.where(Cliente.activo == activo)
+
+    orden = [Cliente.id]
+    try:
+        query = aplicar_paginacion(query, orden, limit, skip, after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    result = await db.execute(query)
+    filas, siguiente = recortar_pagina(result.all(), orden, limit)
+    return lectura.respuesta(lectura.clientes(filas), siguiente)
+
+@router.get("/buscar", response_model=List[ClienteBusqueda])
+async def buscar_clientes(
+    q: str,
+    limit: int = 20,
+    activo: bool = True,
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    """
+    Buscar clientes por nombre, apellido, email o documento de identidad
+    Admite texto parcial o con erratas; resultados ordenados por relevancia
+    Un número de documento se busca primero por prefijo (el exacto primero)
+    """
+    try:
+        consultas = busqueda.consultas(q, activo, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    for consulta in consultas:
+        filas = (await db.execute(consulta)).all()
+        if filas:
+            break
+    return lectura.respuesta(busqueda.clientes(filas))
+
+@router.get("/{cliente_id}", response_model=ClienteSchema)
+async def obtener_cliente(cliente_id: int, request: Request, db: AsyncSession = Depends(get_async_db_lectura)):
+    """
+    Obtener un cliente por ID (servido desde la caché de lectura)
+    Responde 304 si If-None-Match coincide con el ETag actual
+    """
+    version = (await db.execute(versiones.consulta_cliente(cliente_id))).first()
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cliente no encontrado"
+        )
+    etag = versiones.etag(*version)
+    no_modificado = versiones.no_modificado(request.headers, etag)
+    if no_modificado:
+        return no_modificado
+
+    async def cargar():
+        cliente = await db.get(Cliente, cliente_id)
+        if not cliente:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Cliente no encontrado"
+            )
+        return {
+            "etag": versiones.etag_cliente(cliente),
+            "datos": ClienteSchema.model_validate(cliente).model_dump(mode="json"),
+        }
+
+    valor = await cache.obtener_vigente_async(cache.clave_de(cache.CLIENTE, cliente_id), etag, cargar)
+    return lectura.respuesta(valor["datos"], headers={"ETag": valor["etag"]})
+
+@router.get("/{cliente_id}/prestamos", response_model=ClienteConPrestamos)
+async def obtener_cliente_con_prestamos(cliente_id: int, db: AsyncSession = Depends(get_async_db_lectura)):
+    """
+    Obtener un cliente con todos sus préstamos
+    """
+    fila = (await db.execute(lectura.consulta_clientes().where(Cliente.id == cliente_id))).first()
+    if not fila:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cliente no encontrado"
+        )
+
+    # Los préstamos se leen en una sola consulta adicional y comparten el cliente ya leído
+    cliente = lectura.clientes([fila])[0]
+    result = await db.execute(
+        lectura.consulta_prestamos_sin_cliente()
+        .where(Prestamo.cliente_id == cliente_id)
+        .order_by(Prestamo.id)
+    )
+    cliente["prestamos"] = lectura.prestamos(result.all(), dict(cliente))
+    return lectura.respuesta(cliente)
+
+@router.put("/{cliente_id}", response_model=ClienteSchema)
+async def actualizar_cliente(
+    cliente_id: int,
+    cliente_update: ClienteUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Actualizar un cliente existente
+    Con If-Match solo se aplica si el cliente no cambió desde ese ETag (si no, 412)
+    """
+    db_cliente = await db.get(Cliente, cliente_id)
+    if not db_cliente:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cliente no encontrado"
+        )
+
+    if versiones.precondicion_fallida(request.headers, versiones.etag_cliente(db_cliente)):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="El cliente fue modificado (el ETag no coincide con If-Match)"
+        )
+
+    update_data = cliente_update.model_dump(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_cliente, field, value)
+
+    try:
+        await db.commit()
+        # Los préstamos incluyen al cliente en su respuesta
+        prestamos_ids = (await db.scalars(select(Prestamo.id).where(Prestamo.cliente_id == cliente_id))).all()
+        cache.invalidar_cliente(cliente_id, prestamos_ids)
+        await db.refresh(db_cliente)
+        response.headers["ETag"] = versiones.etag_cliente(db_cliente)
+        return db_cliente
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Error de integridad en los datos"
+        )
+    except StaleDataError:
+        # Otra petición modificó el cliente entre la lectura y el UPDATE
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED if request.headers.get("if-match") else status.HTTP_409_CONFLICT,
+            detail="El cliente fue modificado por otra petición"
+        )
+
+@router.delete("/{cliente_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def eliminar_cliente(cliente_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Eliminar un cliente físicamente con eliminación en cascada
+    """
+    cliente = await db.get(Cliente, cliente_id)
+    if not cliente:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cliente no encontrado"
+        )
+
+    try:
+        # Eliminar pagos y préstamos del cliente
+        prestamos_ids = select(Prestamo.id).where(Prestamo.cliente_id == cliente_id)
+        await db.execute(
+            delete(Pago).where(Pago.prestamo_id.in_(prestamos_ids)).execution_options(synchronize_session=False)
+        )
+        prestamos_eliminados = (await db.scalars(
+            delete(Prestamo)
+            .where(Prestamo.cliente_id == cliente_id)
+            .returning(Prestamo.id)
+            .execution_options(synchronize_session=False)
+        )).all()
+
+        # Eliminar el cliente
+        await db.delete(cliente)
+        await db.commit()
+        cache.invalidar_cliente(cliente_id, prestamos_eliminados)
+
+        return None
+
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al eliminar el cliente: {str(e)}"
+        )
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException, status
+from services import trazas
+
+# Solo se incluye con TRAZAS_SQL=1 (ver main.py)
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+@router.get("/requests", response_model=list)
+def listar_peticiones(limit: int = 50):
+    """
+    Resumen de las últimas peticiones: consultas, tiempo en la base de datos y
+    sentencias repetidas (posibles N+1)
+    """
+    return [traza.resumen() for traza in trazas.recientes(limit)]
+
+@router.get("/requests/{request_id}", response_model=dict)
+def obtener_peticion(request_id: str):
+    """
+    Sentencias ejecutadas por una petición (valor de su cabecera X-Request-Id),
+    con duración y función de origen
+    """
+    traza = trazas.obtener(request_id)
+    if traza is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Petición no encontrada (solo se conservan las últimas)"
+        )
+    return traza.detalle()
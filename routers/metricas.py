@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Response
+from config import database, replicas
+from config.pool import estado_pool, presupuesto_conexiones
+from services import cache, metricas
+
+router = APIRouter(prefix="/metrics", tags=["metricas"])
+
+@router.get("", response_class=Response)
+def exportar_metricas():
+    """
+    Métricas en formato de texto de Prometheus, agregadas entre todos los workers:
+    latencia, tamaño de respuesta, consultas y tiempo de base de datos por ruta,
+    duración de las consultas y espera y uso del pool de conexiones
+    """
+    cuerpo, tipo = metricas.exportar()
+    return Response(content=cuerpo, media_type=tipo)
+
+@router.get("/pool", response_model=dict)
+def obtener_metricas_pool():
+    """
+    Estado del pool de conexiones de este worker: conexiones en uso, libres,
+    overflow y tiempos de espera acumulados; con réplicas, además su retraso
+    y las lecturas enviadas a cada una
+    """
+    metricas = {
+        "presupuesto": presupuesto_conexiones(database.MOTORES_POR_WORKER),
+        "configuracion": database.POOL_CONFIG,
+        "sync": estado_pool(database.engine),
+    }
+    if database.async_engine is not None:
+        metricas["async"] = estado_pool(database.async_engine.sync_engine)
+    if replicas.HABILITADO:
+        metricas["replicas"] = replicas.resumen()
+        for replica in replicas.REPLICAS:
+            estado = metricas["replicas"]["replicas"][replica.nombre]
+            estado["sync"] = estado_pool(replica.engine)
+            if replica.async_engine is not None:
+                estado["async"] = estado_pool(replica.async_engine.sync_engine)
+    return metricas
+
+@router.get("/cache", response_model=dict)
+def obtener_metricas_cache():
+    """
+    Estado de la caché de lectura de este worker: backend, entradas y
+    aciertos, fallos, cargas compartidas e invalidaciones por tipo de clave
+    """
+    return cache.resumen()
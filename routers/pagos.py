@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.orm.exc import StaleDataError
+from typing import List, Optional
 from config.database import get_db
+from config import replicas
+from config.replicas import get_db_lectura
 from models.models import Pago, Prestamo
-from schemas.schemas import PagoCreate, PagoUpdate, Pago as PagoSchema
-from services.prestamo_service import PrestamoService
-from sqlalchemy import func
+from schemas.schemas import PagoCreate, PagoUpdate, Pago as PagoSchema, ResultadoLotePagos
+from services.prestamo_service import PrestamoService, NoEncontrado
+from services.paginacion import aplicar_paginacion, recortar_pagina
+from services import cache, exportacion, importacion, lectura, particiones, versiones
 
 router = APIRouter(prefix="/pagos", tags=["pagos"])
 
@@ -17,20 +21,6 @@ def registrar_pago(
     """
     Registrar un pago de cuota
     """
-    # Verificar que el préstamo existe
-    prestamo = db.query(Prestamo).filter(Prestamo.id == pago_data.prestamo_id).first()
-    if not prestamo:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Préstamo no encontrado"
-        )
-    
-    if prestamo.estado in ["pagado", "cancelado"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No se pueden registrar pagos en un préstamo pagado o cancelado"
-        )
-    
     try:
         pago = PrestamoService.registrar_pago(
             db, 
@@ -39,6 +29,11 @@ def registrar_pago(
             pago_data.numero_cuota
         )
         return pago
+    except NoEncontrado as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -56,59 +51,154 @@ def obtener_pagos(
     limit: int = 100, 
     prestamo_id: int = None,
     estado: str = None,
-    db: Session = Depends(get_db)
+    after: Optional[str] = None,
+    db: Session = Depends(get_db_lectura)
 ):
     """
-    Obtener lista de pagos con filtros
+    Obtener lista de pagos con filtros, ordenados por fecha de vencimiento
+    Paginación por cursor: ?after=<valor de la cabecera X-Next-Cursor> (ignora skip)
     """
-    query = db.query(Pago)
+    # Solo lectura: filas de Core serializadas con orjson, sin objetos ORM
+    query = lectura.consulta_pagos()
     
     if prestamo_id:
-        query = query.filter(Pago.prestamo_id == prestamo_id)
+        query = query.where(Pago.prestamo_id == prestamo_id, particiones.ventana_prestamo(prestamo_id))
     
     if estado:
-        query = query.filter(Pago.estado == estado)
+        query = query.where(Pago.estado == estado)
     
-    pagos = query.offset(skip).limit(limit).all()
-    return pagos
+    orden = [Pago.fecha_vencimiento, Pago.id]
+    try:
+        query = aplicar_paginacion(query, orden, limit, skip, after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    filas, siguiente = recortar_pagina(db.execute(query).all(), orden, limit)
+    return lectura.respuesta(lectura.pagos(filas), siguiente)
+
+@router.post("/bulk", response_model=ResultadoLotePagos)
+def registrar_pagos_lote(
+    archivo: UploadFile = File(...),
+    formato: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Registrar pagos desde un archivo de conciliación bancaria (CSV o NDJSON)
+    Columnas: prestamo_id, numero_cuota, monto y opcionalmente fecha_pago (ISO 8601)
+    Las filas con errores se informan individualmente y no impiden aplicar el resto
+    """
+    try:
+        formato = importacion.detectar_formato(formato, archivo.filename, archivo.content_type)
+        filas = importacion.leer_pagos(archivo.file, formato)
+    except importacion.ArchivoDemasiadoGrande as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    resultados = PrestamoService.registrar_pagos_lote(db, filas)
+    
+    aplicados = sum(1 for r in resultados if "pago_id" in r)
+    return {
+        "procesados": len(resultados),
+        "aplicados": aplicados,
+        "rechazados": len(resultados) - aplicados,
+        "resultados": resultados
+    }
+
+@router.get("/export")
+def exportar_pagos(
+    request: Request,
+    formato: str = "csv",
+    prestamo_id: int = None,
+    estado: str = None
+):
+    """
+    Exportar pagos en CSV o NDJSON (mismos filtros que el listado)
+    La respuesta se genera en streaming desde un cursor del servidor
+    """
+    try:
+        return exportacion.crear_respuesta(
+            exportacion.consulta_pagos(prestamo_id, estado),
+            formato,
+            "pagos",
+            motor=replicas.motor_lectura(request)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 @router.get("/{pago_id}", response_model=PagoSchema)
-def obtener_pago(pago_id: int, db: Session = Depends(get_db)):
+def obtener_pago(pago_id: int, request: Request, response: Response, db: Session = Depends(get_db_lectura)):
     """
     Obtener un pago por ID
+    Responde 304 si If-None-Match coincide con el ETag actual
     """
+    # Solo la versión: con If-None-Match vigente no se carga la fila completa
+    version = db.execute(versiones.consulta_pago(pago_id)).first()
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pago no encontrado"
+        )
+    etag = versiones.etag(*version)
+    no_modificado = versiones.no_modificado(request.headers, etag)
+    if no_modificado:
+        return no_modificado
+    
     pago = db.query(Pago).filter(Pago.id == pago_id).first()
     if not pago:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pago no encontrado"
         )
+    response.headers["ETag"] = versiones.etag_pago(pago)
     return pago
 
 @router.get("/prestamo/{prestamo_id}", response_model=List[PagoSchema])
-def obtener_pagos_prestamo(prestamo_id: int, db: Session = Depends(get_db)):
+def obtener_pagos_prestamo(prestamo_id: int, request: Request, db: Session = Depends(get_db_lectura)):
     """
     Obtener todos los pagos de un préstamo específico
+    Responde 304 si If-None-Match coincide con el ETag actual (la versión del
+    préstamo sube con cualquier cambio en sus cuotas)
     """
-    # Verificar que el préstamo existe
-    prestamo = db.query(Prestamo).filter(Prestamo.id == prestamo_id).first()
-    if not prestamo:
+    # Verificar que el préstamo existe leyendo solo su versión
+    version = db.scalar(versiones.consulta_cuotas(prestamo_id))
+    if version is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Préstamo no encontrado"
         )
     
-    pagos = db.query(Pago).filter(Pago.prestamo_id == prestamo_id).all()
-    return pagos
+    etag = versiones.etag(version)
+    no_modificado = versiones.no_modificado(request.headers, etag)
+    if no_modificado:
+        return no_modificado
+    
+    filas = db.execute(lectura.consulta_pagos().where(Pago.prestamo_id == prestamo_id, particiones.ventana_prestamo(prestamo_id))).all()
+    return lectura.respuesta(lectura.pagos(filas), headers={"ETag": etag})
 
 @router.put("/{pago_id}", response_model=PagoSchema)
 def actualizar_pago(
     pago_id: int, 
-    pago_update: PagoUpdate, 
+    pago_update: PagoUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
     Actualizar un pago existente
+    Con If-Match solo se aplica si el pago no cambió desde ese ETag (si no, 412)
     """
     db_pago = db.query(Pago).filter(Pago.id == pago_id).first()
     if not db_pago:
@@ -124,12 +214,32 @@ def actualizar_pago(
             detail="No se puede modificar un pago ya realizado"
         )
     
-    update_data = pago_update.dict(exclude_unset=True)
+    if versiones.precondicion_fallida(request.headers, versiones.etag_pago(db_pago)):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="El pago fue modificado (el ETag no coincide con If-Match)"
+        )
+    
+    estado_anterior = db_pago.estado
+    update_data = pago_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_pago, field, value)
     
-    db.commit()
+    try:
+        # Mover la cuota entre los contadores del préstamo si cambió de estado
+        # (la sentencia sube siempre la versión del préstamo, que cubre sus cuotas)
+        db.execute(PrestamoService.sentencia_contadores(db_pago.prestamo_id, estado_anterior, db_pago.estado, db_pago.monto))
+        db.commit()
+    except StaleDataError:
+        # Otra petición modificó el pago entre la lectura y el UPDATE
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED if request.headers.get("if-match") else status.HTTP_409_CONFLICT,
+            detail="El pago fue modificado por otra petición"
+        )
+    cache.invalidar_prestamos([db_pago.prestamo_id])
     db.refresh(db_pago)
+    response.headers["ETag"] = versiones.etag_pago(db_pago)
     return db_pago
 
 @router.delete("/{pago_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -150,13 +260,15 @@ def eliminar_pago(pago_id: int, db: Session = Depends(get_db)):
             detail="No se puede eliminar un pago ya realizado"
         )
     
+    db.execute(PrestamoService.sentencia_contadores(pago.prestamo_id, pago.estado, None, pago.monto))
     db.delete(pago)
     db.commit()
+    cache.invalidar_prestamos([pago.prestamo_id])
     
     return None
 
 @router.get("/resumen/prestamo/{prestamo_id}", response_model=dict)
-def obtener_resumen_pagos_prestamo(prestamo_id: int, db: Session = Depends(get_db)):
+def obtener_resumen_pagos_prestamo(prestamo_id: int, db: Session = Depends(get_db_lectura)):
     """
     Obtener resumen de pagos de un préstamo
     """
@@ -168,34 +280,14 @@ def obtener_resumen_pagos_prestamo(prestamo_id: int, db: Session = Depends(get_d
             detail="Préstamo no encontrado"
         )
     
-    # Obtener estadísticas de pagos
-    total_pagos = db.query(Pago).filter(
-        Pago.prestamo_id == prestamo_id,
-        Pago.estado == "realizado"
-    ).count()
-    
-    total_pagado = db.query(Pago).filter(
-        Pago.prestamo_id == prestamo_id,
-        Pago.estado == "realizado"
-    ).with_entities(func.sum(Pago.monto)).scalar() or 0
-    
-    pagos_pendientes = db.query(Pago).filter(
-        Pago.prestamo_id == prestamo_id,
-        Pago.estado == "pendiente"
-    ).count()
-    
-    pagos_vencidos = db.query(Pago).filter(
-        Pago.prestamo_id == prestamo_id,
-        Pago.estado == "vencido"
-    ).count()
-    
+    # Los contadores se mantienen en el propio préstamo: una sola lectura por clave primaria
     return {
         "prestamo_id": prestamo_id,
         "monto_original": prestamo.monto,
-        "total_pagado": total_pagado,
-        "saldo_pendiente": prestamo.monto - total_pagado,
-        "cuotas_pagadas": total_pagos,
-        "cuotas_pendientes": pagos_pendientes,
-        "cuotas_vencidas": pagos_vencidos,
+        "total_pagado": prestamo.total_pagado,
+        "saldo_pendiente": prestamo.monto - prestamo.total_pagado,
+        "cuotas_pagadas": prestamo.cuotas_pagadas,
+        "cuotas_pendientes": prestamo.cuotas_pendientes,
+        "cuotas_vencidas": prestamo.cuotas_vencidas,
         "estado_prestamo": prestamo.estado
     }
@@ -0,0 +1,296 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+from typing import List, Optional
+from config.database import get_async_db
+from config import replicas
+from config.replicas import get_async_db_lectura
+from models.models import Pago, Prestamo
+from schemas.schemas import PagoCreate, PagoUpdate, Pago as PagoSchema, ResultadoLotePagos
+from services.prestamo_service import PrestamoService, NoEncontrado
+from services.prestamo_service_async import PrestamoServiceAsync
+from services.paginacion import aplicar_paginacion, recortar_pagina
+from services import cache, exportacion, importacion, lectura, particiones, versiones
+
+router = APIRouter(prefix="/pagos", tags=["pagos"])
+
+@router.post("/", response_model=PagoSchema, status_code=status.HTTP_201_CREATED)
+async def registrar_pago(
+    pago_data: PagoCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Registrar un pago de cuota
+    """
+    try:
+        pago = await PrestamoServiceAsync.registrar_pago(
+            db,
+            pago_data.prestamo_id,
+            pago_data.monto,
+            pago_data.numero_cuota
+        )
+        return pago
+    except NoEncontrado as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
+
+@router.get("/", response_model=List[PagoSchema])
+async def obtener_pagos(
+    skip: int = 0,
+    limit: int = 100,
+    prestamo_id: int = None,
+    estado: str = None,
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    """
+    Obtener lista de pagos con filtros, ordenados por fecha de vencimiento
+    Paginación por cursor: ?after=<valor de la cabecera X-Next-Cursor> (ignora skip)
+    """
+    # Solo lectura: filas de Core serializadas con orjson, sin objetos ORM
+    query = lectura.consulta_pagos()
+
+    if prestamo_id:
+        query = query.where(Pago.prestamo_id == prestamo_id, particiones.ventana_prestamo(prestamo_id))
+
+    if estado:
+        query = query.where(Pago.estado == estado)
+
+    orden = [Pago.fecha_vencimiento, Pago.id]
+    try:
+        query = aplicar_paginacion(query, orden, limit, skip, after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    result = await db.execute(query)
+    filas, siguiente = recortar_pagina(result.all(), orden, limit)
+    return lectura.respuesta(lectura.pagos(filas), siguiente)
+
+@router.post("/bulk", response_model=ResultadoLotePagos)
+async def registrar_pagos_lote(
+    archivo: UploadFile = File(...),
+    formato: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Registrar pagos desde un archivo de conciliación bancaria (CSV o NDJSON)
+    Columnas: prestamo_id, numero_cuota, monto y opcionalmente fecha_pago (ISO 8601)
+    Las filas con errores se informan individualmente y no impiden aplicar el resto
+    """
+    try:
+        formato = importacion.detectar_formato(formato, archivo.filename, archivo.content_type)
+        filas = await run_in_threadpool(importacion.leer_pagos, archivo.file, formato)
+    except importacion.ArchivoDemasiadoGrande as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    resultados = await db.run_sync(PrestamoService.registrar_pagos_lote, filas)
+
+    aplicados = sum(1 for r in resultados if "pago_id" in r)
+    return {
+        "procesados": len(resultados),
+        "aplicados": aplicados,
+        "rechazados": len(resultados) - aplicados,
+        "resultados": resultados
+    }
+
+@router.get("/export")
+def exportar_pagos(
+    request: Request,
+    formato: str = "csv",
+    prestamo_id: int = None,
+    estado: str = None
+):
+    """
+    Exportar pagos en CSV o NDJSON (mismos filtros que el listado)
+    La respuesta se genera en streaming desde un cursor del servidor
+    """
+    try:
+        return exportacion.crear_respuesta(
+            exportacion.consulta_pagos(prestamo_id, estado),
+            formato,
+            "pagos",
+            motor=replicas.motor_lectura(request)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/{pago_id}", response_model=PagoSchema)
+async def obtener_pago(pago_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db_lectura)):
+    """
+    Obtener un pago por ID
+    Responde 304 si If-None-Match coincide con el ETag actual
+    """
+    # Solo la versión: con If-None-Match vigente no se carga la fila completa
+    version = (await db.execute(versiones.consulta_pago(pago_id))).first()
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pago no encontrado"
+        )
+    etag = versiones.etag(*version)
+    no_modificado = versiones.no_modificado(request.headers, etag)
+    if no_modificado:
+        return no_modificado
+
+    pago = await db.get(Pago, pago_id)
+    if not pago:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pago no encontrado"
+        )
+    response.headers["ETag"] = versiones.etag_pago(pago)
+    return pago
+
+@router.get("/prestamo/{prestamo_id}", response_model=List[PagoSchema])
+async def obtener_pagos_prestamo(prestamo_id: int, request: Request, db: AsyncSession = Depends(get_async_db_lectura)):
+    """
+    Obtener todos los pagos de un préstamo específico
+    Responde 304 si If-None-Match coincide con el ETag actual (la versión del
+    préstamo sube con cualquier cambio en sus cuotas)
+    """
+    # Verificar que el préstamo existe leyendo solo su versión
+    version = await db.scalar(versiones.consulta_cuotas(prestamo_id))
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Préstamo no encontrado"
+        )
+
+    etag = versiones.etag(version)
+    no_modificado = versiones.no_modificado(request.headers, etag)
+    if no_modificado:
+        return no_modificado
+
+    result = await db.execute(lectura.consulta_pagos().where(Pago.prestamo_id == prestamo_id, particiones.ventana_prestamo(prestamo_id)))
+    return lectura.respuesta(lectura.pagos(result.all()), headers={"ETag": etag})
+
+@router.put("/{pago_id}", response_model=PagoSchema)
+async def actualizar_pago(
+    pago_id: int,
+    pago_update: PagoUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Actualizar un pago existente
+    Con If-Match solo se aplica si el pago no cambió desde ese ETag (si no, 412)
+    """
+    db_pago = await db.get(Pago, pago_id)
+    if not db_pago:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pago no encontrado"
+        )
+
+    # Solo permitir actualizar el estado si no está realizado
+    if db_pago.estado == "realizado":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No se puede modificar un pago ya realizado"
+        )
+
+    if versiones.precondicion_fallida(request.headers, versiones.etag_pago(db_pago)):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="El pago fue modificado (el ETag no coincide con If-Match)"
+        )
+
+    estado_anterior = db_pago.estado
+    update_data = pago_update.model_dump(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_pago, field, value)
+
+    try:
+        # Mover la cuota entre los contadores del préstamo si cambió de estado
+        # (la sentencia sube siempre la versión del préstamo, que cubre sus cuotas)
+        await db.execute(PrestamoService.sentencia_contadores(db_pago.prestamo_id, estado_anterior, db_pago.estado, db_pago.monto))
+        await db.commit()
+    except StaleDataError:
+        # Otra petición modificó el pago entre la lectura y el UPDATE
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED if request.headers.get("if-match") else status.HTTP_409_CONFLICT,
+            detail="El pago fue modificado por otra petición"
+        )
+    cache.invalidar_prestamos([db_pago.prestamo_id])
+    await db.refresh(db_pago)
+    response.headers["ETag"] = versiones.etag_pago(db_pago)
+    return db_pago
+
+@router.delete("/{pago_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def eliminar_pago(pago_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Eliminar un pago (solo si no está realizado)
+    """
+    pago = await db.get(Pago, pago_id)
+    if not pago:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pago no encontrado"
+        )
+
+    if pago.estado == "realizado":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No se puede eliminar un pago ya realizado"
+        )
+
+    await db.execute(PrestamoService.sentencia_contadores(pago.prestamo_id, pago.estado, None, pago.monto))
+    await db.delete(pago)
+    await db.commit()
+    cache.invalidar_prestamos([pago.prestamo_id])
+
+    return None
+
+@router.get("/resumen/prestamo/{prestamo_id}", response_model=dict)
+async def obtener_resumen_pagos_prestamo(prestamo_id: int, db: AsyncSession = Depends(get_async_db_lectura)):
+    """
+    Obtener resumen de pagos de un préstamo
+    """
+    # Verificar que el préstamo existe
+    prestamo = await db.get(Prestamo, prestamo_id)
+    if not prestamo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Préstamo no encontrado"
+        )
+
+    # Los contadores se mantienen en el propio préstamo: una sola lectura por clave primaria
+    return {
+        "prestamo_id": prestamo_id,
+        "monto_original": prestamo.monto,
+        "total_pagado": prestamo.total_pagado,
+        "saldo_pendiente": prestamo.monto - prestamo.total_pagado,
+        "cuotas_pagadas": prestamo.cuotas_pagadas,
+        "cuotas_pendientes": prestamo.cuotas_pendientes,
+        "cuotas_vencidas": prestamo.cuotas_vencidas,
+        "estado_prestamo": prestamo.estado
+    }
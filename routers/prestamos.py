@@ -1,13 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from typing import List, Optional
 from config.database import get_db
+from config import replicas
+from config.replicas import get_db_lectura
 from models.models import Prestamo, Cliente
-from schemas.schemas import PrestamoCreate, PrestamoUpdate, Prestamo as PrestamoSchema, PrestamoConPagos, CalculoCuota
+from schemas.schemas import PrestamoCreate, PrestamoUpdate, Prestamo as PrestamoSchema, PrestamoConPagos, CalculoCuota, ResultadoLotePrestamos
+from schemas.schemas import CalculoCuotaLote, CalculoCuotaDetallado
 from services.prestamo_service import PrestamoService
+from services import exportacion
+from services import cache, lectura, versiones
+from services.paginacion import aplicar_paginacion, recortar_pagina
 
 router = APIRouter(prefix="/prestamos", tags=["prestamos"])
 
+logger = logging.getLogger(__name__)
+
+# Máximo de préstamos aceptados en una petición de originación masiva
+MAX_LOTE_PRESTAMOS = 5000
+
+def _etag_prestamo(db: Session, prestamo_id: int) -> str:
+    """
+    ETag actual del préstamo leyendo solo las versiones (404 si no existe)
+    """
+    version = db.execute(versiones.consulta_prestamo(prestamo_id)).first()
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Préstamo no encontrado"
+        )
+    return versiones.etag(*version)
+
 @router.post("/", response_model=PrestamoSchema, status_code=status.HTTP_201_CREATED)
 def crear_prestamo(prestamo: PrestamoCreate, db: Session = Depends(get_db)):
     """
@@ -36,76 +62,199 @@ def crear_prestamo(prestamo: PrestamoCreate, db: Session = Depends(get_db)):
             detail=str(e)
         )
 
+@router.post("/batch", response_model=ResultadoLotePrestamos)
+def crear_prestamos_lote(prestamos: List[PrestamoCreate], db: Session = Depends(get_db)):
+    """
+    Crear varios préstamos en una sola transacción
+    Los elementos con errores (cliente inexistente o inactivo) se informan
+    individualmente y no impiden la creación del resto
+    """
+    if len(prestamos) > MAX_LOTE_PRESTAMOS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El lote no puede superar {MAX_LOTE_PRESTAMOS} préstamos"
+        )
+    
+    try:
+        resultados = PrestamoService.crear_prestamos_lote(db, prestamos)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception:
+        # Errores de la base de datos: el detalle queda en el log, no en la respuesta
+        logger.exception("Error al crear un lote de %d préstamos", len(prestamos))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
+    
+    creados = sum(1 for r in resultados if "prestamo_id" in r)
+    return {
+        "creados": creados,
+        "rechazados": len(resultados) - creados,
+        "resultados": resultados
+    }
+
 @router.get("/", response_model=List[PrestamoSchema])
 def obtener_prestamos(
     skip: int = 0, 
     limit: int = 100, 
     estado: str = None,
     cliente_id: int = None,
-    db: Session = Depends(get_db)
+    after: Optional[str] = None,
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Obtener lista de préstamos con filtros
+    Paginación por cursor: ?after=<valor de la cabecera X-Next-Cursor> (ignora skip)
     """
-    query = db.query(Prestamo)
+    # Solo lectura: el cliente embebido llega en la misma fila (JOIN) y se serializa con orjson
+    query = lectura.consulta_prestamos()
     
     if estado:
-        query = query.filter(Prestamo.estado == estado)
+        query = query.where(Prestamo.estado == estado)
     
     if cliente_id:
-        query = query.filter(Prestamo.cliente_id == cliente_id)
+        query = query.where(Prestamo.cliente_id == cliente_id)
     
-    prestamos = query.offset(skip).limit(limit).all()
-    return prestamos
+    orden = [Prestamo.id]
+    try:
+        query = aplicar_paginacion(query, orden, limit, skip, after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    filas, siguiente = recortar_pagina(db.execute(query).all(), orden, limit)
+    return lectura.respuesta(lectura.prestamos(filas), siguiente)
 
-@router.get("/{prestamo_id}", response_model=PrestamoSchema)
-def obtener_prestamo(prestamo_id: int, db: Session = Depends(get_db)):
+@router.get("/export")
+def exportar_prestamos(
+    request: Request,
+    formato: str = "csv",
+    estado: str = None,
+    cliente_id: int = None
+):
     """
-    Obtener un préstamo por ID
+    Exportar préstamos en CSV o NDJSON (mismos filtros que el listado)
+    La respuesta se genera en streaming desde un cursor del servidor
     """
-    prestamo = db.query(Prestamo).filter(Prestamo.id == prestamo_id).first()
-    if not prestamo:
+    try:
+        return exportacion.crear_respuesta(
+            exportacion.consulta_prestamos(estado, cliente_id),
+            formato,
+            "prestamos",
+            motor=replicas.motor_lectura(request)
+        )
+    except ValueError as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Préstamo no encontrado"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-    return prestamo
+
+@router.get("/{prestamo_id}", response_model=PrestamoSchema)
+def obtener_prestamo(prestamo_id: int, request: Request, db: Session = Depends(get_db_lectura)):
+    """
+    Obtener un préstamo por ID (servido desde la caché de lectura)
+    Responde 304 si If-None-Match coincide con el ETag actual
+    """
+    etag = _etag_prestamo(db, prestamo_id)
+    no_modificado = versiones.no_modificado(request.headers, etag)
+    if no_modificado:
+        return no_modificado
+    
+    def cargar():
+        prestamo = db.query(Prestamo).options(joinedload(Prestamo.cliente)).filter(Prestamo.id == prestamo_id).first()
+        if not prestamo:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Préstamo no encontrado"
+            )
+        return {
+            "etag": versiones.etag_prestamo(prestamo),
+            "datos": PrestamoSchema.model_validate(prestamo).model_dump(mode="json"),
+        }
+    
+    # El valor en caché ya está validado: se omite la revalidación del response_model
+    valor = cache.obtener_vigente(cache.clave_de(cache.PRESTAMO, prestamo_id), etag, cargar)
+    return lectura.respuesta(valor["datos"], headers={"ETag": valor["etag"]})
 
 @router.get("/{prestamo_id}/detalle", response_model=PrestamoConPagos)
-def obtener_prestamo_con_pagos(prestamo_id: int, db: Session = Depends(get_db)):
+def obtener_prestamo_con_pagos(prestamo_id: int, request: Request, db: Session = Depends(get_db_lectura)):
     """
-    Obtener un préstamo con todos sus pagos
+    Obtener un préstamo con todos sus pagos (servido desde la caché de lectura)
+    Responde 304 si If-None-Match coincide con el ETag actual (cualquier cambio
+    en las cuotas sube la versión del préstamo)
     """
-    prestamo = db.query(Prestamo).filter(Prestamo.id == prestamo_id).first()
-    if not prestamo:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Préstamo no encontrado"
+    etag = _etag_prestamo(db, prestamo_id)
+    no_modificado = versiones.no_modificado(request.headers, etag)
+    if no_modificado:
+        return no_modificado
+    
+    def cargar():
+        prestamo = (
+            db.query(Prestamo)
+            .options(joinedload(Prestamo.cliente), selectinload(Prestamo.pagos))
+            .filter(Prestamo.id == prestamo_id)
+            .first()
         )
-    return prestamo
+        if not prestamo:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Préstamo no encontrado"
+            )
+        return {
+            "etag": versiones.etag_prestamo(prestamo),
+            "datos": PrestamoConPagos.model_validate(prestamo).model_dump(mode="json"),
+        }
+    
+    valor = cache.obtener_vigente(cache.clave_de(cache.PRESTAMO_DETALLE, prestamo_id), etag, cargar)
+    return lectura.respuesta(valor["datos"], headers={"ETag": valor["etag"]})
 
 @router.put("/{prestamo_id}", response_model=PrestamoSchema)
 def actualizar_prestamo(
     prestamo_id: int, 
     prestamo_update: PrestamoUpdate, 
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
     Actualizar un préstamo existente
+    Con If-Match solo se aplica si el préstamo no cambió desde ese ETag (si no, 412)
     """
-    db_prestamo = db.query(Prestamo).filter(Prestamo.id == prestamo_id).first()
+    db_prestamo = db.query(Prestamo).options(joinedload(Prestamo.cliente)).filter(Prestamo.id == prestamo_id).first()
     if not db_prestamo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Préstamo no encontrado"
         )
     
-    update_data = prestamo_update.dict(exclude_unset=True)
+    if versiones.precondicion_fallida(request.headers, versiones.etag_prestamo(db_prestamo)):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="El préstamo fue modificado (el ETag no coincide con If-Match)"
+        )
+    
+    update_data = prestamo_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_prestamo, field, value)
     
-    db.commit()
+    try:
+        db.commit()
+    except StaleDataError:
+        # Otra petición modificó el préstamo entre la lectura y el UPDATE
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED if request.headers.get("if-match") else status.HTTP_409_CONFLICT,
+            detail="El préstamo fue modificado por otra petición"
+        )
+    cache.invalidar_prestamos([prestamo_id])
     db.refresh(db_prestamo)
+    response.headers["ETag"] = versiones.etag_prestamo(db_prestamo)
     return db_prestamo
 
 @router.delete("/{prestamo_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -128,11 +277,12 @@ def eliminar_prestamo(prestamo_id: int, db: Session = Depends(get_db)):
     
     prestamo.estado = "cancelado"
     db.commit()
+    cache.invalidar_prestamos([prestamo_id])
     
     return None
 
 @router.get("/{prestamo_id}/saldo", response_model=dict)
-def obtener_saldo_prestamo(prestamo_id: int, db: Session = Depends(get_db)):
+def obtener_saldo_prestamo(prestamo_id: int, db: Session = Depends(get_db_lectura)):
     """
     Obtener el saldo pendiente de un préstamo
     """
@@ -158,7 +308,7 @@ def actualizar_estado_prestamo(prestamo_id: int, db: Session = Depends(get_db)):
     """
     Actualizar el estado del préstamo basado en pagos y fechas
     """
-    prestamo = db.query(Prestamo).filter(Prestamo.id == prestamo_id).first()
+    prestamo = db.query(Prestamo).options(joinedload(Prestamo.cliente)).filter(Prestamo.id == prestamo_id).first()
     if not prestamo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -184,3 +334,28 @@ def calcular_cuota(monto: float, tasa_interes: float, plazo_meses: int):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+
+@router.post("/calcular-cuota/batch", response_model=List[CalculoCuotaDetallado])
+def calcular_cuotas_lote(calculo: CalculoCuotaLote):
+    """
+    Calcular cuotas para muchas combinaciones de (monto, tasa, plazo) a la vez
+    Con incluir_cronograma=true devuelve además el cronograma completo
+    (cuota, interés, capital y saldo de cada período)
+    """
+    # NumPy se importa en la primera cotización por lotes, no al arrancar el worker
+    from services import amortizacion
+    
+    try:
+        cotizaciones = amortizacion.cotizaciones(
+            calculo.montos,
+            calculo.tasas_interes,
+            calculo.plazos_meses,
+            calculo.incluir_cronograma
+        )
+        # Los valores ya son tipos nativos: se omite la revalidación del response_model
+        return JSONResponse(content=cotizaciones)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
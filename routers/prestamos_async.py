@@ -0,0 +1,360 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from typing import List, Optional
+from config.database import get_async_db
+from config import replicas
+from config.replicas import get_async_db_lectura
+from models.models import Prestamo, Cliente
+from schemas.schemas import PrestamoCreate, PrestamoUpdate, Prestamo as PrestamoSchema, PrestamoConPagos, CalculoCuota, ResultadoLotePrestamos
+from schemas.schemas import CalculoCuotaLote, CalculoCuotaDetallado
+from services.prestamo_service_async import PrestamoServiceAsync
+from services import exportacion
+from services import cache
+from services import lectura
+from services import versiones
+from services.paginacion import aplicar_paginacion, recortar_pagina
+from routers.prestamos import MAX_LOTE_PRESTAMOS
+
+router = APIRouter(prefix="/prestamos", tags=["prestamos"])
+
+logger = logging.getLogger(__name__)
+
+async def _cargar_prestamo(db: AsyncSession, prestamo_id: int, *relaciones) -> Prestamo:
+    """
+    Carga un préstamo con su cliente (y las relaciones adicionales indicadas)
+    para poder serializarlo sin carga perezosa
+    """
+    opciones = [joinedload(Prestamo.cliente)] + [selectinload(r) for r in relaciones]
+    prestamo = await db.scalar(
+        select(Prestamo)
+        .options(*opciones)
+        .where(Prestamo.id == prestamo_id)
+        .execution_options(populate_existing=True)
+    )
+    if not prestamo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Préstamo no encontrado"
+        )
+    return prestamo
+
+async def _etag_prestamo(db: AsyncSession, prestamo_id: int) -> str:
+    """
+    ETag actual del préstamo leyendo solo las versiones (404 si no existe)
+    """
+    version = (await db.execute(versiones.consulta_prestamo(prestamo_id))).first()
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Préstamo no encontrado"
+        )
+    return versiones.etag(*version)
+
+@router.post("/", response_model=PrestamoSchema, status_code=status.HTTP_201_CREATED)
+async def crear_prestamo(prestamo: PrestamoCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Crear un nuevo préstamo
+    """
+    # Verificar que el cliente existe
+    cliente = await db.get(Cliente, prestamo.cliente_id)
+    if not cliente:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cliente no encontrado"
+        )
+
+    if not cliente.activo:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El cliente no está activo"
+        )
+
+    try:
+        nuevo_prestamo = await PrestamoServiceAsync.crear_prestamo(db, prestamo)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return await _cargar_prestamo(db, nuevo_prestamo.id)
+
+@router.post("/batch", response_model=ResultadoLotePrestamos)
+async def crear_prestamos_lote(prestamos: List[PrestamoCreate], db: AsyncSession = Depends(get_async_db)):
+    """
+    Crear varios préstamos en una sola transacción
+    Los elementos con errores (cliente inexistente o inactivo) se informan
+    individualmente y no impiden la creación del resto
+    """
+    if len(prestamos) > MAX_LOTE_PRESTAMOS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El lote no puede superar {MAX_LOTE_PRESTAMOS} préstamos"
+        )
+
+    try:
+        resultados = await PrestamoServiceAsync.crear_prestamos_lote(db, prestamos)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception:
+        # Errores de la base de datos: el detalle queda en el log, no en la respuesta
+        logger.exception("Error al crear un lote de %d préstamos", len(prestamos))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
+
+    creados = sum(1 for r in resultados if "prestamo_id" in r)
+    return {
+        "creados": creados,
+        "rechazados": len(resultados) - creados,
+        "resultados": resultados
+    }
+
+@router.get("/", response_model=List[PrestamoSchema])
+async def obtener_prestamos(
+    skip: int = 0,
+    limit: int = 100,
+    estado: str = None,
+    cliente_id: int = None,
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db_lectura)
+):
+    """
+    Obtener lista de préstamos con filtros
+    Paginación por cursor: ?after=<valor de la cabecera X-Next-Cursor> (ignora skip)
+    """
+    # Solo lectura: el cliente embebido llega en la misma fila (JOIN) y se serializa con orjson
+    query = lectura.consulta_prestamos()
+
+    if estado:
+        query = query.where(Prestamo.estado == estado)
+
+    if cliente_id:
+        query = query.where(Prestamo.cliente_id == cliente_id)
+
+    orden = [Prestamo.id]
+    try:
+        query = aplicar_paginacion(query, orden, limit, skip, after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    result = await db.execute(query)
+    filas, siguiente = recortar_pagina(result.all(), orden, limit)
+    return lectura.respuesta(lectura.prestamos(filas), siguiente)
+
+@router.get("/export")
+def exportar_prestamos(
+    request: Request,
+    formato: str = "csv",
+    estado: str = None,
+    cliente_id: int = None
+):
+    """
+    Exportar préstamos en CSV o NDJSON (mismos filtros que el listado)
+    La respuesta se genera en streaming desde un cursor del servidor
+    """
+    try:
+        return exportacion.crear_respuesta(
+            exportacion.consulta_prestamos(estado, cliente_id),
+            formato,
+            "prestamos",
+            motor=replicas.motor_lectura(request)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/{prestamo_id}", response_model=PrestamoSchema)
+async def obtener_prestamo(prestamo_id: int, request: Request, db: AsyncSession = Depends(get_async_db_lectura)):
+    """
+    Obtener un préstamo por ID (servido desde la caché de lectura)
+    Responde 304 si If-None-Match coincide con el ETag actual
+    """
+    etag = await _etag_prestamo(db, prestamo_id)
+    no_modificado = versiones.no_modificado(request.headers, etag)
+    if no_modificado:
+        return no_modificado
+
+    async def cargar():
+        prestamo = await _cargar_prestamo(db, prestamo_id)
+        return {
+            "etag": versiones.etag_prestamo(prestamo),
+            "datos": PrestamoSchema.model_validate(prestamo).model_dump(mode="json"),
+        }
+
+    # El valor en caché ya está validado: se omite la revalidación del response_model
+    valor = await cache.obtener_vigente_async(cache.clave_de(cache.PRESTAMO, prestamo_id), etag, cargar)
+    return lectura.respuesta(valor["datos"], headers={"ETag": valor["etag"]})
+
+@router.get("/{prestamo_id}/detalle", response_model=PrestamoConPagos)
+async def obtener_prestamo_con_pagos(prestamo_id: int, request: Request, db: AsyncSession = Depends(get_async_db_lectura)):
+    """
+    Obtener un préstamo con todos sus pagos (servido desde la caché de lectura)
+    Responde 304 si If-None-Match coincide con el ETag actual (cualquier cambio
+    en las cuotas sube la versión del préstamo)
+    """
+    etag = await _etag_prestamo(db, prestamo_id)
+    no_modificado = versiones.no_modificado(request.headers, etag)
+    if no_modificado:
+        return no_modificado
+
+    async def cargar():
+        prestamo = await _cargar_prestamo(db, prestamo_id, Prestamo.pagos)
+        return {
+            "etag": versiones.etag_prestamo(prestamo),
+            "datos": PrestamoConPagos.model_validate(prestamo).model_dump(mode="json"),
+        }
+
+    valor = await cache.obtener_vigente_async(cache.clave_de(cache.PRESTAMO_DETALLE, prestamo_id), etag, cargar)
+    return lectura.respuesta(valor["datos"], headers={"ETag": valor["etag"]})
+
+@router.put("/{prestamo_id}", response_model=PrestamoSchema)
+async def actualizar_prestamo(
+    prestamo_id: int,
+    prestamo_update: PrestamoUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Actualizar un préstamo existente
+    Con If-Match solo se aplica si el préstamo no cambió desde ese ETag (si no, 412)
+    """
+    db_prestamo = await _cargar_prestamo(db, prestamo_id)
+
+    if versiones.precondicion_fallida(request.headers, versiones.etag_prestamo(db_prestamo)):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="El préstamo fue modificado (el ETag no coincide con If-Match)"
+        )
+
+    update_data = prestamo_update.model_dump(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_prestamo, field, value)
+
+    try:
+        await db.commit()
+    except StaleDataError:
+        # Otra petición modificó el préstamo entre la lectura y el UPDATE
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED if request.headers.get("if-match") else status.HTTP_409_CONFLICT,
+            detail="El préstamo fue modificado por otra petición"
+        )
+    cache.invalidar_prestamos([prestamo_id])
+    db_prestamo = await _cargar_prestamo(db, prestamo_id)
+    response.headers["ETag"] = versiones.etag_prestamo(db_prestamo)
+    return db_prestamo
+
+@router.delete("/{prestamo_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def eliminar_prestamo(prestamo_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Cancelar un préstamo (marcar como cancelado)
+    """
+    prestamo = await db.get(Prestamo, prestamo_id)
+    if not prestamo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Préstamo no encontrado"
+        )
+
+    if prestamo.estado in ["pagado", "cancelado"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No se puede cancelar un préstamo ya pagado o cancelado"
+        )
+
+    prestamo.estado = "cancelado"
+    await db.commit()
+    cache.invalidar_prestamos([prestamo_id])
+
+    return None
+
+@router.get("/{prestamo_id}/saldo", response_model=dict)
+async def obtener_saldo_prestamo(prestamo_id: int, db: AsyncSession = Depends(get_async_db_lectura)):
+    """
+    Obtener el saldo pendiente de un préstamo
+    """
+    prestamo = await db.get(Prestamo, prestamo_id)
+    if not prestamo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Préstamo no encontrado"
+        )
+
+    saldo = await PrestamoServiceAsync.calcular_saldo_pendiente(db, prestamo_id)
+
+    return {
+        "prestamo_id": prestamo_id,
+        "monto_original": prestamo.monto,
+        "saldo_pendiente": saldo,
+        "total_pagado": prestamo.monto - saldo,
+        "estado": prestamo.estado
+    }
+
+@router.post("/{prestamo_id}/actualizar-estado", response_model=PrestamoSchema)
+async def actualizar_estado_prestamo(prestamo_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Actualizar el estado del préstamo basado en pagos y fechas
+    """
+    await _cargar_prestamo(db, prestamo_id)
+
+    await PrestamoServiceAsync.actualizar_estado_prestamo(db, prestamo_id)
+
+    # Recargar el préstamo para obtener el estado actualizado
+    return await _cargar_prestamo(db, prestamo_id)
+
+@router.post("/calcular-cuota", response_model=CalculoCuota)
+async def calcular_cuota(monto: float, tasa_interes: float, plazo_meses: int):
+    """
+    Calcular cuota mensual para un préstamo
+    """
+    try:
+        calculo = PrestamoServiceAsync.calcular_cuota_mensual(monto, tasa_interes, plazo_meses)
+        return calculo
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.post("/calcular-cuota/batch", response_model=List[CalculoCuotaDetallado])
+async def calcular_cuotas_lote(calculo: CalculoCuotaLote):
+    """
+    Calcular cuotas para muchas combinaciones de (monto, tasa, plazo) a la vez
+    Con incluir_cronograma=true devuelve además el cronograma completo
+    (cuota, interés, capital y saldo de cada período)
+    """
+    # NumPy se importa en la primera cotización por lotes, no al arrancar el worker
+    from services import amortizacion
+    
+    try:
+        # Cálculo de CPU con NumPy: en un hilo para no bloquear el bucle de eventos
+        cotizaciones = await run_in_threadpool(
+            amortizacion.cotizaciones,
+            calculo.montos,
+            calculo.tasas_interes,
+            calculo.plazos_meses,
+            calculo.incluir_cronograma
+        )
+        # Los valores ya son tipos nativos: se omite la revalidación del response_model
+        return JSONResponse(content=cotizaciones)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
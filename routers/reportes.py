@@ -0,0 +1,41 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from config import replicas
+from config.database import engine
+from services import reportes
+
+router = APIRouter(prefix="/reportes", tags=["reportes"])
+
+@router.get("/cartera", response_model=dict)
+def obtener_reporte_cartera(
+    request: Request,
+    fecha: Optional[date] = Query(None, description="Fecha del resumen (por defecto, el último)"),
+    en_vivo: bool = Query(False, description="Calcular sobre préstamos y cuotas en lugar de leer los resúmenes")
+):
+    """
+    Reporte de la cartera: PAR30/60/90, saldo por tramo de mora, por estado y
+    por mes de originación, y tasas de cobranza. Se lee de los resúmenes
+    diarios (POST /reportes/cartera/refresco o el barrido programado).
+    """
+    if fecha is not None and en_vivo:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="en_vivo calcula la cartera de hoy: no admite fecha"
+        )
+    try:
+        return reportes.reporte_cartera(replicas.motor_lectura(request), fecha=fecha, en_vivo=en_vivo)
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+@router.post("/cartera/refresco", response_model=dict)
+def refrescar_reporte_cartera(completo: bool = Query(False, description="Reconstruir la cobranza desde el inicio")):
+    """
+    Guardar la foto de la cartera de hoy y actualizar la cobranza de los días
+    con cambios desde el último refresco
+    """
+    try:
+        return reportes.refrescar(engine, completo=completo)
+    except reportes.RefrescoEnCurso as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
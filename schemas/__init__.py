@@ -2,12 +2,20 @@ from .schemas import (
     ClienteCreate, ClienteUpdate, Cliente,
     PrestamoCreate, PrestamoUpdate, Prestamo,
     PagoCreate, PagoUpdate, Pago,
-    ClienteConPrestamos, PrestamoConPagos, CalculoCuota
+    ClienteConPrestamos, PrestamoConPagos, CalculoCuota, ClienteBusqueda,
+    ResultadoPrestamoLote, ResultadoLotePrestamos,
+    ResultadoPagoLote, ResultadoLotePagos,
+    ResultadoClienteLote, ResultadoLoteClientes,
+    CuotaCronograma, CalculoCuotaDetallado, CalculoCuotaLote
 )
 
 __all__ = [
     "ClienteCreate", "ClienteUpdate", "Cliente",
     "PrestamoCreate", "PrestamoUpdate", "Prestamo",
     "PagoCreate", "PagoUpdate", "Pago",
-    "ClienteConPrestamos", "PrestamoConPagos", "CalculoCuota"
+    "ClienteConPrestamos", "PrestamoConPagos", "CalculoCuota", "ClienteBusqueda",
+    "ResultadoPrestamoLote", "ResultadoLotePrestamos",
+    "ResultadoPagoLote", "ResultadoLotePagos",
+    "ResultadoClienteLote", "ResultadoLoteClientes",
+    "CuotaCronograma", "CalculoCuotaDetallado", "CalculoCuotaLote"
 ]
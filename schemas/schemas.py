@@ -1,4 +1,4 @@
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, ConfigDict, field_validator
 from typing import Optional, List
 from datetime import datetime
 from models.models import EstadoPrestamo, EstadoPago
@@ -28,8 +28,7 @@ class Cliente(ClienteBase):
     fecha_registro: datetime
     activo: bool
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Esquemas para Préstamo
 class PrestamoBase(BaseModel):
@@ -38,19 +37,22 @@ class PrestamoBase(BaseModel):
     tasa_interes: float
     plazo_meses: int
     
-    @validator('monto')
+    @field_validator('monto')
+    @classmethod
     def monto_must_be_positive(cls, v):
         if v <= 0:
             raise ValueError('El monto debe ser mayor a 0')
         return v
     
-    @validator('tasa_interes')
+    @field_validator('tasa_interes')
+    @classmethod
     def tasa_must_be_positive(cls, v):
         if v <= 0:
             raise ValueError('La tasa de interés debe ser mayor a 0')
         return v
     
-    @validator('plazo_meses')
+    @field_validator('plazo_meses')
+    @classmethod
     def plazo_must_be_positive(cls, v):
         if v <= 0:
             raise ValueError('El plazo debe ser mayor a 0')
@@ -72,8 +74,7 @@ class Prestamo(PrestamoBase):
     cuota_mensual: float
     cliente: Cliente
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Esquemas para Pago
 class PagoBase(BaseModel):
@@ -82,7 +83,8 @@ class PagoBase(BaseModel):
     fecha_vencimiento: datetime
     numero_cuota: int
     
-    @validator('monto')
+    @field_validator('monto')
+    @classmethod
     def monto_must_be_positive(cls, v):
         if v <= 0:
             raise ValueError('El monto debe ser mayor a 0')
@@ -100,8 +102,7 @@ class Pago(PagoBase):
     fecha_pago: Optional[datetime]
     estado: EstadoPago
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Esquemas para respuestas
 class PrestamoConPagos(Prestamo):
@@ -110,6 +111,55 @@ class PrestamoConPagos(Prestamo):
 class ClienteConPrestamos(Cliente):
     prestamos: List[Prestamo]
 
+class ClienteBusqueda(Cliente):
+    # Relevancia entre 0 y 1 (1 = documento exacto)
+    puntuacion: float
+
+# Esquemas para originación masiva
+class ResultadoPrestamoLote(BaseModel):
+    indice: int
+    cliente_id: int
+    prestamo_id: Optional[int] = None
+    cuota_mensual: Optional[float] = None
+    error: Optional[str] = None
+
+class ResultadoLotePrestamos(BaseModel):
+    creados: int
+    rechazados: int
+    resultados: List[ResultadoPrestamoLote]
+
+# Esquemas para la carga masiva de pagos
+class ResultadoPagoLote(BaseModel):
+    linea: int
+    prestamo_id: Optional[int] = None
+    numero_cuota: Optional[int] = None
+    pago_id: Optional[int] = None
+    error: Optional[str] = None
+
+class ResultadoLotePagos(BaseModel):
+    procesados: int
+    aplicados: int
+    rechazados: int
+    resultados: List[ResultadoPagoLote]
+
+# Esquemas para la sincronización masiva de clientes
+class ResultadoClienteLote(BaseModel):
+    indice: int
+    documento_identidad: str
+    email: str
+    cliente_id: Optional[int] = None
+    # insertado, actualizado o sin_cambios
+    accion: Optional[str] = None
+    error: Optional[str] = None
+
+class ResultadoLoteClientes(BaseModel):
+    procesados: int
+    insertados: int
+    actualizados: int
+    sin_cambios: int
+    rechazados: int
+    resultados: List[ResultadoClienteLote]
+
 # Esquemas para cálculos
 class CalculoCuota(BaseModel):
     monto: float
@@ -118,3 +168,19 @@ class CalculoCuota(BaseModel):
     cuota_mensual: float
     total_a_pagar: float
     total_intereses: float
+
+class CuotaCronograma(BaseModel):
+    numero_cuota: int
+    cuota: float
+    interes: float
+    capital: float
+    saldo: float
+
+class CalculoCuotaDetallado(CalculoCuota):
+    cronograma: Optional[List[CuotaCronograma]] = None
+
+class CalculoCuotaLote(BaseModel):
+    montos: List[float]
+    tasas_interes: List[float]
+    plazos_meses: List[int]
+    incluir_cronograma: bool = False
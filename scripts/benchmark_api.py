@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Benchmark reproducible de la API: datos a escala y mezcla de tráfico realista
+
+Tres subcomandos:
+
+* sembrar: carga en PostgreSQL clientes, préstamos y sus cuotas a la escala
+  indicada con el generador de scripts/generar_datos.py (COPY en paralelo,
+  historiales de pago realistas). La misma semilla y --fecha producen siempre
+  los mismos datos. Con --prestamos 1000000 salen unos 14M de cuotas.
+* ejecutar: lanza --concurrencia clientes asíncronos (httpx) durante
+  --duracion segundos con una mezcla ponderada de operaciones: altas de
+  préstamos, pagos de cuotas pendientes, consultas de saldo, resumen y
+  detalle, listados paginados y simulaciones de cuota. Por defecto llama a la
+  aplicación ASGI en el mismo proceso (DB_MODE elige la variante síncrona o
+  asíncrona); con --url mide un servidor ya arrancado (uvicorn, gunicorn).
+  Informa por endpoint peticiones, rechazos (4xx), errores (5xx o de red),
+  peticiones por segundo y latencias p50/p95/p99/máx., y guarda el resultado
+  en JSON.
+* comparar: diferencias de p95 y rendimiento entre dos resultados JSON.
+
+Uso:
+    python scripts/benchmark_api.py sembrar --clientes 100000 --prestamos 1000000 --reiniciar
+    python scripts/benchmark_api.py ejecutar --duracion 60 --concurrencia 32 --salida base.json
+    python scripts/benchmark_api.py ejecutar --url http://localhost:8000 --salida gunicorn.json
+    python scripts/benchmark_api.py comparar base.json gunicorn.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timezone
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import text
+
+from config.database import engine
+from generar_datos import generar
+from migrar import migrar
+
+def sembrar(args):
+    """Aplica las migraciones y carga los datos sintéticos a la escala pedida"""
+    if engine.dialect.name != "postgresql":
+        sys.exit("❌ El sembrado a escala requiere PostgreSQL (DATABASE_URL)")
+
+    migrar()
+    print(f"📝 {args.clientes} clientes y {args.prestamos} préstamos (semilla {args.semilla})...")
+    try:
+        conteo = generar(args.clientes, args.prestamos, args.semilla, args.procesos, args.fecha, args.reiniciar)
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
+    print(f"✅ {conteo['clientes']} clientes, {conteo['prestamos']} préstamos y {conteo['pagos']} cuotas en {conteo['segundos']} s")
+
+# Carga
+
+class Contexto:
+    """
+    Datos compartidos por los trabajadores: rangos de ids y cuotas pendientes por pagar
+    """
+
+    def __init__(self, clientes: tuple, prestamos: tuple, cuotas: list):
+        self.clientes = clientes
+        self.prestamos = prestamos
+        self.cuotas = cuotas
+
+def preparar_contexto(semilla: int, cuotas: int) -> Contexto:
+    """
+    Rangos de ids existentes y una muestra de cuotas pendientes de préstamos
+    activos (cada una se paga como mucho una vez durante la prueba)
+    """
+    with engine.connect() as conexion:
+        clientes = conexion.execute(text("SELECT min(id), max(id) FROM clientes")).one()
+        prestamos = conexion.execute(text("SELECT min(id), max(id) FROM prestamos")).one()
+        if clientes[0] is None or prestamos[0] is None:
+            sys.exit("❌ No hay datos: ejecutar antes el subcomando sembrar")
+        # Una ventana de ids que depende de la semilla, por el índice (prestamo_id, estado)
+        desde = random.Random(semilla).randint(prestamos[0], prestamos[1])
+        consulta = text("""
+            SELECT pg.prestamo_id, pg.numero_cuota, pg.monto, pg.fecha_vencimiento
+            FROM pagos pg JOIN prestamos p ON p.id = pg.prestamo_id
+            WHERE pg.prestamo_id >= :desde AND pg.estado = 'PENDIENTE' AND p.estado = 'ACTIVO'
+            ORDER BY pg.prestamo_id, pg.numero_cuota
+            LIMIT :limite
+        """)
+        filas = conexion.execute(consulta, {"desde": desde, "limite": cuotas}).all()
+        if len(filas) < cuotas:
+            filas += conexion.execute(consulta, {"desde": prestamos[0], "limite": cuotas - len(filas)}).all()
+    pendientes = [(fila[0], fila[1], fila[2], fila[3].isoformat()) for fila in filas]
+    random.Random(semilla).shuffle(pendientes)
+    return Contexto(tuple(clientes), tuple(prestamos), pendientes)
+
+# Operaciones: (nombre, peso, función). Cada función recibe el cliente HTTP, el
+# generador aleatorio del trabajador y el contexto, y devuelve la respuesta.
+
+async def crear_prestamo(http, rng, ctx):
+    return await http.post("/prestamos/", json={
+        "cliente_id": rng.randint(*ctx.clientes),
+        "monto": float(rng.randrange(500, 10_001, 50)),
+        "tasa_interes": float(rng.randint(8, 32)),
+        "plazo_meses": rng.choice((6, 12, 18, 24, 36)),
+    })
+
+async def pagar_cuota(http, rng, ctx):
+    if not ctx.cuotas:
+        return None
+    prestamo_id, numero_cuota, monto, vencimiento = ctx.cuotas.pop()
+    return await http.post("/pagos/", json={
+        "prestamo_id": prestamo_id,
+        "numero_cuota": numero_cuota,
+        "monto": monto,
+        "fecha_vencimiento": vencimiento,
+    })
+
+async def saldo_prestamo(http, rng, ctx):
+    return await http.get(f"/prestamos/{rng.randint(*ctx.prestamos)}/saldo")
+
+async def resumen_pagos(http, rng, ctx):
+    return await http.get(f"/pagos/resumen/prestamo/{rng.randint(*ctx.prestamos)}")
+
+async def detalle_prestamo(http, rng, ctx):
+    return await http.get(f"/prestamos/{rng.randint(*ctx.prestamos)}/detalle")
+
+async def prestamo(http, rng, ctx):
+    return await http.get(f"/prestamos/{rng.randint(*ctx.prestamos)}")
+
+async def cuotas_prestamo(http, rng, ctx):
+    return await http.get(f"/pagos/prestamo/{rng.randint(*ctx.prestamos)}")
+
+async def prestamos_cliente(http, rng, ctx):
+    return await http.get(f"/clientes/{rng.randint(*ctx.clientes)}/prestamos")
+
+async def cliente(http, rng, ctx):
+    return await http.get(f"/clientes/{rng.randint(*ctx.clientes)}")
+
+async def listado_prestamos(http, rng, ctx):
+    return await http.get("/prestamos/", params={"estado": "activo", "limit": 50})
+
+async def listado_pagos(http, rng, ctx):
+    return await http.get("/pagos/", params={"estado": "pendiente", "limit": 50})
+
+async def listado_clientes(http, rng, ctx):
+    return await http.get("/clientes/", params={"limit": 50})
+
+async def calcular_cuota(http, rng, ctx):
+    return await http.post("/prestamos/calcular-cuota", params={
+        "monto": rng.randrange(500, 10_001, 50),
+        "tasa_interes": rng.randint(8, 32),
+        "plazo_meses": rng.choice((6, 12, 18, 24, 36)),
+    })
+
+OPERACIONES = [
+    ("POST /prestamos/", 5, crear_prestamo),
+    ("POST /pagos/", 15, pagar_cuota),
+    ("GET /prestamos/{id}/saldo", 15, saldo_prestamo),
+    ("GET /pagos/resumen/prestamo/{id}", 10, resumen_pagos),
+    ("GET /prestamos/{id}/detalle", 10, detalle_prestamo),
+    ("GET /prestamos/{id}", 10, prestamo),
+    ("GET /pagos/prestamo/{id}", 8, cuotas_prestamo),
+    ("GET /clientes/{id}/prestamos", 5, prestamos_cliente),
+    ("GET /clientes/{id}", 7, cliente),
+    ("GET /prestamos/", 4, listado_prestamos),
+    ("GET /pagos/", 4, listado_pagos),
+    ("GET /clientes/", 2, listado_clientes),
+    ("POST /prestamos/calcular-cuota", 5, calcular_cuota),
+]
+
+class Registro:
+    """
+    Latencias y códigos de respuesta por operación
+    """
+
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.rechazadas = defaultdict(int)
+        self.errores = defaultdict(int)
+
+    def anotar(self, nombre: str, segundos: float, codigo):
+        self.latencias[nombre].append(segundos)
+        if codigo is None or codigo >= 500:
+            self.errores[nombre] += 1
+        elif codigo >= 400:
+            self.rechazadas[nombre] += 1
+
+def percentil(ordenados: list, p: float) -> float:
+    """Percentil p (0-100) por el rango más cercano de una lista ordenada"""
+    if not ordenados:
+        return 0.0
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+def resumir(registro: Registro, segundos: float) -> dict:
+    endpoints = {}
+    for nombre, _, _ in OPERACIONES:
+        latencias = sorted(registro.latencias.get(nombre, []))
+        if not latencias:
+            continue
+        endpoints[nombre] = {
+            "peticiones": len(latencias),
+            "rechazadas": registro.rechazadas[nombre],
+            "errores": registro.errores[nombre],
+            "rps": round(len(latencias) / segundos, 2),
+            "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+            "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+            "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+            "max_ms": round(latencias[-1] * 1000, 2),
+        }
+    todas = sorted(latencia for lista in registro.latencias.values() for latencia in lista)
+    total = {
+        "peticiones": len(todas),
+        "rechazadas": sum(registro.rechazadas.values()),
+        "errores": sum(registro.errores.values()),
+        "rps": round(len(todas) / segundos, 2),
+        "p50_ms": round(percentil(todas, 50) * 1000, 2),
+        "p95_ms": round(percentil(todas, 95) * 1000, 2),
+        "p99_ms": round(percentil(todas, 99) * 1000, 2),
+    }
+    return {"total": total, "endpoints": endpoints}
+
+async def trabajador(http, rng: random.Random, ctx: Contexto, registro: Registro, fin_calentamiento: float, fin: float):
+    nombres = [nombre for nombre, _, _ in OPERACIONES]
+    pesos = [peso for _, peso, _ in OPERACIONES]
+    funciones = {nombre: funcion for nombre, _, funcion in OPERACIONES}
+    while time.perf_counter() < fin:
+        nombre = rng.choices(nombres, pesos)[0]
+        inicio = time.perf_counter()
+        try:
+            respuesta = await funciones[nombre](http, rng, ctx)
+            if respuesta is None:
+                continue
+            codigo = respuesta.status_code
+        except Exception:
+            codigo = None
+        if inicio >= fin_calentamiento:
+            registro.anotar(nombre, time.perf_counter() - inicio, codigo)
+
+async def ejecutar_carga(args, ctx: Contexto) -> dict:
+    if args.url:
+        transporte = None
+        base = args.url.rstrip("/")
+    else:
+        from main import app
+        transporte = httpx.ASGITransport(app=app)
+        base = "http://benchmark"
+
+    limites = httpx.Limits(max_connections=args.concurrencia, max_keepalive_connections=args.concurrencia)
+    registro = Registro()
+    async with httpx.AsyncClient(base_url=base, transport=transporte, limits=limites, timeout=args.timeout) as http:
+        inicio = time.perf_counter()
+        fin_calentamiento = inicio + args.calentamiento
+        fin = fin_calentamiento + args.duracion
+        await asyncio.gather(*(
+            trabajador(http, random.Random(args.semilla * 1000 + numero), ctx, registro, fin_calentamiento, fin)
+            for numero in range(args.concurrencia)
+        ))
+        medidos = time.perf_counter() - fin_calentamiento
+    return resumir(registro, medidos)
+
+def _commit_git() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def imprimir(resultado: dict):
+    print(f"{'endpoint':<34} {'n':>7} {'4xx':>5} {'err':>4} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'máx':>8}")
+    for nombre, datos in resultado["endpoints"].items():
+        print(
+            f"{nombre:<34} {datos['peticiones']:>7} {datos['rechazadas']:>5} {datos['errores']:>4} {datos['rps']:>8.1f} "
+            f"{datos['p50_ms']:>8.2f} {datos['p95_ms']:>8.2f} {datos['p99_ms']:>8.2f} {datos['max_ms']:>8.2f}"
+        )
+    total = resultado["total"]
+    print(
+        f"{'total':<34} {total['peticiones']:>7} {total['rechazadas']:>5} {total['errores']:>4} {total['rps']:>8.1f} "
+        f"{total['p50_ms']:>8.2f} {total['p95_ms']:>8.2f} {total['p99_ms']:>8.2f}"
+    )
+
+def ejecutar(args):
+    """Lanza la mezcla de tráfico, imprime la tabla de resultados y la guarda en JSON"""
+    ctx = preparar_contexto(args.semilla, args.cuotas)
+    destino = args.url or f"ASGI en proceso (DB_MODE={os.getenv('DB_MODE', 'sync')})"
+    print(f"🚀 {args.concurrencia} clientes durante {args.duracion} s (+{args.calentamiento} s de calentamiento) contra {destino}")
+    resultado = asyncio.run(ejecutar_carga(args, ctx))
+    imprimir(resultado)
+
+    resultado = {
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "commit": _commit_git(),
+        "configuracion": {
+            "destino": destino,
+            "base_de_datos": engine.url.render_as_string(hide_password=True),
+            "concurrencia": args.concurrencia,
+            "duracion_s": args.duracion,
+            "calentamiento_s": args.calentamiento,
+            "semilla": args.semilla,
+            "clientes": ctx.clientes[1] - ctx.clientes[0] + 1,
+            "prestamos": ctx.prestamos[1] - ctx.prestamos[0] + 1,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        **resultado,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        print(f"💾 Resultado guardado en {args.salida}")
+    if resultado["total"]["errores"]:
+        sys.exit(1)
+
+def _variacion(antes: float, despues: float) -> str:
+    if not antes:
+        return "-"
+    return f"{(despues - antes) / antes * 100:+.1f}%"
+
+def comparar(args):
+    """Diferencias de p95 y rps por endpoint entre dos resultados"""
+    with open(args.base, encoding="utf-8") as archivo:
+        base = json.load(archivo)
+    with open(args.nuevo, encoding="utf-8") as archivo:
+        nuevo = json.load(archivo)
+
+    print(f"base:  {args.base} ({base.get('commit')}, {base['configuracion']['destino']})")
+    print(f"nuevo: {args.nuevo} ({nuevo.get('commit')}, {nuevo['configuracion']['destino']})")
+    print(f"{'endpoint':<34} {'p95 base':>9} {'p95 nuevo':>10} {'Δ p95':>8} {'rps base':>9} {'rps nuevo':>10} {'Δ rps':>8}")
+    filas = [(nombre, base["endpoints"].get(nombre), nuevo["endpoints"].get(nombre)) for nombre, _, _ in OPERACIONES]
+    filas.append(("total", base["total"], nuevo["total"]))
+    for nombre, antes, despues in filas:
+        if not antes or not despues:
+            continue
+        print(
+            f"{nombre:<34} {antes['p95_ms']:>9.2f} {despues['p95_ms']:>10.2f} {_variacion(antes['p95_ms'], despues['p95_ms']):>8} "
+            f"{antes['rps']:>9.1f} {despues['rps']:>10.1f} {_variacion(antes['rps'], despues['rps']):>8}"
+        )
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Benchmark reproducible de la API de microcréditos")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    parser_sembrar = subparsers.add_parser("sembrar", help="Carga datos a escala en PostgreSQL")
+    parser_sembrar.add_argument("--clientes", type=int, default=10_000, help="Número de clientes")
+    parser_sembrar.add_argument("--prestamos", type=int, default=100_000, help="Número de préstamos (unas 14 cuotas por préstamo)")
+    parser_sembrar.add_argument("--semilla", type=int, default=42, help="Semilla de los datos")
+    parser_sembrar.add_argument("--fecha", type=date.fromisoformat, default=None, help="Fecha de referencia de los datos, AAAA-MM-DD (por defecto hoy)")
+    parser_sembrar.add_argument("--procesos", type=int, default=None, help="Procesos de generación (por defecto uno por CPU)")
+    parser_sembrar.add_argument("--reiniciar", action="store_true", help="Vaciar clientes, préstamos y pagos antes de sembrar")
+
+    parser_ejecutar = subparsers.add_parser("ejecutar", help="Lanza la mezcla de tráfico y mide latencias")
+    parser_ejecutar.add_argument("--url", default=None, help="Servidor a medir (por defecto la aplicación ASGI en el mismo proceso)")
+    parser_ejecutar.add_argument("--concurrencia", type=int, default=16, help="Clientes simultáneos")
+    parser_ejecutar.add_argument("--duracion", type=float, default=30, help="Segundos de medición")
+    parser_ejecutar.add_argument("--calentamiento", type=float, default=5, help="Segundos iniciales que no se miden")
+    parser_ejecutar.add_argument("--semilla", type=int, default=42, help="Semilla de la mezcla de operaciones")
+    parser_ejecutar.add_argument("--cuotas", type=int, default=20_000, help="Cuotas pendientes disponibles para pagar")
+    parser_ejecutar.add_argument("--timeout", type=float, default=30, help="Timeout por petición en segundos")
+    parser_ejecutar.add_argument("--salida", default=None, help="Archivo JSON donde guardar el resultado")
+
+    parser_comparar = subparsers.add_parser("comparar", help="Compara dos resultados JSON")
+    parser_comparar.add_argument("base", help="Resultado de referencia")
+    parser_comparar.add_argument("nuevo", help="Resultado a comparar")
+
+    args = parser.parse_args()
+    {"sembrar": sembrar, "ejecutar": ejecutar, "comparar": comparar}[args.comando](args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Benchmark del particionado de pagos: barrido de vencimientos y consultas por préstamo
+
+Mide sobre la base de datos actual (pagos sin particionar o particionada por
+rango o hash, ver services/particiones.py) las operaciones que dependen del
+tamaño de pagos:
+
+* barrido_diario: la fase de cuotas del barrido de vencimientos con el corte
+  en mañana (marca las cuotas de un día) sobre toda la tabla, dentro de una
+  transacción que se deshace al terminar: cada repetición hace el mismo trabajo.
+* cobranza_semana: los importes por día de vencimiento de una semana
+  (refresco incremental de GET /reportes/cartera).
+* cuotas_de_un_prestamo: GET /pagos/prestamo/{id} (todas las cuotas).
+* cuota_por_numero: la búsqueda de registrar_pago (préstamo y número de cuota).
+* pago_por_id: GET /pagos/{id}; sin la clave de partición no se poda ninguna.
+
+Las consultas por préstamo se repiten sobre --consultas préstamos al azar e
+informan p50/p95 en milisegundos, incluido el tiempo de planificación, que
+crece con el número de particiones.
+
+Uso (antes y después de la migración 0007):
+    python scripts/benchmark_api.py sembrar --prestamos 3500000 --reiniciar   # unos 50M de cuotas
+    python scripts/benchmark_particiones.py medir --salida plana.json
+    PAGOS_PARTICIONES=rango python scripts/migrar.py
+    python scripts/benchmark_particiones.py medir --salida rango.json
+    python scripts/benchmark_particiones.py comparar plana.json rango.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import and_, func, select, text
+
+from config.database import engine
+from models.models import Pago, EstadoPago
+from services import lectura, particiones, reportes, vencimientos
+
+OPERACIONES = ["barrido_diario", "cobranza_semana", "cuotas_de_un_prestamo", "cuota_por_numero", "pago_por_id"]
+
+def percentil(ordenados: list, p: float) -> float:
+    """Percentil p (0-100) por el rango más cercano de una lista ordenada"""
+    if not ordenados:
+        return 0.0
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+def resumir(tiempos: list) -> dict:
+    ordenados = sorted(tiempos)
+    return {
+        "n": len(ordenados),
+        "p50_ms": round(percentil(ordenados, 50) * 1000, 2),
+        "p95_ms": round(percentil(ordenados, 95) * 1000, 2),
+        "max_ms": round(ordenados[-1] * 1000, 2),
+    }
+
+def describir_tabla(conexion) -> dict:
+    """Estrategia, particiones, filas estimadas y tamaño de pagos con sus índices"""
+    lista = particiones.particiones(conexion)
+    # pg_partition_tree no devuelve filas si pagos no está particionada
+    tamano, filas = conexion.execute(text(
+        "SELECT sum(pg_total_relation_size(c.oid))::bigint, sum(greatest(c.reltuples, 0))::bigint FROM pg_class c "
+        "WHERE c.oid IN (SELECT relid FROM pg_partition_tree('pagos') WHERE isleaf) "
+        "OR (c.oid = 'pagos'::regclass AND c.relkind = 'r')"
+    )).one()
+    return {
+        "estrategia": particiones.estrategia(conexion) or "sin_particionar",
+        "particiones": len(lista),
+        "filas_estimadas": filas,
+        "tamano_mb": round(tamano / 1024 ** 2, 1),
+        "particion_mayor_mb": round(max(
+            (conexion.scalar(text("SELECT pg_total_relation_size(to_regclass(:nombre))"), {"nombre": p["nombre"]})
+             for p in lista), default=tamano
+        ) / 1024 ** 2, 1),
+    }
+
+def medir_barrido(repeticiones: int, tamano_lote: int) -> tuple:
+    """Fase de cuotas del barrido con corte en mañana, deshecha tras cada repetición"""
+    corte = datetime.now(timezone.utc) + timedelta(days=1)
+    tiempos, marcadas = [], 0
+    for _ in range(repeticiones):
+        with engine.connect() as conexion:
+            inicio = time.perf_counter()
+            rangos = vencimientos._rangos(
+                conexion, Pago.id,
+                and_(Pago.estado == EstadoPago.PENDIENTE, Pago.fecha_vencimiento < corte),
+                tamano_lote
+            )
+            marcadas = 0
+            for desde, hasta in rangos:
+                marcadas += vencimientos._marcar_cuotas(conexion, desde, hasta, corte)["cuotas_vencidas"]
+            tiempos.append(time.perf_counter() - inicio)
+            conexion.rollback()
+    return tiempos, marcadas
+
+def medir_consultas(conexion, consultas: int, semilla: int) -> dict:
+    minimo, maximo = conexion.execute(select(func.min(Pago.prestamo_id), func.max(Pago.prestamo_id))).one()
+    pago_maximo = conexion.scalar(select(func.max(Pago.id)))
+    if minimo is None:
+        sys.exit("❌ La tabla pagos está vacía (scripts/benchmark_api.py sembrar carga datos)")
+    rng = random.Random(semilla)
+    hoy = datetime.now(timezone.utc).date()
+
+    def cobranza_semana():
+        hasta = hoy - timedelta(days=rng.randint(0, 365))
+        return reportes.consulta_cobranza(hasta - timedelta(days=6), hasta)
+
+    def cuotas_de_un_prestamo():
+        prestamo_id = rng.randint(minimo, maximo)
+        return lectura.consulta_pagos().where(Pago.prestamo_id == prestamo_id, particiones.ventana_prestamo(prestamo_id))
+
+    def cuota_por_numero():
+        prestamo_id = rng.randint(minimo, maximo)
+        return select(Pago.id, Pago.monto, Pago.estado).where(
+            Pago.prestamo_id == prestamo_id,
+            Pago.numero_cuota == rng.randint(1, 12),
+            particiones.ventana_prestamo(prestamo_id)
+        )
+
+    def pago_por_id():
+        return lectura.consulta_pagos().where(Pago.id == rng.randint(1, pago_maximo))
+
+    generadores = {
+        "cobranza_semana": cobranza_semana,
+        "cuotas_de_un_prestamo": cuotas_de_un_prestamo,
+        "cuota_por_numero": cuota_por_numero,
+        "pago_por_id": pago_por_id,
+    }
+
+    resultados = {}
+    for nombre, generar_consulta in generadores.items():
+        repeticiones = max(consultas // 10, 5) if nombre == "cobranza_semana" else consultas
+        # Calentamiento: caché de planes del driver y páginas en memoria
+        for _ in range(min(repeticiones, 20)):
+            conexion.execute(generar_consulta()).all()
+        tiempos = []
+        for _ in range(repeticiones):
+            consulta = generar_consulta()
+            inicio = time.perf_counter()
+            conexion.execute(consulta).all()
+            tiempos.append(time.perf_counter() - inicio)
+        resultados[nombre] = resumir(tiempos)
+    return resultados
+
+def medir(args):
+    """Mide las operaciones sobre la tabla actual y guarda el resultado en JSON"""
+    if engine.dialect.name != "postgresql":
+        sys.exit("❌ El benchmark de particiones requiere PostgreSQL (DATABASE_URL)")
+
+    with engine.connect() as conexion:
+        tabla = describir_tabla(conexion)
+    print(
+        f"📊 pagos: {tabla['estrategia']}, {tabla['particiones']} particiones, "
+        f"~{tabla['filas_estimadas']} filas, {tabla['tamano_mb']} MB (mayor: {tabla['particion_mayor_mb']} MB)"
+    )
+
+    tiempos, marcadas = medir_barrido(args.repeticiones, args.tamano_lote)
+    operaciones = {"barrido_diario": {**resumir(tiempos), "cuotas_marcadas": marcadas}}
+    with engine.connect() as conexion:
+        operaciones.update(medir_consultas(conexion, args.consultas, args.semilla))
+        conexion.rollback()
+
+    print(f"{'operación':<24} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'máx ms':>9}")
+    for nombre in OPERACIONES:
+        datos = operaciones[nombre]
+        print(f"{nombre:<24} {datos['n']:>6} {datos['p50_ms']:>9.2f} {datos['p95_ms']:>9.2f} {datos['max_ms']:>9.2f}")
+
+    resultado = {
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "base_de_datos": engine.url.render_as_string(hide_password=True),
+        "tabla": tabla,
+        "operaciones": operaciones,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        print(f"💾 Resultado guardado en {args.salida}")
+
+def _variacion(antes: float, despues: float) -> str:
+    if not antes:
+        return "-"
+    return f"{(despues - antes) / antes * 100:+.1f}%"
+
+def comparar(args):
+    """p50 y p95 por operación entre dos resultados"""
+    with open(args.base, encoding="utf-8") as archivo:
+        base = json.load(archivo)
+    with open(args.nuevo, encoding="utf-8") as archivo:
+        nuevo = json.load(archivo)
+
+    for etiqueta, resultado in (("base", base), ("nuevo", nuevo)):
+        tabla = resultado["tabla"]
+        print(f"{etiqueta + ':':<7}{tabla['estrategia']}, {tabla['particiones']} particiones, ~{tabla['filas_estimadas']} filas, {tabla['tamano_mb']} MB")
+    print(f"{'operación':<24} {'p50 base':>9} {'p50 nuevo':>10} {'Δ p50':>8} {'p95 base':>9} {'p95 nuevo':>10} {'Δ p95':>8}")
+    for nombre in OPERACIONES:
+        antes, despues = base["operaciones"].get(nombre), nuevo["operaciones"].get(nombre)
+        if not antes or not despues:
+            continue
+        print(
+            f"{nombre:<24} {antes['p50_ms']:>9.2f} {despues['p50_ms']:>10.2f} {_variacion(antes['p50_ms'], despues['p50_ms']):>8} "
+            f"{antes['p95_ms']:>9.2f} {despues['p95_ms']:>10.2f} {_variacion(antes['p95_ms'], despues['p95_ms']):>8}"
+        )
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Benchmark del particionado de pagos")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    parser_medir = subcomandos.add_parser("medir", help="Medir sobre la tabla pagos actual")
+    parser_medir.add_argument("--repeticiones", type=int, default=3, help="Repeticiones del barrido")
+    parser_medir.add_argument("--tamano-lote", type=int, default=vencimientos.TAMANO_LOTE, help="Cuotas por rango de id del barrido")
+    parser_medir.add_argument("--consultas", type=int, default=500, help="Consultas por préstamo medidas por operación")
+    parser_medir.add_argument("--semilla", type=int, default=42, help="Semilla de los préstamos consultados")
+    parser_medir.add_argument("--salida", default=None, help="Archivo JSON donde guardar el resultado")
+    parser_medir.set_defaults(funcion=medir)
+
+    parser_comparar = subcomandos.add_parser("comparar", help="Comparar dos resultados")
+    parser_comparar.add_argument("base", help="Resultado de referencia")
+    parser_comparar.add_argument("nuevo", help="Resultado a comparar")
+    parser_comparar.set_defaults(funcion=comparar)
+
+    args = parser.parse_args()
+    args.funcion(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos a escala (PostgreSQL, COPY FROM STDIN)
+
+Produce clientes, préstamos y el historial de sus cuotas con perfiles de
+pago realistas y los carga con COPY desde varios procesos en paralelo:
+
+* importes con distribución log-normal (mediana ~2.000), tasas alrededor del
+  24% anual y plazos habituales (3 a 36 meses, sobre todo 12);
+* cada préstamo sigue un perfil de pago: puntual, con atrasos (días de retraso
+  exponenciales), en mora (deja de pagar a partir de una cuota) o con
+  prepago (liquida de una vez las cuotas restantes);
+* las cuotas vencen cada 30 días desde el inicio (como crear_prestamo) y el
+  saldo, el estado y los contadores del préstamo salen de los pagos
+  aplicados, con las mismas reglas que PrestamoService.registrar_pago.
+
+Los datos se generan por bloques de tamaño fijo y cada bloque tiene su propia
+semilla derivada de --semilla, así que la misma semilla, escala y --fecha
+producen exactamente los mismos clientes, préstamos y cuotas con cualquier
+número de procesos (los ids de pagos los asigna la secuencia en el orden de
+carga).
+
+Uso:
+    python scripts/generar_datos.py --clientes 100000 --prestamos 1000000 --reiniciar
+    python scripts/generar_datos.py --clientes 1000 --prestamos 5000 --semilla 7 --fecha 2025-01-01
+"""
+
+import argparse
+import io
+import multiprocessing
+import random
+import sys
+import os
+import time
+import unicodedata
+from datetime import date, datetime, time as hora, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from config.database import DATABASE_URL, engine
+from migrar import migrar
+
+# Filas por bloque (unidad de trabajo de cada proceso y de cada COPY)
+BLOQUE_CLIENTES = 20_000
+BLOQUE_PRESTAMOS = 5_000
+
+NOMBRES = [
+    "Juan", "María", "Carlos", "Ana", "Luis", "Lucía", "José", "Carmen", "Miguel", "Laura",
+    "Pedro", "Sofía", "Jorge", "Elena", "Andrés", "Paula", "Diego", "Marta", "Fernando", "Isabel",
+    "Ricardo", "Valentina", "Javier", "Daniela", "Raúl", "Camila", "Sergio", "Gabriela", "Manuel", "Rosa",
+]
+APELLIDOS = [
+    "García", "Rodríguez", "González", "Fernández", "López", "Martínez", "Sánchez", "Pérez", "Gómez", "Martín",
+    "Jiménez", "Ruiz", "Hernández", "Díaz", "Moreno", "Muñoz", "Álvarez", "Romero", "Torres", "Ramírez",
+    "Flores", "Vargas", "Castro", "Ortiz", "Rojas", "Mendoza", "Silva", "Morales", "Herrera", "Medina",
+]
+CALLES = ["Calle", "Avenida", "Carrera", "Pasaje", "Diagonal", "Transversal"]
+CIUDADES = ["Bogotá", "Medellín", "Lima", "Quito", "Santiago", "Guadalajara", "Córdoba", "La Paz", "Cali", "Arequipa"]
+
+PLAZOS = [3, 6, 9, 12, 18, 24, 36]
+PESOS_PLAZOS = [5, 20, 10, 30, 15, 15, 5]
+
+# Perfil de pago de cada préstamo y su probabilidad
+PERFILES = ["puntual", "atrasos", "mora", "prepago"]
+PESOS_PERFILES = [62, 22, 8, 8]
+
+# Antigüedad máxima de los clientes y de los préstamos
+DIAS_REGISTRO = 5 * 365
+DIAS_CARTERA = 4 * 365
+
+COLUMNAS_CLIENTES = (
+    "id", "nombre", "apellido", "email", "telefono", "direccion",
+    "documento_identidad", "fecha_registro", "activo", "version",
+)
+COLUMNAS_PRESTAMOS = (
+    "id", "cliente_id", "monto", "tasa_interes", "plazo_meses", "fecha_inicio", "fecha_vencimiento",
+    "estado", "saldo_pendiente", "cuota_mensual", "cuotas_pagadas", "cuotas_pendientes",
+    "cuotas_vencidas", "total_pagado", "version",
+)
+COLUMNAS_PAGOS = ("prestamo_id", "monto", "fecha_pago", "fecha_vencimiento", "estado", "numero_cuota", "version")
+
+NULO = "\\N"
+
+def _ascii(texto: str) -> str:
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode().lower()
+
+_NOMBRES_ASCII = [_ascii(nombre) for nombre in NOMBRES]
+_APELLIDOS_ASCII = [_ascii(apellido) for apellido in APELLIDOS]
+
+def _fecha(valor: datetime) -> str:
+    return valor.isoformat()
+
+def fecha_registro(cliente_id: int, referencia: datetime) -> datetime:
+    """
+    Fecha de alta de un cliente, función solo de su id (los bloques de
+    préstamos la necesitan sin leer la tabla clientes)
+    """
+    dispersion = (cliente_id * 2654435761) % 4294967296
+    return referencia - timedelta(days=dispersion % DIAS_REGISTRO, seconds=dispersion % 86400)
+
+def documento(cliente_id: int) -> str:
+    """
+    Documento de 8 cifras único por cliente (permutación de los ids hasta 90M)
+    """
+    return str(10_000_000 + (cliente_id * 7_919_113) % 90_000_000)
+
+def cuota_mensual(monto: float, tasa_interes: float, plazo_meses: int) -> float:
+    """
+    Cuota por el sistema francés (misma fórmula y redondeo que calcular_cuota_mensual)
+    """
+    tasa_mensual = tasa_interes / 100 / 12
+    if tasa_mensual == 0:
+        return round(monto / plazo_meses, 2)
+    factor = (1 + tasa_mensual) ** plazo_meses
+    return round(monto * (tasa_mensual * factor) / (factor - 1), 2)
+
+def filas_clientes(bloque: int, desde: int, hasta: int, semilla: int, referencia: datetime) -> str:
+    """
+    Clientes con id en [desde, hasta] en formato de texto de COPY
+    """
+    rng = random.Random(f"{semilla}:clientes:{bloque}")
+    lineas = []
+    for cliente_id in range(desde, hasta + 1):
+        i, j, k = rng.randrange(len(NOMBRES)), rng.randrange(len(APELLIDOS)), rng.randrange(len(APELLIDOS))
+        lineas.append("\t".join((
+            str(cliente_id),
+            NOMBRES[i],
+            f"{APELLIDOS[j]} {APELLIDOS[k]}",
+            f"{_NOMBRES_ASCII[i]}.{_APELLIDOS_ASCII[j]}{cliente_id}@example.com",
+            f"3{rng.randrange(10**9):09d}",
+            f"{rng.choice(CALLES)} {rng.randint(1, 200)} #{rng.randint(1, 99)}-{rng.randint(1, 99)}, {rng.choice(CIUDADES)}",
+            documento(cliente_id),
+            _fecha(fecha_registro(cliente_id, referencia)),
+            "t" if rng.random() < 0.97 else "f",
+            "1",
+        )))
+    return "\n".join(lineas) + "\n"
+
+def historial(rng: random.Random, prestamo_id: int, monto: float, cuota: float, plazo: int,
+              inicio: datetime, referencia: datetime) -> tuple:
+    """
+    Cuotas de un préstamo según su perfil de pago y estado resultante:
+    (lineas de pagos, estado, saldo, pagadas, pendientes, vencidas, total pagado)
+    """
+    perfil = rng.choices(PERFILES, PESOS_PERFILES)[0]
+    ultima_pagada = rng.randint(0, plazo - 1) if perfil == "mora" else plazo
+    cuota_prepago = rng.randint(2, plazo) if perfil == "prepago" and plazo > 1 else None
+    fecha_prepago = None
+
+    saldo = monto
+    pagadas = pendientes = vencidas = 0
+    total = 0.0
+    lineas = []
+    for numero in range(1, plazo + 1):
+        vencimiento = inicio + timedelta(days=numero * 30)
+
+        fecha_pago = None
+        if saldo > 0 and numero <= ultima_pagada:
+            if fecha_prepago is not None:
+                fecha_pago = fecha_prepago
+            elif perfil in ("puntual", "prepago"):
+                fecha_pago = vencimiento - timedelta(days=rng.randint(0, 5), seconds=rng.randrange(86400))
+            else:
+                fecha_pago = vencimiento + timedelta(days=int(rng.expovariate(1 / 15)), seconds=rng.randrange(86400))
+            if numero == cuota_prepago and fecha_pago <= referencia:
+                # Liquida esta cuota y todas las restantes el mismo día
+                fecha_prepago = fecha_pago
+            if fecha_pago > referencia:
+                fecha_pago = None
+
+        if fecha_pago is not None:
+            estado = "REALIZADO"
+            pagadas += 1
+            total += cuota
+            saldo = max(saldo - cuota, 0)
+        elif vencimiento < referencia and saldo > 0:
+            estado = "VENCIDO"
+            vencidas += 1
+        else:
+            estado = "PENDIENTE"
+            pendientes += 1
+
+        lineas.append("\t".join((
+            str(prestamo_id),
+            repr(cuota),
+            _fecha(fecha_pago) if fecha_pago is not None else NULO,
+            _fecha(vencimiento),
+            estado,
+            str(numero),
+            "1",
+        )))
+
+    if saldo <= 0:
+        estado_prestamo = "PAGADO"
+    elif vencidas:
+        estado_prestamo = "VENCIDO"
+    else:
+        estado_prestamo = "ACTIVO"
+    return lineas, estado_prestamo, saldo, pagadas, pendientes, vencidas, round(total, 2)
+
+def filas_prestamos(bloque: int, desde: int, hasta: int, clientes: int, semilla: int, referencia: datetime) -> tuple:
+    """
+    Préstamos con id en [desde, hasta] y sus cuotas, en formato de texto de COPY
+    """
+    rng = random.Random(f"{semilla}:prestamos:{bloque}")
+    prestamos = []
+    pagos = []
+    limite_cartera = referencia - timedelta(days=DIAS_CARTERA)
+    for prestamo_id in range(desde, hasta + 1):
+        cliente_id = rng.randint(1, clientes)
+        monto = round(min(max(rng.lognormvariate(7.6, 0.7), 200), 50_000) / 50) * 50.0
+        tasa = round(min(max(rng.gauss(24, 7), 8), 60) * 2) / 2
+        plazo = rng.choices(PLAZOS, PESOS_PLAZOS)[0]
+        cuota = cuota_mensual(monto, tasa, plazo)
+
+        desde_fecha = max(fecha_registro(cliente_id, referencia), limite_cartera)
+        inicio = desde_fecha + timedelta(seconds=rng.randrange(max(1, int((referencia - desde_fecha).total_seconds()))))
+
+        lineas, estado, saldo, pagadas, pendientes, vencidas, total = historial(
+            rng, prestamo_id, monto, cuota, plazo, inicio, referencia
+        )
+        pagos.extend(lineas)
+        prestamos.append("\t".join((
+            str(prestamo_id),
+            str(cliente_id),
+            repr(monto),
+            repr(tasa),
+            str(plazo),
+            _fecha(inicio),
+            _fecha(inicio + timedelta(days=plazo * 30)),
+            estado,
+            repr(round(saldo, 2)),
+            repr(cuota),
+            str(pagadas),
+            str(pendientes),
+            str(vencidas),
+            repr(total),
+            "1",
+        )))
+    return "\n".join(prestamos) + "\n", "\n".join(pagos) + "\n"
+
+# Carga
+
+_motor_proceso = None
+
+def _iniciar_proceso(url: str):
+    """
+    Motor propio de cada proceso (las conexiones no se comparten entre procesos)
+    """
+    global _motor_proceso
+    _motor_proceso = create_engine(url, poolclass=NullPool)
+
+def copiar(cursor, tabla: str, columnas: tuple, datos: str):
+    """
+    COPY tabla (columnas) FROM STDIN con psycopg2 o psycopg 3
+    """
+    sentencia = f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN"
+    if hasattr(cursor, "copy_expert"):
+        cursor.copy_expert(sentencia, io.StringIO(datos))
+    else:
+        with cursor.copy(sentencia) as copia:
+            copia.write(datos)
+
+def _cargar_bloque(tarea: tuple) -> tuple:
+    """
+    Genera y carga un bloque en una transacción; devuelve (tipo, filas, cuotas)
+    """
+    tipo, bloque, desde, hasta, clientes, semilla, referencia = tarea
+    conexion = _motor_proceso.raw_connection()
+    try:
+        cursor = conexion.cursor()
+        # Un bloque perdido se regenera igual: no hace falta esperar al disco en cada commit
+        cursor.execute("SET synchronous_commit TO off")
+        if tipo == "clientes":
+            copiar(cursor, "clientes", COLUMNAS_CLIENTES, filas_clientes(bloque, desde, hasta, semilla, referencia))
+            cuotas = 0
+        else:
+            prestamos, pagos = filas_prestamos(bloque, desde, hasta, clientes, semilla, referencia)
+            copiar(cursor, "prestamos", COLUMNAS_PRESTAMOS, prestamos)
+            copiar(cursor, "pagos", COLUMNAS_PAGOS, pagos)
+            cuotas = pagos.count("\n")
+        conexion.commit()
+        return tipo, hasta - desde + 1, cuotas
+    finally:
+        conexion.close()
+
+def _tareas(tipo: str, total: int, tamano: int, clientes: int, semilla: int, referencia: datetime) -> list:
+    return [
+        (tipo, bloque, desde, min(desde + tamano - 1, total), clientes, semilla, referencia)
+        for bloque, desde in enumerate(range(1, total + 1, tamano))
+    ]
+
+def generar(clientes: int, prestamos: int, semilla: int = 42, procesos: int = None,
+            fecha: date = None, reiniciar: bool = False, url: str = DATABASE_URL) -> dict:
+    """
+    Carga clientes, préstamos y cuotas sintéticos. Las tablas deben existir y
+    estar vacías (reiniciar=True las vacía antes). fecha es el "hoy" de los
+    datos: fija junto con la semilla, la carga es reproducible.
+    """
+    if engine.dialect.name != "postgresql":
+        raise ValueError("El generador de datos requiere PostgreSQL (COPY FROM STDIN)")
+    if clientes <= 0:
+        raise ValueError("Se necesita al menos un cliente")
+    if prestamos < 0:
+        raise ValueError("El número de préstamos no puede ser negativo")
+
+    referencia = datetime.combine(fecha or date.today(), hora.min, tzinfo=timezone.utc)
+    with engine.begin() as conexion:
+        if reiniciar:
+            conexion.execute(text("TRUNCATE pagos, prestamos, clientes RESTART IDENTITY CASCADE"))
+        elif conexion.execute(text("SELECT EXISTS (SELECT 1 FROM clientes)")).scalar():
+            raise ValueError("La base de datos ya tiene datos (--reiniciar la vacía antes de generar)")
+
+    procesos = procesos or os.cpu_count() or 1
+    conteo = {"clientes": 0, "prestamos": 0, "pagos": 0}
+    inicio = time.perf_counter()
+    with multiprocessing.Pool(procesos, initializer=_iniciar_proceso, initargs=(url,)) as pool:
+        # Los préstamos referencian a los clientes: primero todos los clientes
+        fases = [
+            _tareas("clientes", clientes, BLOQUE_CLIENTES, clientes, semilla, referencia),
+            _tareas("prestamos", prestamos, BLOQUE_PRESTAMOS, clientes, semilla, referencia),
+        ]
+        for tareas in fases:
+            for tipo, filas, cuotas in pool.imap_unordered(_cargar_bloque, tareas):
+                conteo[tipo] += filas
+                conteo["pagos"] += cuotas
+            if tareas:
+                print(f"   {conteo[tareas[0][0]]} {tareas[0][0]} ({time.perf_counter() - inicio:.1f} s)")
+
+    with engine.begin() as conexion:
+        # Los ids se asignaron en la carga: las secuencias siguen desde el máximo
+        for tabla in ("clientes", "prestamos"):
+            conexion.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), (SELECT coalesce(max(id), 0) + 1 FROM {tabla}), false)"
+            ))
+        conexion.execute(text("ANALYZE clientes, prestamos, pagos"))
+
+    conteo["segundos"] = round(time.perf_counter() - inicio, 1)
+    return conteo
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos realistas y los carga con COPY")
+    parser.add_argument("--clientes", type=int, default=10_000, help="Número de clientes")
+    parser.add_argument("--prestamos", type=int, default=50_000, help="Número de préstamos (unas 14 cuotas por préstamo)")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla de la generación")
+    parser.add_argument("--fecha", type=date.fromisoformat, default=None, help="Fecha de referencia de los datos, AAAA-MM-DD (por defecto hoy)")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto uno por CPU)")
+    parser.add_argument("--reiniciar", action="store_true", help="Vaciar clientes, préstamos y pagos antes de generar")
+    args = parser.parse_args()
+
+    print("🗃️  Aplicando migraciones de Alembic...")
+    migrar()
+    print(f"📝 Generando {args.clientes} clientes y {args.prestamos} préstamos (semilla {args.semilla})...")
+    try:
+        conteo = generar(args.clientes, args.prestamos, args.semilla, args.procesos, args.fecha, args.reiniciar)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    filas = conteo["clientes"] + conteo["prestamos"] + conteo["pagos"]
+    por_minuto = filas / max(conteo["segundos"], 0.1) * 60
+    print(
+        f"✅ {conteo['clientes']} clientes, {conteo['prestamos']} préstamos y {conteo['pagos']} cuotas "
+        f"en {conteo['segundos']} s ({por_minuto:,.0f} filas/min)"
+    )
+
+if __name__ == "__main__":
+    main()
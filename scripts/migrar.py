@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Paso único de migración: aplica las migraciones de Alembic hasta head y crea
+las particiones futuras de pagos (services/particiones.py)
+
+Se ejecuta una vez por despliegue, antes de arrancar los workers (la
+aplicación no crea ni modifica tablas al iniciar). Con --esperar reintenta la
+conexión mientras la base de datos arranca.
+
+Uso:
+    python scripts/migrar.py
+    python scripts/migrar.py --esperar 120
+"""
+
+import argparse
+import sys
+import os
+import time
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from config.database import DATABASE_URL
+from services import particiones
+
+def esperar_base_de_datos(segundos: float):
+    """Reintenta la conexión hasta que la base de datos responde o se agota el plazo"""
+    motor = create_engine(DATABASE_URL, poolclass=NullPool)
+    limite = time.monotonic() + segundos
+    try:
+        while True:
+            try:
+                with motor.connect() as conexion:
+                    conexion.execute(text("SELECT 1"))
+                return
+            except Exception as e:
+                if time.monotonic() >= limite:
+                    raise
+                print(f"⏳ Esperando conexión a BD: {e}")
+                time.sleep(2)
+    finally:
+        motor.dispose()
+
+def migrar() -> list:
+    """
+    Aplica las migraciones pendientes (alembic upgrade head) y crea las
+    particiones futuras de pagos; devuelve los nombres de las creadas
+    """
+    configuracion = Config(os.path.join(RAIZ, "alembic.ini"))
+    configuracion.set_main_option("script_location", os.path.join(RAIZ, "alembic"))
+    command.upgrade(configuracion, "head")
+    return particiones.crear_particiones_futuras()
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Aplica las migraciones de Alembic hasta head")
+    parser.add_argument("--esperar", type=float, default=0, help="Segundos máximos de espera a que la base de datos responda")
+    args = parser.parse_args()
+
+    try:
+        if args.esperar:
+            esperar_base_de_datos(args.esperar)
+        print("🔄 Aplicando migraciones de Alembic...")
+        creadas = migrar()
+        if creadas:
+            print(f"🗂️  Particiones de pagos creadas: {', '.join(creadas)}")
+        print("✅ Esquema actualizado")
+    except Exception as e:
+        print(f"❌ Error al migrar la base de datos: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
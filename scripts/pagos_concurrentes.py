@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de pagos concurrentes sobre un mismo préstamo
+
+Crea un préstamo de prueba y lanza en paralelo varios intentos de pago por
+cada cuota (todos contra el mismo préstamo). Al terminar comprueba que:
+
+* cada cuota se pagó exactamente una vez y el resto de intentos se rechazó,
+* el saldo pendiente es el monto menos la suma de los pagos aplicados
+  (ninguna actualización concurrente se perdió),
+* los contadores de cuotas del préstamo coinciden con la tabla pagos.
+
+Informa además el rendimiento (pagos por segundo) y la latencia.
+Termina con código 1 si alguna comprobación falla.
+
+Uso:
+    python scripts/pagos_concurrentes.py                        # servicio, 16 hilos
+    python scripts/pagos_concurrentes.py --hilos 32 --cuotas 500
+    python scripts/pagos_concurrentes.py --url http://localhost:8000   # contra la API
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import SessionLocal
+from models.models import Cliente, Prestamo, Pago, EstadoPago
+from schemas.schemas import PrestamoCreate
+from services.prestamo_service import PrestamoService
+
+def crear_prestamo(cuotas: int) -> tuple:
+    """
+    Cliente y préstamo de prueba; devuelve (prestamo_id, monto, vencimientos),
+    con vencimientos el fecha_vencimiento ISO de cada numero_cuota
+    """
+    db = SessionLocal()
+    try:
+        marca = int(time.time() * 1000)
+        cliente = Cliente(
+            nombre="Carga",
+            apellido="Concurrente",
+            email=f"carga{marca}@example.com",
+            telefono="000",
+            direccion="-",
+            documento_identidad=f"CARGA-{marca}"
+        )
+        db.add(cliente)
+        db.commit()
+        prestamo = PrestamoService.crear_prestamo(
+            db, PrestamoCreate(cliente_id=cliente.id, monto=cuotas * 1000.0, tasa_interes=10, plazo_meses=cuotas)
+        )
+        vencimientos = dict(
+            db.query(Pago.numero_cuota, Pago.fecha_vencimiento).filter(Pago.prestamo_id == prestamo.id).all()
+        )
+        return prestamo.id, prestamo.monto, {numero: fecha.isoformat() for numero, fecha in vencimientos.items()}
+    finally:
+        db.close()
+
+def pagar_servicio(prestamo_id: int, numero_cuota: int, monto: float) -> bool:
+    db = SessionLocal()
+    try:
+        PrestamoService.registrar_pago(db, prestamo_id, monto, numero_cuota)
+        return True
+    except ValueError:
+        return False
+    finally:
+        db.close()
+
+def pagar_http(url: str, prestamo_id: int, numero_cuota: int, monto: float, fecha_vencimiento: str) -> bool:
+    pago = {
+        "prestamo_id": prestamo_id,
+        "numero_cuota": numero_cuota,
+        "monto": monto,
+        "fecha_vencimiento": fecha_vencimiento,
+    }
+    peticion = urllib.request.Request(
+        f"{url.rstrip('/')}/pagos/",
+        data=json.dumps(pago).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    try:
+        with urllib.request.urlopen(peticion) as respuesta:
+            return respuesta.status == 201
+    except urllib.error.HTTPError as e:
+        # 400: cuota ya pagada o préstamo cerrado; 404: préstamo o cuota inexistentes
+        if e.code in (400, 404):
+            return False
+        raise
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Prueba de carga de pagos concurrentes sobre un préstamo")
+    parser.add_argument("--hilos", type=int, default=16, help="Pagos simultáneos")
+    parser.add_argument("--cuotas", type=int, default=200, help="Cuotas del préstamo de prueba")
+    parser.add_argument("--intentos", type=int, default=2, help="Intentos de pago por cuota (solo uno debe aplicarse)")
+    parser.add_argument("--url", default=None, help="Enviar los pagos a la API en esta URL en lugar de llamar al servicio")
+    args = parser.parse_args()
+
+    prestamo_id, monto, vencimientos = crear_prestamo(args.cuotas)
+    # Pagos pequeños para que el préstamo no se salde antes de terminar
+    pago = round(monto / (args.cuotas * 2), 2)
+    trabajos = [numero for numero in range(1, args.cuotas + 1) for _ in range(args.intentos)]
+
+    def pagar(numero_cuota: int) -> tuple:
+        inicio = time.perf_counter()
+        if args.url:
+            aplicado = pagar_http(args.url, prestamo_id, numero_cuota, pago, vencimientos[numero_cuota])
+        else:
+            aplicado = pagar_servicio(prestamo_id, numero_cuota, pago)
+        return numero_cuota, aplicado, time.perf_counter() - inicio
+
+    print(f"🚀 {len(trabajos)} pagos con {args.hilos} hilos sobre el préstamo {prestamo_id} ({args.url or 'servicio'})")
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.hilos) as ejecutor:
+        resultados = list(ejecutor.map(pagar, trabajos))
+    duracion = time.perf_counter() - inicio
+
+    latencias = sorted(r[2] * 1000 for r in resultados)
+    aplicados = [r[0] for r in resultados if r[1]]
+    print(f"⏱️  {len(trabajos) / duracion:.0f} pagos/s en {duracion:.2f}s "
+          f"(latencia p50 {statistics.median(latencias):.1f} ms, p95 {latencias[int(len(latencias) * 0.95)]:.1f} ms)")
+
+    fallos = []
+    if sorted(aplicados) != list(range(1, args.cuotas + 1)):
+        fallos.append(f"se aplicaron {len(aplicados)} pagos para {args.cuotas} cuotas (cada cuota debe pagarse una vez)")
+
+    db = SessionLocal()
+    try:
+        prestamo = db.get(Prestamo, prestamo_id)
+        esperado = monto - len(aplicados) * pago
+        if abs(prestamo.saldo_pendiente - esperado) > 0.01:
+            fallos.append(f"saldo pendiente {prestamo.saldo_pendiente:.2f}, esperado {esperado:.2f}")
+
+        realizadas = db.query(Pago).filter(Pago.prestamo_id == prestamo_id, Pago.estado == EstadoPago.REALIZADO).count()
+        if realizadas != len(aplicados):
+            fallos.append(f"{realizadas} cuotas realizadas en la tabla pagos para {len(aplicados)} pagos aplicados")
+
+        if PrestamoService.reconciliar_contadores(db, prestamo_id):
+            fallos.append("los contadores de cuotas del préstamo estaban desfasados")
+    finally:
+        db.close()
+
+    for fallo in fallos:
+        print(f"❌ {fallo}")
+    if fallos:
+        sys.exit(1)
+    print(f"✅ {len(aplicados)} pagos aplicados, {len(trabajos) - len(aplicados)} rechazados, saldo correcto")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Reconstruye los contadores de cuotas de los préstamos (cuotas pagadas,
+pendientes, vencidas y total pagado) a partir de la tabla pagos
+
+Uso:
+    python scripts/reconciliar_contadores.py                  # toda la cartera
+    python scripts/reconciliar_contadores.py --prestamo-id 42 # un préstamo
+"""
+
+import argparse
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import SessionLocal
+from services.prestamo_service import PrestamoService
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Reconciliar los contadores de cuotas de los préstamos")
+    parser.add_argument("--prestamo-id", type=int, default=None, help="Reconciliar solo este préstamo")
+    parser.add_argument("--lote", type=int, default=50000, help="Préstamos por transacción")
+    args = parser.parse_args()
+    
+    print("🔄 Reconciliando contadores de cuotas...")
+    db = SessionLocal()
+    inicio = time.perf_counter()
+    try:
+        corregidos = PrestamoService.reconciliar_contadores(db, args.prestamo_id, args.lote)
+        print(f"✅ {corregidos} préstamos corregidos en {time.perf_counter() - inicio:.1f}s")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error al reconciliar los contadores: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Motor de amortización francesa vectorizado con NumPy
+
+Calcula cuotas y cronogramas completos (cuota, interés, capital y saldo por
+período) para muchos préstamos a la vez. Los cronogramas se devuelven como
+matrices de forma (préstamos, plazo máximo); los períodos posteriores al plazo
+de cada préstamo quedan a cero.
+"""
+
+import numpy as np
+
+# Máximo de cotizaciones aceptadas en una sola petición
+MAX_COTIZACIONES = 10000
+
+# Plazo máximo de un préstamo (50 años) y suma máxima de plazos por petición
+MAX_PLAZO_MESES = 600
+MAX_PERIODOS = 500000
+
+# Celdas máximas (préstamos × plazo máximo) de las matrices de un cálculo de
+# cronogramas: todas las filas tienen el ancho del plazo más largo
+MAX_CELDAS_CRONOGRAMA = 500000
+
+def _validar(montos, tasas_interes, plazos_meses):
+    montos = np.asarray(montos, dtype=np.float64)
+    tasas = np.asarray(tasas_interes, dtype=np.float64)
+    plazos = np.asarray(plazos_meses, dtype=np.int64)
+
+    if not (montos.shape == tasas.shape == plazos.shape) or montos.ndim != 1:
+        raise ValueError("montos, tasas_interes y plazos_meses deben tener la misma longitud")
+    if montos.size > MAX_COTIZACIONES:
+        raise ValueError(f"No se pueden calcular más de {MAX_COTIZACIONES} cuotas por petición")
+    if not (np.all(np.isfinite(montos)) and np.all(np.isfinite(tasas))):
+        raise ValueError("Los montos y las tasas de interés deben ser números finitos")
+    if np.any(montos <= 0):
+        raise ValueError("El monto debe ser mayor a 0")
+    if np.any(tasas < 0):
+        raise ValueError("La tasa de interés no puede ser negativa")
+    if np.any(plazos <= 0):
+        raise ValueError("El plazo debe ser mayor a 0")
+    if np.any(plazos > MAX_PLAZO_MESES):
+        raise ValueError(f"El plazo no puede superar {MAX_PLAZO_MESES} meses")
+    if plazos.sum() > MAX_PERIODOS:
+        raise ValueError(f"La suma de los plazos no puede superar {MAX_PERIODOS} períodos por petición")
+
+    return montos, tasas, plazos
+
+def _comprobar_finitos(*matrices):
+    """
+    Lanza ValueError con los índices de los préstamos cuyo cálculo no es un
+    número finito (por ejemplo, una tasa tan alta que desborda (1 + r)^n)
+    """
+    invalidos = np.zeros(matrices[0].shape[0], dtype=bool)
+    for matriz in matrices:
+        finitos = np.isfinite(matriz)
+        invalidos |= ~(finitos if finitos.ndim == 1 else finitos.all(axis=1))
+    if invalidos.any():
+        indices = np.flatnonzero(invalidos)
+        muestra = ", ".join(str(i) for i in indices[:10]) + (", ..." if indices.size > 10 else "")
+        raise ValueError(
+            f"La cuota no se puede calcular con esos valores (índices: {muestra}); "
+            "revise la tasa de interés y el plazo"
+        )
+
+def calcular_cuotas(montos, tasas_interes, plazos_meses) -> dict:
+    """
+    Cuota mensual, total a pagar y total de intereses de cada préstamo
+    """
+    montos, tasas, plazos = _validar(montos, tasas_interes, plazos_meses)
+
+    # Convertir tasa anual a mensual
+    tasa_mensual = tasas / 100 / 12
+
+    # Los desbordamientos dan inf o NaN y se rechazan después en _comprobar_finitos
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        factor = (1 + tasa_mensual) ** plazos
+        cuota = np.where(
+            tasa_mensual == 0,
+            montos / plazos,
+            montos * (tasa_mensual * factor) / (factor - 1)
+        )
+
+    total_a_pagar = cuota * plazos
+    _comprobar_finitos(cuota, total_a_pagar)
+    return {
+        "monto": montos,
+        "tasa_interes": tasas,
+        "plazo_meses": plazos,
+        "tasa_mensual": tasa_mensual,
+        "cuota_mensual": cuota,
+        "total_a_pagar": total_a_pagar,
+        "total_intereses": total_a_pagar - montos,
+    }
+
+def calcular_cronogramas(montos, tasas_interes, plazos_meses) -> dict:
+    """
+    Cronogramas completos de amortización de todos los préstamos.
+    Devuelve las cuotas (ver calcular_cuotas) más las matrices interes, capital
+    y saldo, y la máscara de períodos válidos de cada préstamo.
+    """
+    calculo = calcular_cuotas(montos, tasas_interes, plazos_meses)
+    plazo_maximo = int(calculo["plazo_meses"].max()) if calculo["plazo_meses"].size else 0
+    if calculo["plazo_meses"].size * plazo_maximo > MAX_CELDAS_CRONOGRAMA:
+        raise ValueError(
+            f"Demasiados períodos para calcular los cronogramas: préstamos × plazo máximo "
+            f"no puede superar {MAX_CELDAS_CRONOGRAMA}"
+        )
+
+    montos = calculo["monto"][:, None]
+    tasa = calculo["tasa_mensual"][:, None]
+    cuota = calculo["cuota_mensual"][:, None]
+
+    periodos = np.arange(plazo_maximo)[None, :]
+    validos = periodos < calculo["plazo_meses"][:, None]
+
+    # Saldo al inicio de cada período (forma cerrada de la amortización francesa)
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        crecimiento = (1 + tasa) ** periodos
+        saldo_inicial = np.where(
+            tasa == 0,
+            montos - cuota * periodos,
+            montos * crecimiento - cuota * (crecimiento - 1) / tasa
+        )
+
+        interes = saldo_inicial * tasa
+        capital = cuota - interes
+    saldo = np.clip(saldo_inicial - capital, 0, None)
+    _comprobar_finitos(*(np.where(validos, matriz, 0.0) for matriz in (interes, capital, saldo)))
+
+    calculo["interes"] = np.where(validos, interes, 0.0)
+    calculo["capital"] = np.where(validos, capital, 0.0)
+    calculo["saldo"] = np.where(validos, saldo, 0.0)
+    calculo["validos"] = validos
+    return calculo
+
+def cotizaciones(montos, tasas_interes, plazos_meses, incluir_cronograma: bool = False) -> list:
+    """
+    Cotizaciones redondeadas a 2 decimales, listas para serializar
+    """
+    if incluir_cronograma:
+        calculo = calcular_cronogramas(montos, tasas_interes, plazos_meses)
+    else:
+        calculo = calcular_cuotas(montos, tasas_interes, plazos_meses)
+
+    cuotas = np.round(calculo["cuota_mensual"], 2).tolist()
+    totales = np.round(calculo["total_a_pagar"], 2).tolist()
+    intereses = np.round(calculo["total_intereses"], 2).tolist()
+
+    resultado = [
+        {
+            "monto": monto,
+            "tasa_interes": tasa,
+            "plazo_meses": plazo,
+            "cuota_mensual": cuota,
+            "total_a_pagar": total,
+            "total_intereses": interes,
+        }
+        for monto, tasa, plazo, cuota, total, interes in zip(
+            calculo["monto"].tolist(), calculo["tasa_interes"].tolist(),
+            calculo["plazo_meses"].tolist(), cuotas, totales, intereses
+        )
+    ]
+
+    if incluir_cronograma:
+        interes = np.round(calculo["interes"], 2).tolist()
+        capital = np.round(calculo["capital"], 2).tolist()
+        saldo = np.round(calculo["saldo"], 2).tolist()
+        for i, cotizacion in enumerate(resultado):
+            cuota = cotizacion["cuota_mensual"]
+            cotizacion["cronograma"] = [
+                {
+                    "numero_cuota": k + 1,
+                    "cuota": cuota,
+                    "interes": interes[i][k],
+                    "capital": capital[i][k],
+                    "saldo": saldo[i][k],
+                }
+                for k in range(cotizacion["plazo_meses"])
+            ]
+
+    return resultado
@@ -0,0 +1,155 @@
+"""
+Búsqueda de clientes por nombre, apellido, email o documento
+
+Los índices GiST de trigramas (pg_trgm, migración 0005) resuelven tanto las
+subcadenas (columna ILIKE '%texto%') como las coincidencias aproximadas por
+palabra (columna %> texto, word_similarity) y, además, devuelven las filas en
+orden de distancia (columna <->> texto) sin ordenar todas las coincidencias.
+Los candidatos de cada búsqueda son, por columna, las BUSQUEDA_MAX_CANDIDATOS
+coincidencias más próximas al término más largo (recorridos KNN del índice que
+se detienen en el LIMIT). Entre ellos, cada término debe aparecer en alguna de
+las cuatro columnas; se puntúan con la similitud media de los términos con la
+columna que mejor coincide y se devuelven las mejores.
+
+Un número de documento (una sola palabra con algún dígito y sin @) se busca
+antes por prefijo con ix_clientes_documento_prefijo, en orden de bytes: el
+documento exacto, si existe, es el primer resultado. Solo si no hay ninguno se
+pasa a la búsqueda por trigramas.
+"""
+
+import operator
+import os
+import re
+from functools import reduce
+from typing import List
+
+from sqlalchemy import Integer, and_, case, func, literal, or_, select, union
+
+from models.models import Cliente
+from services import lectura
+
+# Longitud mínima de un término: con menos de tres caracteres no hay trigramas
+# que buscar en el índice
+MIN_CARACTERES = 3
+
+# Términos de una búsqueda que se tienen en cuenta (los más largos)
+MAX_TERMINOS = 4
+
+# Candidatos más próximos al término principal que se leen de cada columna
+# (por separado para subcadenas y coincidencias aproximadas)
+MAX_CANDIDATOS = int(os.getenv("BUSQUEDA_MAX_CANDIDATOS", "200"))
+
+LIMITE_MAXIMO = 100
+
+COLUMNAS = [Cliente.nombre, Cliente.apellido, Cliente.email, Cliente.documento_identidad]
+
+_DOCUMENTO = re.compile(r"^[^\s@]*\d[^\s@]*$")
+
+def _patron_subcadena(termino: str) -> str:
+    escapado = termino.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return f"%{escapado}%"
+
+def terminos(q: str) -> List[str]:
+    """
+    Términos de la búsqueda en minúsculas, sin repetir y de mayor a menor
+    longitud (los más selectivos primero)
+    """
+    palabras = [palabra for palabra in q.lower().split() if len(palabra) >= MIN_CARACTERES]
+    return sorted(dict.fromkeys(palabras), key=len, reverse=True)[:MAX_TERMINOS]
+
+def consulta_documento(documento: str, activo: bool, limite: int):
+    """
+    Clientes cuyo documento empieza por el texto (el exacto primero, puntuación 1)
+    """
+    documento_c = Cliente.documento_identidad.collate("C")
+    consulta = (
+        select(
+            *lectura.COLUMNAS_CLIENTE,
+            case((Cliente.documento_identidad == documento, 1.0), else_=0.9).label("puntuacion")
+        )
+        .where(documento_c.startswith(documento, autoescape=True))
+        .order_by(documento_c)
+        .limit(limite)
+    )
+    if activo is not None:
+        consulta = consulta.where(Cliente.activo == activo)
+    return consulta
+
+def consulta_candidatos(termino: str, activo: bool):
+    """
+    Ids de los clientes más próximos al término en cada columna, como subcadena
+    y de forma aproximada. Cada rama es un recorrido KNN del índice GiST de la
+    columna (ORDER BY columna <->> término LIMIT n)
+    """
+    ramas = []
+    for columna in COLUMNAS:
+        for condicion in (columna.ilike(_patron_subcadena(termino), escape="/"), columna.op("%>")(termino)):
+            rama = (
+                select(Cliente.id)
+                .where(condicion)
+                .order_by(columna.op("<->>")(termino))
+                .limit(MAX_CANDIDATOS)
+            )
+            if activo is not None:
+                rama = rama.where(Cliente.activo == activo)
+            ramas.append(rama)
+    return union(*ramas)
+
+def consulta_trigramas(palabras: List[str], activo: bool, limite: int):
+    """
+    Clientes en los que cada término aparece (como subcadena o de forma
+    aproximada) en alguna columna, ordenados por similitud. Solo se puntúan los
+    candidatos del término más largo (consulta_candidatos)
+    """
+    condiciones = [
+        or_(*(
+            or_(columna.ilike(_patron_subcadena(termino), escape="/"), columna.op("%>")(termino))
+            for columna in COLUMNAS
+        ))
+        for termino in palabras
+    ]
+    similitudes = [
+        func.greatest(*(func.word_similarity(literal(termino), columna) for columna in COLUMNAS))
+        for termino in palabras
+    ]
+    puntuacion = (reduce(operator.add, similitudes) / literal(len(similitudes), Integer)).label("puntuacion")
+    candidatos = consulta_candidatos(palabras[0], activo).subquery("candidatos")
+    return (
+        select(*lectura.COLUMNAS_CLIENTE, puntuacion)
+        .where(Cliente.id.in_(select(candidatos.c.id)), and_(*condiciones))
+        .order_by(puntuacion.desc(), Cliente.id)
+        .limit(limite)
+    )
+
+def consultas(q: str, activo: bool = True, limite: int = 20) -> list:
+    """
+    Consultas a ejecutar en orden hasta que una devuelva filas (documento por
+    prefijo y, después, trigramas). Lanza ValueError si la búsqueda no tiene
+    ningún término utilizable o el límite no es válido.
+    """
+    if not 1 <= limite <= LIMITE_MAXIMO:
+        raise ValueError(f"limit debe estar entre 1 y {LIMITE_MAXIMO}")
+
+    q = q.strip()
+    resultado = []
+    if _DOCUMENTO.match(q):
+        resultado.append(consulta_documento(q, activo, limite))
+    palabras = terminos(q)
+    if palabras:
+        resultado.append(consulta_trigramas(palabras, activo, limite))
+    if not resultado:
+        raise ValueError(
+            f"La búsqueda necesita un término de al menos {MIN_CARACTERES} caracteres o un número de documento"
+        )
+    return resultado
+
+def clientes(filas) -> List[dict]:
+    """
+    Filas de consulta_documento() o consulta_trigramas() como diccionarios
+    """
+    resultado = []
+    for fila in filas:
+        cliente = dict(fila._mapping)
+        cliente["puntuacion"] = round(float(cliente["puntuacion"]), 4)
+        resultado.append(cliente)
+    return resultado
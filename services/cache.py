@@ -0,0 +1,352 @@
+"""
+Caché de lectura (read-through) para los detalles de clientes y préstamos
+
+Las lecturas pasan por obtener_o_cargar: si la clave está en la caché se
+devuelve sin tocar la base de datos; si no, se carga, se guarda con un TTL y
+las peticiones simultáneas que piden la misma clave esperan a esa única carga
+(single-flight) en lugar de consultar cada una por su lado. Las rutas de
+escritura invalidan explícitamente las claves afectadas después del commit.
+
+Backends (CACHE_BACKEND):
+* memoria: diccionario LRU con TTL propio de cada worker (por defecto)
+* redis: caché compartida entre workers; requiere el paquete redis
+* ninguno: desactiva la caché
+
+Con el backend en memoria cada worker invalida solo su propia copia: una
+escritura atendida por otro worker se ve como mucho CACHE_TTL segundos tarde,
+salvo en las lecturas que usan obtener_vigente, que comparan el ETag guardado
+con la versión actual de la fila.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+BACKEND = os.getenv("CACHE_BACKEND", "memoria").strip().lower()
+
+# Segundos que una entrada se considera válida
+TTL = float(os.getenv("CACHE_TTL", "30"))
+
+# Entradas máximas del backend en memoria (se descartan las menos usadas)
+MAX_ENTRADAS = int(os.getenv("CACHE_MAX_ENTRADAS", "10000"))
+
+REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# Espacios de claves: "<espacio>:<id>"
+CLIENTE = "cliente"
+PRESTAMO = "prestamo"
+PRESTAMO_DETALLE = "prestamo_detalle"
+
+class CacheMemoria:
+    """
+    Diccionario LRU con TTL por entrada, propio de cada proceso
+    """
+
+    remoto = False
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            expira, valor = entrada
+            if expira <= time.monotonic():
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave: str, valor: Any, ttl: float):
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + ttl, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def eliminar(self, *claves: str):
+        with self._lock:
+            for clave in claves:
+                self._entradas.pop(clave, None)
+
+    def eliminar_prefijo(self, prefijo: str):
+        with self._lock:
+            for clave in [clave for clave in self._entradas if clave.startswith(prefijo)]:
+                del self._entradas[clave]
+
+    def tamano(self) -> int:
+        return len(self._entradas)
+
+class CacheRedis:
+    """
+    Caché compartida en Redis (o un servidor compatible); los valores se guardan en JSON
+    """
+
+    remoto = True
+
+    def __init__(self, url: str = REDIS_URL, prefijo: str = "microcreditos:", cliente=None):
+        """
+        cliente: instancia compatible con redis.Redis ya creada (por ejemplo
+        fakeredis.FakeRedis en pruebas); si se omite se conecta a url
+        """
+        self.prefijo = prefijo
+        if cliente is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("CACHE_BACKEND=redis requiere el paquete redis (pip install redis)") from e
+            cliente = redis.Redis.from_url(url)
+        self._cliente = cliente
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        valor = self._cliente.get(self.prefijo + clave)
+        return json.loads(valor) if valor is not None else None
+
+    def guardar(self, clave: str, valor: Any, ttl: float):
+        self._cliente.set(self.prefijo + clave, json.dumps(valor), px=int(ttl * 1000))
+
+    def eliminar(self, *claves: str):
+        if claves:
+            self._cliente.delete(*(self.prefijo + clave for clave in claves))
+
+    def eliminar_prefijo(self, prefijo: str):
+        claves = list(self._cliente.scan_iter(match=f"{self.prefijo}{prefijo}*", count=1000))
+        for inicio in range(0, len(claves), 1000):
+            self._cliente.delete(*claves[inicio:inicio + 1000])
+
+    def tamano(self) -> int:
+        return sum(1 for _ in self._cliente.scan_iter(match=f"{self.prefijo}*", count=1000))
+
+class _Vuelo:
+    """
+    Carga en curso de una clave, compartida por las peticiones que la esperan
+    """
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.valor = None
+        self.error = None
+        # Una escritura invalidó la clave durante la carga: el valor puede ser anterior y no se guarda
+        self.invalidado = False
+
+class Estadisticas:
+    """
+    Aciertos, fallos, cargas compartidas e invalidaciones por espacio de claves
+    """
+
+    CAMPOS = ("aciertos", "fallos", "compartidas", "invalidaciones")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}
+
+    def sumar(self, clave: str, campo: str, cantidad: int = 1):
+        espacio = clave.split(":", 1)[0]
+        with self._lock:
+            contadores = self._contadores.setdefault(espacio, dict.fromkeys(self.CAMPOS, 0))
+            contadores[campo] += cantidad
+
+    def resumen(self) -> dict:
+        with self._lock:
+            espacios = {espacio: dict(contadores) for espacio, contadores in self._contadores.items()}
+        for contadores in espacios.values():
+            lecturas = contadores["aciertos"] + contadores["fallos"]
+            contadores["tasa_aciertos"] = round(contadores["aciertos"] / lecturas, 4) if lecturas else None
+        return espacios
+
+def _crear_backend(nombre: str):
+    if nombre == "memoria":
+        return CacheMemoria()
+    if nombre == "redis":
+        return CacheRedis()
+    if nombre in ("", "ninguno"):
+        return None
+    raise ValueError(f"CACHE_BACKEND no soportado: {nombre} (usar memoria, redis o ninguno)")
+
+backend = _crear_backend(BACKEND)
+estadisticas = Estadisticas()
+_vuelos = {}
+_vuelos_async = {}
+_lock_vuelos = threading.Lock()
+
+def configurar(nuevo_backend, ttl: float = None):
+    """
+    Sustituye el backend (None desactiva la caché), por ejemplo por un servidor
+    compatible con Redis en pruebas
+    """
+    global backend, TTL
+    backend = nuevo_backend
+    if ttl is not None:
+        TTL = ttl
+
+def clave_de(espacio: str, identificador) -> str:
+    return f"{espacio}:{identificador}"
+
+def obtener_o_cargar(clave: str, cargar: Callable[[], Any]) -> Any:
+    """
+    Valor de la clave desde la caché o, si no está, desde cargar().
+    Las excepciones de cargar (por ejemplo un 404) se propagan a todas las
+    peticiones que esperaban esa carga y no se guardan.
+    """
+    if backend is None:
+        return cargar()
+
+    valor = backend.obtener(clave)
+    if valor is not None:
+        estadisticas.sumar(clave, "aciertos")
+        return valor
+
+    with _lock_vuelos:
+        vuelo = _vuelos.get(clave)
+        propio = vuelo is None
+        if propio:
+            vuelo = _vuelos[clave] = _Vuelo()
+
+    if not propio:
+        estadisticas.sumar(clave, "compartidas")
+        vuelo.listo.wait()
+        if vuelo.error is not None:
+            raise vuelo.error
+        return vuelo.valor
+
+    estadisticas.sumar(clave, "fallos")
+    try:
+        vuelo.valor = cargar()
+        if not vuelo.invalidado:
+            backend.guardar(clave, vuelo.valor, TTL)
+        return vuelo.valor
+    except BaseException as e:
+        vuelo.error = e
+        raise
+    finally:
+        with _lock_vuelos:
+            del _vuelos[clave]
+        vuelo.listo.set()
+
+def obtener_vigente(clave: str, etag: str, cargar: Callable[[], dict]) -> dict:
+    """
+    obtener_o_cargar para valores {"etag": ..., "datos": ...}: si la entrada no
+    tiene el ETag actual (se guardó antes de una escritura que no la invalidó en
+    este worker) se descarta y se vuelve a cargar
+    """
+    valor = obtener_o_cargar(clave, cargar)
+    if valor["etag"] != etag:
+        invalidar(clave)
+        valor = obtener_o_cargar(clave, cargar)
+    return valor
+
+async def _llamar(funcion, *args):
+    # Las llamadas a un backend remoto no deben bloquear el bucle de eventos
+    if backend.remoto:
+        return await asyncio.to_thread(funcion, *args)
+    return funcion(*args)
+
+async def obtener_o_cargar_async(clave: str, cargar: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Versión asíncrona de obtener_o_cargar (cargar es una corrutina)
+    """
+    if backend is None:
+        return await cargar()
+
+    valor = await _llamar(backend.obtener, clave)
+    if valor is not None:
+        estadisticas.sumar(clave, "aciertos")
+        return valor
+
+    vuelo = _vuelos_async.get(clave)
+    if vuelo is not None:
+        estadisticas.sumar(clave, "compartidas")
+        return await asyncio.shield(vuelo.futuro)
+
+    estadisticas.sumar(clave, "fallos")
+    vuelo = _vuelos_async[clave] = _Vuelo()
+    vuelo.futuro = asyncio.get_running_loop().create_future()
+    try:
+        valor = await cargar()
+        if not vuelo.invalidado:
+            await _llamar(backend.guardar, clave, valor, TTL)
+        vuelo.futuro.set_result(valor)
+        return valor
+    except BaseException as e:
+        vuelo.futuro.set_exception(e)
+        # Evita el aviso "exception was never retrieved" si nadie más esperaba
+        vuelo.futuro.exception()
+        raise
+    finally:
+        del _vuelos_async[clave]
+
+async def obtener_vigente_async(clave: str, etag: str, cargar: Callable[[], Awaitable[dict]]) -> dict:
+    """
+    Versión asíncrona de obtener_vigente
+    """
+    valor = await obtener_o_cargar_async(clave, cargar)
+    if valor["etag"] != etag:
+        invalidar(clave)
+        valor = await obtener_o_cargar_async(clave, cargar)
+    return valor
+
+def invalidar(*claves: str):
+    """
+    Elimina las claves indicadas (llamar después del commit de la escritura)
+    """
+    if backend is None or not claves:
+        return
+    backend.eliminar(*claves)
+    with _lock_vuelos:
+        for clave in claves:
+            for vuelos in (_vuelos, _vuelos_async):
+                if clave in vuelos:
+                    vuelos[clave].invalidado = True
+    for clave in claves:
+        estadisticas.sumar(clave, "invalidaciones")
+
+def invalidar_prestamos(prestamo_ids: Iterable[int]):
+    """
+    Invalida el préstamo y su detalle con pagos
+    """
+    claves = []
+    for prestamo_id in prestamo_ids:
+        claves.append(clave_de(PRESTAMO, prestamo_id))
+        claves.append(clave_de(PRESTAMO_DETALLE, prestamo_id))
+    invalidar(*claves)
+
+def invalidar_cliente(cliente_id: int, prestamo_ids: Iterable[int] = ()):
+    """
+    Invalida el cliente y los préstamos que lo incluyen en su respuesta
+    """
+    invalidar(clave_de(CLIENTE, cliente_id))
+    invalidar_prestamos(prestamo_ids)
+
+def invalidar_espacio(espacio: str):
+    """
+    Invalida todas las claves de un espacio (escrituras masivas como el barrido de vencimientos)
+    """
+    if backend is None:
+        return
+    backend.eliminar_prefijo(espacio + ":")
+    with _lock_vuelos:
+        for vuelos in (_vuelos, _vuelos_async):
+            for clave, vuelo in vuelos.items():
+                if clave.startswith(espacio + ":"):
+                    vuelo.invalidado = True
+    estadisticas.sumar(espacio, "invalidaciones")
+
+def resumen() -> dict:
+    """
+    Configuración, tamaño y estadísticas de la caché de este worker
+    """
+    return {
+        "backend": type(backend).__name__ if backend is not None else None,
+        "ttl_s": TTL,
+        "max_entradas": MAX_ENTRADAS,
+        "entradas": backend.tamano() if backend is not None else 0,
+        "espacios": estadisticas.resumen(),
+    }
@@ -0,0 +1,206 @@
+"""
+Alta o actualización masiva de clientes (sincronización con el sistema KYC)
+
+Cada fragmento de clientes se guarda con un INSERT ... ON CONFLICT DO UPDATE
+de PostgreSQL sobre la columna clave (documento_identidad o email): los
+clientes nuevos se insertan y los existentes se actualizan en la misma
+sentencia, sin abortar la transacción por cada duplicado. Las filas que no
+cambian no se reescriben (ni suben de versión).
+
+Cada fragmento viaja como un único parámetro JSON (orjson) que PostgreSQL
+expande con json_to_recordset: la sentencia no cambia con el tamaño del
+fragmento y el driver no compone ni escapa miles de valores uno a uno.
+"""
+
+import logging
+from typing import List
+
+import orjson
+from sqlalchemy import JSON, String, bindparam, cast, column, func, literal_column, select, true, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from models.models import Cliente
+from schemas.schemas import ClienteCreate
+from services import cache
+
+logger = logging.getLogger(__name__)
+
+# Clientes por fragmento (una transacción por fragmento)
+TAMANO_LOTE = 5000
+
+CLAVES = ("documento_identidad", "email")
+
+COLUMNAS = ("nombre", "apellido", "email", "telefono", "direccion", "documento_identidad")
+
+_clientes = Cliente.__table__
+
+# Longitud máxima de cada columna (se comprueba antes de enviar el fragmento)
+LONGITUDES = {columna: _clientes.c[columna].type.length for columna in COLUMNAS}
+
+def _registros(nombre: str, *columnas: str):
+    """
+    Tabla derivada json_to_recordset(:datos) AS nombre(columna VARCHAR, ...)
+    sobre el fragmento codificado como lista de objetos JSON
+    """
+    return (
+        func.json_to_recordset(cast(bindparam("datos", type_=String), JSON))
+        .table_valued(*(column(columna, String) for columna in columnas))
+        .render_derived(name=nombre, with_types=True)
+    )
+
+def _sentencia(clave: str):
+    """
+    INSERT ... SELECT del fragmento con ON CONFLICT (clave) DO UPDATE de las
+    demás columnas, solo si alguna cambia. RETURNING devuelve las filas
+    insertadas o actualizadas; xmax = 0 distingue las insertadas.
+    """
+    nuevos = _registros("nuevos", *COLUMNAS)
+    insercion = insert(_clientes).from_select(
+        COLUMNAS + ("activo",),
+        select(*(nuevos.c[columna] for columna in COLUMNAS), true())
+    )
+    actualizables = [columna for columna in COLUMNAS if columna != clave]
+    return (
+        insercion.on_conflict_do_update(
+            index_elements=[clave],
+            set_={
+                **{columna: insercion.excluded[columna] for columna in actualizables},
+                "version": _clientes.c.version + 1,
+            },
+            where=tuple_(*(_clientes.c[columna] for columna in actualizables)).is_distinct_from(
+                tuple_(*(insercion.excluded[columna] for columna in actualizables))
+            ),
+        )
+        .returning(_clientes.c.id, _clientes.c[clave], literal_column("xmax = 0").label("insertado"))
+    )
+
+def _error_longitud(fila: dict):
+    for columna, longitud in LONGITUDES.items():
+        if longitud and len(fila[columna]) > longitud:
+            return f"{columna} no puede superar {longitud} caracteres"
+    return None
+
+def guardar_clientes(db: Session, clientes: List[ClienteCreate], clave: str = "documento_identidad",
+                     tamano_lote: int = TAMANO_LOTE) -> List[dict]:
+    """
+    Inserta o actualiza los clientes según la columna clave, por fragmentos de
+    tamano_lote con una transacción por fragmento. Devuelve un resultado por
+    elemento, en el mismo orden, con el cliente_id y la acción (insertado,
+    actualizado o sin_cambios) o el error.
+    Lanza ValueError si la clave no es documento_identidad ni email.
+    """
+    if clave not in CLAVES:
+        raise ValueError(f"clave debe ser documento_identidad o email (no '{clave}')")
+    otra = "email" if clave == "documento_identidad" else "documento_identidad"
+
+    filas = [cliente.model_dump(include=set(COLUMNAS)) for cliente in clientes]
+    resultados = [
+        {
+            "indice": indice, "documento_identidad": fila["documento_identidad"], "email": fila["email"],
+            "cliente_id": None, "accion": None, "error": None,
+        }
+        for indice, fila in enumerate(filas)
+    ]
+
+    # Ambas columnas son únicas: un valor repetido en el lote solo vale la primera vez
+    validos = []
+    vistos = {clave: {}, otra: {}}
+    for indice, fila in enumerate(filas):
+        error = _error_longitud(fila)
+        for columna in (clave, otra):
+            if error is None and fila[columna] in vistos[columna]:
+                error = f"{columna} repetido en el lote (índice {vistos[columna][fila[columna]]})"
+        if error:
+            resultados[indice]["error"] = error
+            continue
+        for columna in (clave, otra):
+            vistos[columna][fila[columna]] = indice
+        validos.append(indice)
+
+    sentencia = _sentencia(clave)
+    actualizados = 0
+    for inicio in range(0, len(validos), tamano_lote):
+        fragmento = validos[inicio:inicio + tamano_lote]
+        try:
+            actualizados += _guardar_fragmento(db, sentencia, clave, otra, filas, resultados, fragmento)
+            db.commit()
+        except Exception:
+            # El detalle (SQL, restricciones) queda en el log, no en la respuesta
+            logger.exception("Error al guardar un fragmento de %d clientes", len(fragmento))
+            db.rollback()
+            for indice in fragmento:
+                resultado = resultados[indice]
+                resultado["cliente_id"] = resultado["accion"] = None
+                resultado["error"] = resultado["error"] or "Error al guardar el lote; reintente estos clientes"
+
+    if actualizados:
+        # Escritura masiva: como en el barrido de vencimientos, se invalidan los
+        # espacios completos (los préstamos incluyen al cliente en su respuesta)
+        for espacio in (cache.CLIENTE, cache.PRESTAMO, cache.PRESTAMO_DETALLE):
+            cache.invalidar_espacio(espacio)
+    return resultados
+
+def resumen(resultados: List[dict]) -> dict:
+    """
+    Conteo por acción de los resultados de guardar_clientes
+    """
+    acciones = [resultado["accion"] for resultado in resultados]
+    return {
+        "procesados": len(resultados),
+        "insertados": acciones.count("insertado"),
+        "actualizados": acciones.count("actualizado"),
+        "sin_cambios": acciones.count("sin_cambios"),
+        "rechazados": acciones.count(None),
+        "resultados": resultados,
+    }
+
+def _guardar_fragmento(db: Session, sentencia, clave: str, otra: str, filas: List[dict],
+                       resultados: List[dict], fragmento: List[int]) -> int:
+    """
+    Guarda un fragmento de guardar_clientes dentro de la transacción actual y
+    devuelve el número de clientes actualizados
+    """
+    # La otra columna única no puede pertenecer ya a un cliente distinto:
+    # el ON CONFLICT solo cubre la clave y el conflicto abortaría el fragmento
+    buscados = _registros("buscados", otra)
+    propietarios = {
+        valor: (propietario, cliente_id)
+        for valor, propietario, cliente_id in db.execute(
+            select(_clientes.c[otra], _clientes.c[clave], _clientes.c.id)
+            .join(buscados, _clientes.c[otra] == buscados.c[otra]),
+            {"datos": orjson.dumps([filas[indice] for indice in fragmento]).decode()}
+        )
+    }
+
+    pendientes = {}
+    for indice in fragmento:
+        fila = filas[indice]
+        propietario, _ = propietarios.get(fila[otra], (fila[clave], None))
+        if propietario != fila[clave]:
+            resultados[indice]["error"] = f"El {otra} pertenece a otro cliente"
+        else:
+            pendientes[fila[clave]] = indice
+
+    if not pendientes:
+        return 0
+
+    guardados = db.execute(
+        sentencia,
+        {"datos": orjson.dumps([filas[indice] for indice in pendientes.values()]).decode()}
+    ).all()
+
+    actualizados = 0
+    for cliente_id, valor, insertado in guardados:
+        resultado = resultados[pendientes.pop(valor)]
+        resultado["cliente_id"] = cliente_id
+        resultado["accion"] = "insertado" if insertado else "actualizado"
+        actualizados += not insertado
+
+    # Sin fila en RETURNING: el cliente ya existía con los mismos datos (y la
+    # misma otra columna, así que su id se leyó con los propietarios)
+    for indice in pendientes.values():
+        resultados[indice]["cliente_id"] = propietarios[filas[indice][otra]][1]
+        resultados[indice]["accion"] = "sin_cambios"
+
+    return actualizados
@@ -0,0 +1,152 @@
+"""
+Exportación masiva de pagos y préstamos en CSV o NDJSON
+
+Las filas se leen con un cursor del lado del servidor (stream_results +
+yield_per) y se serializan por lotes directamente desde las tuplas de Core,
+sin crear objetos ORM ni modelos Pydantic, así que la memoria del worker no
+depende del número de filas exportadas.
+"""
+
+import csv
+import io
+import json
+import operator
+from datetime import datetime
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import DateTime, Enum, select
+
+from config.database import engine
+from models.models import Pago, Prestamo
+from services import particiones
+
+# Filas leídas del cursor y serializadas en cada fragmento de la respuesta
+TAMANO_LOTE = 5000
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+COLUMNAS_PAGOS = [
+    Pago.id,
+    Pago.prestamo_id,
+    Pago.numero_cuota,
+    Pago.monto,
+    Pago.fecha_vencimiento,
+    Pago.fecha_pago,
+    Pago.estado,
+]
+
+COLUMNAS_PRESTAMOS = [
+    Prestamo.id,
+    Prestamo.cliente_id,
+    Prestamo.monto,
+    Prestamo.tasa_interes,
+    Prestamo.plazo_meses,
+    Prestamo.fecha_inicio,
+    Prestamo.fecha_vencimiento,
+    Prestamo.estado,
+    Prestamo.saldo_pendiente,
+    Prestamo.cuota_mensual,
+    Prestamo.cuotas_pagadas,
+    Prestamo.cuotas_pendientes,
+    Prestamo.cuotas_vencidas,
+    Prestamo.total_pagado,
+]
+
+def consulta_pagos(prestamo_id: int = None, estado: str = None):
+    """
+    Consulta de exportación de pagos con los mismos filtros que GET /pagos
+    """
+    consulta = select(*COLUMNAS_PAGOS)
+    if prestamo_id:
+        consulta = consulta.where(Pago.prestamo_id == prestamo_id, particiones.ventana_prestamo(prestamo_id))
+    if estado:
+        consulta = consulta.where(Pago.estado == estado)
+    return consulta.order_by(Pago.id)
+
+def consulta_prestamos(estado: str = None, cliente_id: int = None):
+    """
+    Consulta de exportación de préstamos con los mismos filtros que GET /prestamos
+    """
+    consulta = select(*COLUMNAS_PRESTAMOS)
+    if estado:
+        consulta = consulta.where(Prestamo.estado == estado)
+    if cliente_id:
+        consulta = consulta.where(Prestamo.cliente_id == cliente_id)
+    return consulta.order_by(Prestamo.id)
+
+def _conversores(columnas) -> list:
+    """
+    (posición, función) de las columnas que no se serializan tal cual:
+    fechas a ISO 8601 y enums a su valor
+    """
+    conversores = []
+    for posicion, columna in enumerate(columnas):
+        if isinstance(columna.type, DateTime):
+            conversores.append((posicion, datetime.isoformat))
+        elif isinstance(columna.type, Enum):
+            conversores.append((posicion, operator.attrgetter("value")))
+    return conversores
+
+def _convertir(filas, conversores) -> list:
+    convertidas = []
+    for fila in filas:
+        fila = list(fila)
+        for posicion, convertir in conversores:
+            if fila[posicion] is not None:
+                fila[posicion] = convertir(fila[posicion])
+        convertidas.append(fila)
+    return convertidas
+
+def _csv(nombres, filas, cabecera: bool) -> str:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    if cabecera:
+        escritor.writerow(nombres)
+    escritor.writerows(filas)
+    return buffer.getvalue()
+
+def _ndjson(nombres, filas, cabecera: bool) -> str:
+    return "".join(
+        json.dumps(dict(zip(nombres, fila)), ensure_ascii=False) + "\n"
+        for fila in filas
+    )
+
+_SERIALIZADORES = {"csv": _csv, "ndjson": _ndjson}
+
+def generar_exportacion(consulta, formato: str, tamano_lote: int = TAMANO_LOTE, motor=None):
+    """
+    Generador de fragmentos de texto con las filas de la consulta.
+    Abre su propia conexión (la sesión de la petición ya se cerró cuando
+    empieza el streaming) y la mantiene hasta terminar o hasta que el
+    cliente se desconecta. Sin motor usa el de la primaria.
+    """
+    serializar = _SERIALIZADORES[formato]
+    nombres = [columna.name for columna in consulta.selected_columns]
+    conversores = _conversores(consulta.selected_columns)
+
+    with (motor or engine).connect() as conexion:
+        resultado = conexion.execution_options(stream_results=True, yield_per=tamano_lote).execute(consulta)
+        cabecera = True
+        for filas in resultado.partitions():
+            yield serializar(nombres, _convertir(filas, conversores), cabecera)
+            cabecera = False
+        if cabecera and formato == "csv":
+            # Sin filas: solo la cabecera
+            yield serializar(nombres, [], cabecera)
+
+def crear_respuesta(consulta, formato: str, nombre: str, motor=None) -> StreamingResponse:
+    """
+    StreamingResponse con la exportación de la consulta.
+    Lanza ValueError si el formato no es csv ni ndjson.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato} (usar csv o ndjson)")
+
+    return StreamingResponse(
+        generar_exportacion(consulta, formato, motor=motor),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'}
+    )
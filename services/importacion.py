@@ -0,0 +1,122 @@
+"""
+Lectura de archivos de pagos (conciliación bancaria) en CSV o NDJSON
+
+Cada fila indica prestamo_id, numero_cuota, monto y, opcionalmente,
+fecha_pago (ISO 8601). El archivo se lee línea a línea; las filas inválidas
+no detienen la lectura y se devuelven con su error para el informe.
+"""
+
+import codecs
+import csv
+import json
+import math
+import os
+from datetime import datetime
+from typing import List, Optional
+
+# Máximo de filas aceptadas en un archivo
+MAX_FILAS_ARCHIVO = 100000
+
+FORMATOS = ("csv", "ndjson")
+
+_EXTENSIONES = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+_TIPOS = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+
+class ArchivoDemasiadoGrande(ValueError):
+    """
+    El archivo supera MAX_FILAS_ARCHIVO filas
+    """
+
+def detectar_formato(formato: Optional[str], nombre: Optional[str], tipo: Optional[str]) -> str:
+    """
+    Formato indicado explícitamente o, si no, deducido de la extensión o del tipo MIME.
+    Lanza ValueError si no se puede determinar.
+    """
+    if formato:
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato} (usar csv o ndjson)")
+        return formato
+
+    extension = os.path.splitext(nombre or "")[1].lower()
+    if extension in _EXTENSIONES:
+        return _EXTENSIONES[extension]
+
+    tipo = (tipo or "").split(";")[0].strip().lower()
+    if tipo in _TIPOS:
+        return _TIPOS[tipo]
+
+    raise ValueError("No se pudo determinar el formato del archivo (indicar ?formato=csv o ?formato=ndjson)")
+
+def _validar(linea: int, datos) -> dict:
+    if not isinstance(datos, dict):
+        return {"linea": linea, "error": "La fila debe ser un objeto con prestamo_id, numero_cuota y monto"}
+
+    fila = {"linea": linea}
+    try:
+        fila["prestamo_id"] = int(datos["prestamo_id"])
+        fila["numero_cuota"] = int(datos["numero_cuota"])
+        monto = float(datos["monto"])
+    except KeyError as e:
+        fila["error"] = f"Falta el campo {e.args[0]}"
+        return fila
+    except (TypeError, ValueError, OverflowError):
+        fila["error"] = "prestamo_id, numero_cuota y monto deben ser numéricos"
+        return fila
+
+    # float() acepta "inf", "nan" y "1e308", que no caben en la columna monto
+    if not math.isfinite(monto):
+        fila["error"] = "El monto debe ser un número finito"
+        return fila
+    if monto <= 0:
+        fila["error"] = "El monto debe ser mayor a 0"
+        return fila
+    fila["monto"] = monto
+
+    fecha_pago = datos.get("fecha_pago")
+    if fecha_pago:
+        try:
+            fila["fecha_pago"] = datetime.fromisoformat(str(fecha_pago))
+        except ValueError:
+            fila["error"] = "fecha_pago debe tener formato ISO 8601"
+            return fila
+    return fila
+
+def leer_pagos(archivo, formato: str) -> List[dict]:
+    """
+    Filas del archivo (binario) en orden: {linea, prestamo_id, numero_cuota, monto, fecha_pago?}
+    o {linea, error} si la fila no es válida.
+    Lanza ArchivoDemasiadoGrande si el archivo supera MAX_FILAS_ARCHIVO filas
+    y ValueError si el CSV está mal formado.
+    """
+    texto = codecs.getreader("utf-8-sig")(archivo)
+
+    if formato == "csv":
+        lector = csv.DictReader(texto)
+        # La línea 1 es la cabecera
+        registros = ((lector.line_num, datos) for datos in lector)
+    else:
+        registros = (
+            (numero, linea)
+            for numero, linea in enumerate(texto, start=1)
+            if linea.strip()
+        )
+
+    filas = []
+    try:
+        for linea, datos in registros:
+            if len(filas) >= MAX_FILAS_ARCHIVO:
+                raise ArchivoDemasiadoGrande(f"El archivo no puede superar {MAX_FILAS_ARCHIVO} filas")
+
+            if formato == "ndjson":
+                try:
+                    datos = json.loads(datos)
+                except ValueError:
+                    filas.append({"linea": linea, "error": "JSON inválido"})
+                    continue
+            filas.append(_validar(linea, datos))
+    except csv.Error as e:
+        # Error de estructura (p. ej. un byte nulo o un campo demasiado largo):
+        # el resto del archivo no se puede leer con fiabilidad
+        raise ValueError(f"CSV mal formado en la línea {lector.line_num}: {e}")
+
+    return filas
@@ -0,0 +1,127 @@
+"""
+Ruta rápida de lectura: select() de Core → diccionarios → JSON con orjson
+
+Los listados de solo lectura no necesitan objetos ORM (mapa de identidad,
+atributos instrumentados) ni revalidar cada fila con los esquemas Pydantic
+(from_attributes): las columnas que se seleccionan son exactamente los campos
+del esquema de respuesta y la base de datos ya garantiza sus tipos. Las filas
+se convierten en diccionarios y orjson las codifica directamente (fechas en
+ISO 8601 y enums por su valor, igual que Pydantic).
+
+Las rutas siguen declarando response_model para la documentación OpenAPI;
+al devolver una RespuestaJSON FastAPI no vuelve a validar el contenido.
+scripts/benchmark_serializacion.py compara esta ruta con la del ORM.
+"""
+
+from typing import Iterable, List, Optional, Sequence
+
+import orjson
+from fastapi import Response
+from sqlalchemy import select
+
+from models.models import Cliente, Prestamo, Pago
+from services.paginacion import CABECERA_CURSOR
+
+# Columnas de cada esquema de respuesta, en el orden de sus campos
+
+COLUMNAS_CLIENTE = [
+    Cliente.nombre,
+    Cliente.apellido,
+    Cliente.email,
+    Cliente.telefono,
+    Cliente.direccion,
+    Cliente.documento_identidad,
+    Cliente.id,
+    Cliente.fecha_registro,
+    Cliente.activo,
+]
+
+COLUMNAS_PRESTAMO = [
+    Prestamo.cliente_id,
+    Prestamo.monto,
+    Prestamo.tasa_interes,
+    Prestamo.plazo_meses,
+    Prestamo.id,
+    Prestamo.fecha_inicio,
+    Prestamo.fecha_vencimiento,
+    Prestamo.estado,
+    Prestamo.saldo_pendiente,
+    Prestamo.cuota_mensual,
+]
+
+COLUMNAS_PAGO = [
+    Pago.prestamo_id,
+    Pago.monto,
+    Pago.fecha_vencimiento,
+    Pago.numero_cuota,
+    Pago.id,
+    Pago.fecha_pago,
+    Pago.estado,
+]
+
+_NOMBRES_CLIENTE = [columna.key for columna in COLUMNAS_CLIENTE]
+_NOMBRES_PRESTAMO = [columna.key for columna in COLUMNAS_PRESTAMO]
+_NOMBRES_PAGO = [columna.key for columna in COLUMNAS_PAGO]
+
+class RespuestaJSON(Response):
+    """
+    Respuesta JSON codificada con orjson (UTC como "Z", igual que Pydantic)
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+def respuesta(contenido, cursor: Optional[str] = None, headers: Optional[dict] = None) -> RespuestaJSON:
+    """
+    RespuestaJSON con el contenido y, si hay página siguiente, la cabecera del cursor
+    """
+    headers = dict(headers or {})
+    if cursor:
+        headers[CABECERA_CURSOR] = cursor
+    return RespuestaJSON(content=contenido, headers=headers)
+
+# Consultas (admiten los mismos where/order_by que las del ORM)
+
+def consulta_clientes():
+    return select(*COLUMNAS_CLIENTE)
+
+def consulta_prestamos():
+    """
+    Préstamos con las columnas de su cliente en la misma fila (un solo JOIN)
+    """
+    return (
+        select(
+            *COLUMNAS_PRESTAMO,
+            *(columna.label(f"cliente_{columna.key}") for columna in COLUMNAS_CLIENTE)
+        )
+        .join(Cliente, Cliente.id == Prestamo.cliente_id)
+    )
+
+def consulta_prestamos_sin_cliente():
+    return select(*COLUMNAS_PRESTAMO)
+
+def consulta_pagos():
+    return select(*COLUMNAS_PAGO)
+
+# Conversión de filas a diccionarios con la forma de los esquemas
+
+def clientes(filas: Iterable[Sequence]) -> List[dict]:
+    return [dict(zip(_NOMBRES_CLIENTE, fila)) for fila in filas]
+
+def prestamos(filas: Iterable[Sequence], cliente: Optional[dict] = None) -> List[dict]:
+    """
+    Filas de consulta_prestamos() (con las columnas del cliente) o, si se
+    indica el cliente ya leído, filas de consulta_prestamos_sin_cliente()
+    """
+    corte = len(_NOMBRES_PRESTAMO)
+    resultado = []
+    for fila in filas:
+        prestamo = dict(zip(_NOMBRES_PRESTAMO, fila[:corte]))
+        prestamo["cliente"] = cliente if cliente is not None else dict(zip(_NOMBRES_CLIENTE, fila[corte:]))
+        resultado.append(prestamo)
+    return resultado
+
+def pagos(filas: Iterable[Sequence]) -> List[dict]:
+    return [dict(zip(_NOMBRES_PAGO, fila)) for fila in filas]
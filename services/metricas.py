@@ -0,0 +1,184 @@
+"""
+Métricas de latencia por ruta y de acceso a la base de datos en formato Prometheus
+
+* MiddlewareMetricas mide cada petición HTTP: latencia y tamaño de la
+  respuesta por ruta (la plantilla, p. ej. /pagos/resumen/prestamo/{prestamo_id},
+  no la URL concreta), y cuántas consultas SQL hizo y cuánto tiempo pasó en la
+  base de datos.
+* instrumentar_motor registra los eventos before/after_cursor_execute del
+  motor: duración de cada consulta y acumulado de la petición en curso, además
+  de la espera por una conexión del pool y las conexiones en uso.
+
+GET /metrics devuelve todo en formato de texto de Prometheus. Con gunicorn cada
+worker es un proceso distinto: gunicorn.conf.py define PROMETHEUS_MULTIPROC_DIR
+y prometheus_client escribe los valores de cada proceso en ese directorio, de
+modo que /metrics agrega todos los workers sea cual sea el que atiende la
+petición (child_exit limpia los de los workers que terminan).
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+MULTIPROCESO = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# Ruta de las peticiones que no coinciden con ninguna (404): una sola etiqueta
+# para no crear una serie por URL
+SIN_RUTA = "sin_ruta"
+
+LATENCIA = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por ruta",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+TAMANO_RESPUESTA = Histogram(
+    "http_response_size_bytes",
+    "Tamaño del cuerpo de la respuesta por ruta",
+    ["method", "route"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000),
+)
+CONSULTAS_PETICION = Histogram(
+    "db_queries_per_request",
+    "Consultas SQL ejecutadas por petición",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500),
+)
+TIEMPO_DB_PETICION = Histogram(
+    "db_time_per_request_seconds",
+    "Tiempo total en la base de datos por petición",
+    ["method", "route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DURACION_CONSULTA = Histogram(
+    "db_query_duration_seconds",
+    "Duración de cada consulta SQL",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+ESPERA_POOL = Histogram(
+    "db_pool_wait_seconds",
+    "Espera para obtener una conexión del pool",
+    ["engine"],
+    buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10),
+)
+CONEXIONES_EN_USO = Gauge(
+    "db_pool_connections_in_use",
+    "Conexiones del pool entregadas en este momento",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+
+class _Peticion:
+    """
+    Acumulado de la petición en curso (compartido con el hilo que ejecuta el endpoint)
+    """
+
+    __slots__ = ("consultas", "tiempo_db")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_db = 0.0
+
+_peticion: ContextVar[Optional[_Peticion]] = ContextVar("peticion_metricas", default=None)
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que registra latencia, tamaño de respuesta y consultas por ruta
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        peticion = _Peticion()
+        token = _peticion.set(peticion)
+        estado = {"codigo": 500, "bytes": 0}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+            elif mensaje["type"] == "http.response.body":
+                estado["bytes"] += len(mensaje.get("body", b""))
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracion = time.perf_counter() - inicio
+            _peticion.reset(token)
+            # El router deja en el scope la ruta que atendió la petición
+            ruta = getattr(scope.get("route"), "path", SIN_RUTA)
+            metodo = scope["method"]
+            LATENCIA.labels(metodo, ruta, str(estado["codigo"])).observe(duracion)
+            TAMANO_RESPUESTA.labels(metodo, ruta).observe(estado["bytes"])
+            CONSULTAS_PETICION.labels(metodo, ruta).observe(peticion.consultas)
+            TIEMPO_DB_PETICION.labels(metodo, ruta).observe(peticion.tiempo_db)
+
+def instrumentar_motor(motor, nombre: str, estadisticas_pool=None):
+    """
+    Registra los eventos de consultas y del pool de un motor síncrono
+    (para el asíncrono, pasar async_engine.sync_engine)
+    """
+    duracion = DURACION_CONSULTA.labels(nombre)
+    en_uso = CONEXIONES_EN_USO.labels(nombre)
+
+    @event.listens_for(motor, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+    @event.listens_for(motor, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        segundos = time.perf_counter() - conn.info["inicio_consultas"].pop()
+        duracion.observe(segundos)
+        peticion = _peticion.get()
+        if peticion is not None:
+            peticion.consultas += 1
+            peticion.tiempo_db += segundos
+
+    @event.listens_for(motor, "handle_error")
+    def _error(contexto):
+        # La consulta falló: after_cursor_execute no se ejecuta
+        inicios = contexto.connection.info.get("inicio_consultas") if contexto.connection is not None else None
+        if inicios:
+            inicios.pop()
+
+    @event.listens_for(motor, "checkout")
+    def _entregada(dbapi_connection, connection_record, connection_proxy):
+        en_uso.inc()
+
+    @event.listens_for(motor, "checkin")
+    def _devuelta(dbapi_connection, connection_record):
+        en_uso.dec()
+
+    if estadisticas_pool is not None:
+        espera = ESPERA_POOL.labels(nombre)
+        estadisticas_pool.oyentes.append(lambda segundos, timeout: espera.observe(segundos))
+
+def exportar() -> tuple:
+    """
+    (cuerpo, content-type) con las métricas de todos los workers
+    """
+    if MULTIPROCESO:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
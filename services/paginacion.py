@@ -0,0 +1,67 @@
+"""
+Paginación por cursor (keyset)
+
+El cursor es opaco para el cliente: codifica en base64 los valores de la clave
+de orden de la última fila devuelta. La página siguiente se obtiene filtrando
+por (clave) > (cursor), lo que usa el índice y mantiene constante la latencia
+independientemente de la posición, a diferencia de OFFSET.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import DateTime, tuple_
+
+# Cabecera de respuesta con el cursor de la página siguiente
+CABECERA_CURSOR = "X-Next-Cursor"
+
+def codificar_cursor(valores: Sequence) -> str:
+    """
+    Codifica los valores de la clave de orden en un cursor opaco
+    """
+    datos = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    crudo = json.dumps(datos, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str, columnas: Sequence) -> list:
+    """
+    Decodifica un cursor y convierte sus valores al tipo de cada columna
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(datos, list) or len(datos) != len(columnas):
+            raise ValueError
+        return [
+            datetime.fromisoformat(valor) if isinstance(columna.type, DateTime) else valor
+            for columna, valor in zip(columnas, datos)
+        ]
+    except (ValueError, TypeError):
+        raise ValueError("Cursor de paginación inválido")
+
+def aplicar_paginacion(query, columnas: Sequence, limit: int, skip: int = 0, after: Optional[str] = None):
+    """
+    Ordena la consulta por la clave estable y aplica cursor (after) u offset (skip).
+    Pide una fila de más para saber si existe página siguiente.
+    Sirve tanto para Query como para select().
+    """
+    query = query.order_by(*columnas)
+    if after:
+        valores = decodificar_cursor(after, columnas)
+        query = query.where(tuple_(*columnas) > tuple_(*valores))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+def recortar_pagina(filas: List, columnas: Sequence, limit: int) -> Tuple[List, Optional[str]]:
+    """
+    Descarta la fila extra y devuelve el cursor de la página siguiente (o None)
+    """
+    if len(filas) <= limit:
+        return filas, None
+    filas = filas[:limit]
+    if not filas:
+        return filas, None
+    ultima = filas[-1]
+    return filas, codificar_cursor([getattr(ultima, columna.key) for columna in columnas])
@@ -0,0 +1,152 @@
+"""
+Particiones de la tabla pagos
+
+La migración 0007 convierte pagos en una tabla particionada de PostgreSQL según
+PAGOS_PARTICIONES al migrar:
+
+* hash (por defecto): PAGOS_PARTICIONES_HASH particiones por prestamo_id
+  (pagos_h00, ...). Todas las cuotas de un préstamo quedan en una sola
+  partición y el índice único (prestamo_id, numero_cuota) se mantiene.
+* rango: una partición por mes de fecha_vencimiento (meses en UTC,
+  pagos_AAAA_MM) y pagos_default para las cuotas fuera de los meses creados.
+  El barrido de vencimientos y los resúmenes por fecha solo leen los meses que
+  les afectan, y los meses antiguos dejan de recibir escrituras (VACUUM y
+  autovacuum trabajan sobre particiones pequeñas). El índice único de la cuota
+  tiene que incluir fecha_vencimiento y ya no garantiza un solo numero_cuota
+  por préstamo.
+
+Con particiones por rango, crear_particiones_futuras() mantiene creados los
+PAGOS_MESES_FUTUROS meses siguientes (se ejecuta en scripts/migrar.py y antes
+del barrido diario). Si pagos_default tiene cuotas de un mes nuevo, se mueven a
+su partición al crearla.
+
+Poda de particiones: el planificador solo descarta particiones con
+condiciones sobre la clave. Las consultas de las cuotas de un préstamo añaden
+ventana_prestamo() (o en_ventana() si ya tienen el préstamo): con hash las poda
+prestamo_id y con rango esa ventana de fechas, que PostgreSQL resuelve al
+ejecutar la consulta.
+"""
+
+import logging
+import os
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, select, text
+
+from models.models import Pago, Prestamo
+
+logger = logging.getLogger(__name__)
+
+# Meses siguientes al actual que deben tener partición (particiones por rango)
+MESES_FUTUROS = int(os.getenv("PAGOS_MESES_FUTUROS", "24"))
+
+# Clave del advisory lock que serializa la creación de particiones entre workers
+CLAVE_BLOQUEO = 7_270_003
+
+# Margen de la ventana de vencimientos de un préstamo: las cuotas vencen cada
+# 30 días desde el alta y la fecha final del préstamo se calcula aparte (en la
+# aplicación, no en la base de datos)
+MARGEN_VENTANA = timedelta(days=31)
+
+TABLA = "pagos"
+DEFAULT = "pagos_default"
+
+ESTRATEGIAS = {"r": "rango", "h": "hash"}
+
+def nombre_mes(mes: date) -> str:
+    return f"{TABLA}_{mes:%Y_%m}"
+
+def sumar_meses(mes: date, meses: int) -> date:
+    indice = mes.year * 12 + mes.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+def en_ventana(inicio, fin):
+    """
+    Condición sobre la clave de rango: cuotas que vencen entre el inicio y la
+    fecha final de un préstamo (columnas, subconsultas o fechas ya leídas)
+    """
+    return Pago.fecha_vencimiento.between(inicio - MARGEN_VENTANA, fin + MARGEN_VENTANA)
+
+def ventana_prestamo(prestamo_id: int):
+    """
+    Condición de las cuotas de un préstamo que permite podar particiones por
+    rango: las fechas del préstamo se leen en subconsultas (InitPlan) y
+    PostgreSQL descarta al ejecutar los meses fuera de la ventana
+    """
+    inicio = select(Prestamo.fecha_inicio).where(Prestamo.id == prestamo_id).scalar_subquery()
+    fin = select(Prestamo.fecha_vencimiento).where(Prestamo.id == prestamo_id).scalar_subquery()
+    return en_ventana(inicio, fin)
+
+def estrategia(conexion) -> Optional[str]:
+    """
+    "rango", "hash" o None si pagos no está particionada
+    """
+    if conexion.dialect.name != "postgresql":
+        return None
+    tipo = conexion.scalar(text(
+        "SELECT partstrat FROM pg_partitioned_table WHERE partrelid = to_regclass(:tabla)"
+    ), {"tabla": TABLA})
+    return ESTRATEGIAS.get(tipo)
+
+def particiones(conexion) -> List[dict]:
+    """
+    Particiones de pagos con sus límites y el número estimado de filas
+    (estadísticas de ANALYZE/autovacuum)
+    """
+    filas = conexion.execute(text("""
+        SELECT hija.relname, pg_get_expr(hija.relpartbound, hija.oid), greatest(hija.reltuples, 0)::bigint
+        FROM pg_inherits
+        JOIN pg_class hija ON hija.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(:tabla)
+        ORDER BY hija.relname
+    """), {"tabla": TABLA}).all()
+    return [{"nombre": nombre, "limites": limites, "filas_estimadas": filas} for nombre, limites, filas in filas]
+
+def _crear_mes(conexion, mes: date, hay_default: bool):
+    """
+    Crea la partición del mes moviendo antes a ella las cuotas de ese mes que
+    estuvieran en pagos_default (ATTACH falla si la partición por defecto
+    tiene filas del rango nuevo)
+    """
+    nombre = nombre_mes(mes)
+    desde, hasta = f"{mes:%Y-%m-%d} 00:00:00+00", f"{sumar_meses(mes, 1):%Y-%m-%d} 00:00:00+00"
+    conexion.execute(text(f"CREATE TABLE {nombre} (LIKE {TABLA} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    if hay_default:
+        movidas = conexion.execute(text(f"""
+            WITH movidas AS (
+                DELETE FROM {DEFAULT}
+                WHERE fecha_vencimiento >= CAST(:desde AS timestamptz) AND fecha_vencimiento < CAST(:hasta AS timestamptz)
+                RETURNING *
+            )
+            INSERT INTO {nombre} SELECT * FROM movidas
+        """), {"desde": desde, "hasta": hasta}).rowcount
+        if movidas:
+            logger.info("%d cuotas movidas de %s a %s", movidas, DEFAULT, nombre)
+    conexion.execute(text(f"ALTER TABLE {TABLA} ATTACH PARTITION {nombre} FOR VALUES FROM ('{desde}') TO ('{hasta}')"))
+
+def crear_particiones_futuras(motor=None, meses: int = MESES_FUTUROS) -> List[str]:
+    """
+    Crea las particiones que falten desde el mes actual hasta dentro de
+    `meses` meses y devuelve sus nombres. Sin particiones por rango no hace nada.
+    """
+    if motor is None:
+        from config.database import engine as motor
+
+    with motor.begin() as conexion:
+        if estrategia(conexion) != "rango":
+            return []
+        conexion.execute(text("SELECT pg_advisory_xact_lock(:clave)"), {"clave": CLAVE_BLOQUEO})
+
+        existentes = {particion["nombre"] for particion in particiones(conexion)}
+        actual = conexion.scalar(select(func.date_trunc("month", func.timezone("UTC", func.now())))).date()
+        creadas = []
+        for desplazamiento in range(meses + 1):
+            mes = sumar_meses(actual, desplazamiento)
+            if nombre_mes(mes) not in existentes:
+                _crear_mes(conexion, mes, DEFAULT in existentes)
+                creadas.append(nombre_mes(mes))
+
+    if creadas:
+        logger.info("Particiones de pagos creadas: %s", ", ".join(creadas))
+    return creadas
@@ -1,11 +1,40 @@
+import logging
 from datetime import datetime, timedelta
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from models.models import Prestamo, Pago, EstadoPrestamo, EstadoPago
+from sqlalchemy import DateTime, Float, Integer, bindparam, case, column, exists, func, insert, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from models.models import Cliente, Prestamo, Pago, EstadoPrestamo, EstadoPago
 from schemas.schemas import PrestamoCreate, CalculoCuota
+from services import cache, particiones
 import math
 
+logger = logging.getLogger(__name__)
+
+class NoEncontrado(ValueError):
+    """
+    El préstamo o la cuota indicados no existen
+    """
+
+# Contador de Prestamo que corresponde a cada estado de cuota
+CONTADORES_ESTADO = {
+    EstadoPago.REALIZADO: "cuotas_pagadas",
+    EstadoPago.PENDIENTE: "cuotas_pendientes",
+    EstadoPago.VENCIDO: "cuotas_vencidas",
+}
+
+def _unnest(nombre: str, **columnas):
+    """
+    Tabla derivada unnest(:col1, :col2, ...) AS nombre(col1, col2, ...) con un
+    parámetro array por columna, del mismo nombre que la columna (en un UPDATE
+    no puede coincidir con una columna de la tabla actualizada)
+    """
+    return (
+        func.unnest(*(bindparam(columna, type_=ARRAY(tipo)) for columna, tipo in columnas.items()))
+        .table_valued(*(column(columna, tipo) for columna, tipo in columnas.items()))
+        .render_derived(name=nombre)
+    )
+
 class PrestamoService:
     
     @staticmethod
@@ -57,18 +86,106 @@ class PrestamoService:
             plazo_meses=prestamo_data.plazo_meses,
             fecha_vencimiento=fecha_vencimiento,
             saldo_pendiente=prestamo_data.monto,
-            cuota_mensual=calculo.cuota_mensual
+            cuota_mensual=calculo.cuota_mensual,
+            cuotas_pendientes=prestamo_data.plazo_meses
         )
         
+        # Préstamo y cuotas en una sola transacción
         db.add(prestamo)
+        db.flush()
+        db.execute(
+            insert(Pago),
+            PrestamoService._filas_cuotas(prestamo.id, prestamo.plazo_meses, calculo.cuota_mensual, datetime.now())
+        )
         db.commit()
         db.refresh(prestamo)
         
-        # Generar cuotas automáticamente
-        PrestamoService.generar_cuotas(db, prestamo.id, calculo.cuota_mensual)
-        
         return prestamo
     
+    @staticmethod
+    def crear_prestamos_lote(db: Session, prestamos_data: List[PrestamoCreate]) -> List[dict]:
+        """
+        Crea varios préstamos con sus cuotas en una sola transacción.
+        Devuelve un resultado por elemento, en el mismo orden, con el id creado o el error.
+        """
+        resultados = [
+            {"indice": indice, "cliente_id": data.cliente_id}
+            for indice, data in enumerate(prestamos_data)
+        ]
+        
+        # Validar todos los clientes con una sola consulta
+        ids_clientes = {data.cliente_id for data in prestamos_data}
+        clientes_activos = dict(
+            db.query(Cliente.id, Cliente.activo).filter(Cliente.id.in_(ids_clientes)).all()
+        )
+        
+        validos = []
+        for indice, data in enumerate(prestamos_data):
+            if data.cliente_id not in clientes_activos:
+                resultados[indice]["error"] = "Cliente no encontrado"
+            elif not clientes_activos[data.cliente_id]:
+                resultados[indice]["error"] = "El cliente no está activo"
+            else:
+                validos.append(indice)
+        
+        if not validos:
+            return resultados
+        
+        ahora = datetime.now()
+        filas_prestamos = []
+        for indice in validos:
+            data = prestamos_data[indice]
+            calculo = PrestamoService.calcular_cuota_mensual(data.monto, data.tasa_interes, data.plazo_meses)
+            resultados[indice]["cuota_mensual"] = calculo.cuota_mensual
+            filas_prestamos.append({
+                "cliente_id": data.cliente_id,
+                "monto": data.monto,
+                "tasa_interes": data.tasa_interes,
+                "plazo_meses": data.plazo_meses,
+                "fecha_vencimiento": ahora + timedelta(days=data.plazo_meses * 30),
+                "saldo_pendiente": data.monto,
+                "cuota_mensual": calculo.cuota_mensual,
+                "cuotas_pendientes": data.plazo_meses,
+            })
+        
+        try:
+            # INSERT ... RETURNING id en lotes multi-fila, en el orden de los parámetros
+            ids = db.scalars(
+                insert(Prestamo).returning(Prestamo.id, sort_by_parameter_order=True),
+                filas_prestamos
+            ).all()
+            
+            filas_cuotas = []
+            for prestamo_id, fila in zip(ids, filas_prestamos):
+                filas_cuotas.extend(
+                    PrestamoService._filas_cuotas(prestamo_id, fila["plazo_meses"], fila["cuota_mensual"], ahora)
+                )
+            db.execute(insert(Pago), filas_cuotas)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        
+        for indice, prestamo_id in zip(validos, ids):
+            resultados[indice]["prestamo_id"] = prestamo_id
+        
+        return resultados
+    
+    @staticmethod
+    def _filas_cuotas(prestamo_id: int, plazo_meses: int, cuota_mensual: float, inicio: datetime) -> List[dict]:
+        """
+        Filas de las cuotas mensuales de un préstamo, listas para un INSERT masivo
+        """
+        return [
+            {
+                "prestamo_id": prestamo_id,
+                "monto": cuota_mensual,
+                "fecha_vencimiento": inicio + timedelta(days=(i + 1) * 30),
+                "numero_cuota": i + 1,
+            }
+            for i in range(plazo_meses)
+        ]
+    
     @staticmethod
     def generar_cuotas(db: Session, prestamo_id: int, cuota_mensual: float):
         """
@@ -78,71 +195,297 @@ class PrestamoService:
         if not prestamo:
             return
         
-        cuotas = []
-        for i in range(prestamo.plazo_meses):
-            fecha_vencimiento = datetime.now() + timedelta(days=(i + 1) * 30)
-            cuota = Pago(
-                prestamo_id=prestamo_id,
-                monto=cuota_mensual,
-                fecha_vencimiento=fecha_vencimiento,
-                numero_cuota=i + 1
-            )
-            cuotas.append(cuota)
-        
-        db.add_all(cuotas)
+        db.execute(
+            insert(Pago),
+            PrestamoService._filas_cuotas(prestamo_id, prestamo.plazo_meses, cuota_mensual, datetime.now())
+        )
+        prestamo.cuotas_pendientes = Prestamo.cuotas_pendientes + prestamo.plazo_meses
         db.commit()
+        cache.invalidar_prestamos([prestamo_id])
+    
+    @staticmethod
+    def sentencia_contadores(prestamo_id: int, estado_anterior: Optional[EstadoPago], estado_nuevo: Optional[EstadoPago], monto: float):
+        """
+        UPDATE que mueve una cuota entre los contadores de su préstamo y sube la
+        versión del préstamo (cualquier cambio en una cuota cambia el ETag de sus cuotas).
+        estado_anterior=None indica una cuota nueva y estado_nuevo=None una cuota eliminada.
+        """
+        valores = {"version": Prestamo.version + 1}
+        mismo_estado = (
+            estado_anterior is not None and estado_nuevo is not None
+            and EstadoPago(estado_anterior) == EstadoPago(estado_nuevo)
+        )
+        if estado_anterior is not None and not mismo_estado:
+            contador = CONTADORES_ESTADO[EstadoPago(estado_anterior)]
+            valores[contador] = getattr(Prestamo, contador) - 1
+        if estado_nuevo is not None and not mismo_estado:
+            contador = CONTADORES_ESTADO[EstadoPago(estado_nuevo)]
+            valores[contador] = valores.get(contador, getattr(Prestamo, contador)) + 1
+        
+        # total_pagado acumula el monto de las cuotas realizadas
+        pagada_antes = estado_anterior is not None and EstadoPago(estado_anterior) == EstadoPago.REALIZADO
+        pagada_despues = estado_nuevo is not None and EstadoPago(estado_nuevo) == EstadoPago.REALIZADO
+        if pagada_antes != pagada_despues:
+            valores["total_pagado"] = Prestamo.total_pagado + (monto if pagada_despues else -monto)
+        
+        return (
+            update(Prestamo)
+            .where(Prestamo.id == prestamo_id)
+            .values(**valores)
+            .execution_options(synchronize_session=False)
+        )
+    
+    @staticmethod
+    def valores_abono(abonado, pagadas, pendientes, vencidas, total) -> dict:
+        """
+        Valores del UPDATE de Prestamo que aplica pagos de cuotas: descuenta lo
+        abonado del saldo (sin bajar de 0, y el préstamo queda pagado al llegar a 0),
+        mueve las cuotas pagadas entre los contadores y sube la versión.
+        Los argumentos pueden ser valores o expresiones SQL.
+        """
+        saldado = Prestamo.saldo_pendiente - abonado <= 0
+        return {
+            "saldo_pendiente": case((saldado, 0), else_=Prestamo.saldo_pendiente - abonado),
+            "estado": case(
+                (saldado, literal(EstadoPrestamo.PAGADO, Prestamo.estado.type)),
+                else_=Prestamo.estado
+            ),
+            "cuotas_pagadas": Prestamo.cuotas_pagadas + pagadas,
+            "cuotas_pendientes": Prestamo.cuotas_pendientes - pendientes,
+            "cuotas_vencidas": Prestamo.cuotas_vencidas - vencidas,
+            "total_pagado": Prestamo.total_pagado + total,
+            "version": Prestamo.version + 1,
+        }
     
     @staticmethod
     def registrar_pago(db: Session, prestamo_id: int, monto: float, numero_cuota: int) -> Pago:
         """
-        Registra un pago de cuota
+        Registra un pago de cuota.
+        La cuota y el préstamo se actualizan en una sola sentencia (un viaje a la
+        base de datos): un CTE bloquea la cuota si sigue pendiente o vencida y su
+        préstamo está abierto, y el saldo se descuenta en el propio UPDATE, así que
+        dos pagos simultáneos sobre el mismo préstamo no pisan el saldo del otro.
+        Lanza NoEncontrado si el préstamo o la cuota no existen y ValueError si
+        el préstamo está pagado o cancelado o la cuota ya fue pagada.
         """
-        # Buscar la cuota
-        cuota = db.query(Pago).filter(
-            Pago.prestamo_id == prestamo_id,
-            Pago.numero_cuota == numero_cuota
+        objetivo = (
+            select(Pago.id, Pago.prestamo_id, Pago.fecha_vencimiento, Pago.monto, Pago.estado)
+            .join(Prestamo, Prestamo.id == Pago.prestamo_id)
+            .where(
+                Pago.prestamo_id == prestamo_id,
+                Pago.numero_cuota == numero_cuota,
+                particiones.ventana_prestamo(prestamo_id),
+                Pago.estado != EstadoPago.REALIZADO,
+                Prestamo.estado.in_([EstadoPrestamo.ACTIVO, EstadoPrestamo.VENCIDO])
+            )
+            .with_for_update(of=Pago)
+            .cte("objetivo")
+        )
+        prestamo = (
+            update(Prestamo)
+            .where(Prestamo.id == objetivo.c.prestamo_id)
+            .values(**PrestamoService.valores_abono(
+                monto,
+                1,
+                case((objetivo.c.estado == EstadoPago.PENDIENTE, 1), else_=0),
+                case((objetivo.c.estado == EstadoPago.VENCIDO, 1), else_=0),
+                objetivo.c.monto
+            ))
+            .cte("prestamo")
+        )
+        cuota = db.scalars(
+            update(Pago)
+            # Con la clave de partición de la cuota (prestamo_id o fecha_vencimiento)
+            # el UPDATE solo visita su partición
+            .where(
+                Pago.id == objetivo.c.id,
+                Pago.prestamo_id == prestamo_id,
+                Pago.fecha_vencimiento == objetivo.c.fecha_vencimiento
+            )
+            .values(estado=EstadoPago.REALIZADO, fecha_pago=datetime.now(), version=Pago.version + 1)
+            .returning(Pago)
+            .add_cte(prestamo)
+            .execution_options(synchronize_session=False)
         ).first()
         
-        if not cuota:
-            raise ValueError("Cuota no encontrada")
-        
-        if cuota.estado == EstadoPago.REALIZADO:
+        if cuota is None:
+            db.rollback()
+            # Solo en el camino de error: averiguar por qué no se aplicó
+            estados = db.execute(
+                select(Prestamo.estado, Pago.estado)
+                .outerjoin(Pago, (Pago.prestamo_id == Prestamo.id) & (Pago.numero_cuota == numero_cuota)
+                           & particiones.en_ventana(Prestamo.fecha_inicio, Prestamo.fecha_vencimiento))
+                .where(Prestamo.id == prestamo_id)
+            ).first()
+            if estados is None:
+                raise NoEncontrado("Préstamo no encontrado")
+            estado_prestamo, estado_cuota = estados
+            if estado_prestamo not in (EstadoPrestamo.ACTIVO, EstadoPrestamo.VENCIDO):
+                raise ValueError("No se pueden registrar pagos en un préstamo pagado o cancelado")
+            if estado_cuota is None:
+                raise NoEncontrado("Cuota no encontrada")
             raise ValueError("Esta cuota ya fue pagada")
         
-        # Actualizar la cuota
-        cuota.estado = EstadoPago.REALIZADO
-        cuota.fecha_pago = datetime.now()
+        # La respuesta usa los valores del RETURNING: se separa de la sesión
+        # para que el commit no la expire y no haga falta recargarla
+        db.expunge(cuota)
+        db.commit()
+        cache.invalidar_prestamos([prestamo_id])
+        
+        return cuota
+    
+    @staticmethod
+    def registrar_pagos_lote(db: Session, filas: List[dict], tamano_lote: int = 5000) -> List[dict]:
+        """
+        Registra muchos pagos de cuota (filas de services.importacion.leer_pagos).
+        Por cada fragmento de tamano_lote filas: resuelve todas las cuotas con una
+        consulta, las marca como realizadas con un solo UPDATE ... FROM unnest(...)
+        y aplica saldos, estados y contadores de los préstamos con otro, en una
+        transacción por fragmento. Devuelve un resultado por fila, en el mismo orden,
+        con el pago_id aplicado o el error.
+        """
+        resultados = []
+        for fila in filas:
+            resultado = {"linea": fila["linea"]}
+            for campo in ("prestamo_id", "numero_cuota", "error"):
+                if campo in fila:
+                    resultado[campo] = fila[campo]
+            resultados.append(resultado)
         
-        # Actualizar saldo pendiente del préstamo
-        prestamo = db.query(Prestamo).filter(Prestamo.id == prestamo_id).first()
-        prestamo.saldo_pendiente -= monto
+        validos = [indice for indice, fila in enumerate(filas) if "error" not in fila]
+        vistas = {}
+        for inicio in range(0, len(validos), tamano_lote):
+            fragmento = validos[inicio:inicio + tamano_lote]
+            try:
+                prestamos = PrestamoService._aplicar_pagos(db, filas, resultados, fragmento, vistas)
+                db.commit()
+                cache.invalidar_prestamos(prestamos)
+            except Exception:
+                # El detalle (SQL, restricciones) queda en el log, no en la respuesta
+                logger.exception("Error al aplicar un fragmento de %d pagos", len(fragmento))
+                db.rollback()
+                for indice in fragmento:
+                    resultados[indice].pop("pago_id", None)
+                    resultados[indice].setdefault("error", "Error al aplicar el lote; reintente estas filas")
+                anulados = set(fragmento)
+                for clave in [clave for clave, indice in vistas.items() if indice in anulados]:
+                    del vistas[clave]
         
-        # Verificar si el préstamo está completamente pagado
-        if prestamo.saldo_pendiente <= 0:
-            prestamo.estado = EstadoPrestamo.PAGADO
-            prestamo.saldo_pendiente = 0
+        return resultados
+    
+    @staticmethod
+    def _aplicar_pagos(db: Session, filas: List[dict], resultados: List[dict], fragmento: List[int], vistas: dict) -> List[int]:
+        """
+        Aplica un fragmento de registrar_pagos_lote dentro de la transacción actual
+        y devuelve los ids de los préstamos modificados.
+        vistas guarda la primera línea de cada (prestamo_id, numero_cuota) del archivo.
+        Los datos viajan como arrays (unnest de PostgreSQL): las sentencias no
+        cambian con el tamaño del fragmento y se compilan una sola vez.
+        """
+        claves = list({(filas[indice]["prestamo_id"], filas[indice]["numero_cuota"]) for indice in fragmento})
         
-        db.commit()
-        db.refresh(cuota)
+        # Todas las cuotas del fragmento en una consulta, bloqueadas hasta el commit
+        buscadas = _unnest("buscadas", prestamo_id=Integer, numero_cuota=Integer)
+        cuotas = {
+            (fila.prestamo_id, fila.numero_cuota): fila
+            for fila in db.execute(
+                select(
+                    Pago.id, Pago.prestamo_id, Pago.numero_cuota, Pago.fecha_vencimiento, Pago.monto, Pago.estado,
+                    Prestamo.estado.label("estado_prestamo")
+                )
+                .join(buscadas, (Pago.prestamo_id == buscadas.c.prestamo_id) & (Pago.numero_cuota == buscadas.c.numero_cuota))
+                .join(Prestamo, Prestamo.id == Pago.prestamo_id)
+                .where(particiones.en_ventana(Prestamo.fecha_inicio, Prestamo.fecha_vencimiento))
+                .order_by(Pago.id)
+                .with_for_update(of=Pago),
+                {"prestamo_id": [clave[0] for clave in claves], "numero_cuota": [clave[1] for clave in claves]}
+            )
+        }
         
-        return cuota
+        ahora = datetime.now()
+        pagadas = {"pago_id": [], "prestamo": [], "vencimiento": [], "fecha": []}
+        prestamos = {}
+        for indice in fragmento:
+            fila = filas[indice]
+            clave = (fila["prestamo_id"], fila["numero_cuota"])
+            cuota = cuotas.get(clave)
+            if cuota is None:
+                resultados[indice]["error"] = "Cuota no encontrada"
+            elif clave in vistas:
+                resultados[indice]["error"] = f"Cuota repetida en el archivo (línea {filas[vistas[clave]]['linea']})"
+            elif cuota.estado_prestamo in (EstadoPrestamo.PAGADO, EstadoPrestamo.CANCELADO):
+                resultados[indice]["error"] = "No se pueden registrar pagos en un préstamo pagado o cancelado"
+            elif cuota.estado == EstadoPago.REALIZADO:
+                resultados[indice]["error"] = "Esta cuota ya fue pagada"
+            else:
+                vistas[clave] = indice
+                resultados[indice]["pago_id"] = cuota.id
+                pagadas["pago_id"].append(cuota.id)
+                pagadas["prestamo"].append(cuota.prestamo_id)
+                pagadas["vencimiento"].append(cuota.fecha_vencimiento)
+                pagadas["fecha"].append(fila.get("fecha_pago") or ahora)
+                
+                movimiento = prestamos.setdefault(cuota.prestamo_id, [0, 0, 0, 0.0, 0.0])
+                movimiento[0] += 1
+                movimiento[1 if cuota.estado == EstadoPago.PENDIENTE else 2] += 1
+                movimiento[3] += cuota.monto
+                movimiento[4] += fila["monto"]
+        
+        if not pagadas["pago_id"]:
+            return []
+        
+        cuotas_pagadas = _unnest(
+            "cuotas_pagadas",
+            pago_id=Integer, prestamo=Integer, vencimiento=DateTime(timezone=True), fecha=DateTime(timezone=True)
+        )
+        db.execute(
+            update(Pago)
+            # La clave de partición de cada cuota limita el UPDATE a su partición
+            .where(
+                Pago.id == cuotas_pagadas.c.pago_id,
+                Pago.prestamo_id == cuotas_pagadas.c.prestamo,
+                Pago.fecha_vencimiento == cuotas_pagadas.c.vencimiento
+            )
+            .values(estado=EstadoPago.REALIZADO, fecha_pago=cuotas_pagadas.c.fecha, version=Pago.version + 1)
+            .execution_options(synchronize_session=False),
+            pagadas
+        )
+        
+        # Mismo efecto que registrar_pago aplicado fila a fila
+        movimientos = _unnest(
+            "movimientos",
+            prestamo_id=Integer, pagadas=Integer, pendientes=Integer, vencidas=Integer, total=Float, abonado=Float
+        )
+        ids = sorted(prestamos)
+        parametros = {"prestamo_id": ids}
+        for posicion, nombre in enumerate(("pagadas", "pendientes", "vencidas", "total", "abonado")):
+            parametros[nombre] = [prestamos[prestamo_id][posicion] for prestamo_id in ids]
+        
+        db.execute(
+            update(Prestamo)
+            .where(Prestamo.id == movimientos.c.prestamo_id)
+            .values(**PrestamoService.valores_abono(
+                movimientos.c.abonado,
+                movimientos.c.pagadas,
+                movimientos.c.pendientes,
+                movimientos.c.vencidas,
+                movimientos.c.total
+            ))
+            .execution_options(synchronize_session=False),
+            parametros
+        )
+        return ids
     
     @staticmethod
     def calcular_saldo_pendiente(db: Session, prestamo_id: int) -> float:
         """
-        Calcula el saldo pendiente de un préstamo
+        Calcula el saldo pendiente de un préstamo a partir de su contador total_pagado
         """
-        prestamo = db.query(Prestamo).filter(Prestamo.id == prestamo_id).first()
+        prestamo = db.get(Prestamo, prestamo_id)
         if not prestamo:
             return 0
         
-        # Calcular total pagado
-        total_pagado = db.query(Pago).filter(
-            Pago.prestamo_id == prestamo_id,
-            Pago.estado == EstadoPago.REALIZADO
-        ).with_entities(func.sum(Pago.monto)).scalar() or 0
-        
-        saldo_pendiente = prestamo.monto - total_pagado
+        saldo_pendiente = prestamo.monto - prestamo.total_pagado
         return max(0, saldo_pendiente)
     
     @staticmethod
@@ -158,24 +501,103 @@ class PrestamoService:
         if prestamo.saldo_pendiente <= 0:
             prestamo.estado = EstadoPrestamo.PAGADO
             db.commit()
+            cache.invalidar_prestamos([prestamo_id])
             return
         
-        # Verificar si está vencido
-        if datetime.now() > prestamo.fecha_vencimiento:
-            prestamo.estado = EstadoPrestamo.VENCIDO
-            db.commit()
-            return
-        
-        # Verificar cuotas vencidas
-        cuotas_vencidas = db.query(Pago).filter(
+        # Marcar como vencidas las cuotas pendientes cuya fecha ya pasó
+        # (las fechas se comparan en la base de datos, que las guarda con zona horaria)
+        marcadas = db.query(Pago).filter(
             Pago.prestamo_id == prestamo_id,
-            Pago.fecha_vencimiento < datetime.now(),
-            Pago.estado == EstadoPago.PENDIENTE
-        ).count()
+            particiones.en_ventana(prestamo.fecha_inicio, prestamo.fecha_vencimiento),
+            Pago.estado == EstadoPago.PENDIENTE,
+            Pago.fecha_vencimiento < func.now()
+        ).update({Pago.estado: EstadoPago.VENCIDO, Pago.version: Pago.version + 1}, synchronize_session=False)
+        
+        cuotas_vencidas = prestamo.cuotas_vencidas + marcadas
+        if marcadas:
+            prestamo.cuotas_pendientes = Prestamo.cuotas_pendientes - marcadas
+            prestamo.cuotas_vencidas = Prestamo.cuotas_vencidas + marcadas
         
-        if cuotas_vencidas > 0:
+        # Verificar si está vencido
+        prestamo_vencido = db.query(Prestamo.id).filter(
+            Prestamo.id == prestamo_id,
+            Prestamo.fecha_vencimiento < func.now()
+        ).first() is not None
+        
+        if prestamo_vencido or cuotas_vencidas > 0:
             prestamo.estado = EstadoPrestamo.VENCIDO
         else:
             prestamo.estado = EstadoPrestamo.ACTIVO
         
         db.commit()
+        cache.invalidar_prestamos([prestamo_id])
+    
+    @staticmethod
+    def reconciliar_contadores(db: Session, prestamo_id: Optional[int] = None, tamano_lote: int = 50000) -> int:
+        """
+        Reconstruye los contadores de cuotas a partir de la tabla pagos.
+        Procesa los préstamos por rangos de id (una transacción por rango) y
+        devuelve cuántos préstamos tenían los contadores desfasados.
+        """
+        if prestamo_id is not None:
+            rangos = [(prestamo_id, prestamo_id + 1)]
+        else:
+            minimo, maximo = db.query(func.min(Prestamo.id), func.max(Prestamo.id)).one()
+            if minimo is None:
+                return 0
+            rangos = [(desde, desde + tamano_lote) for desde in range(minimo, maximo + 1, tamano_lote)]
+        
+        corregidos = 0
+        for desde, hasta in rangos:
+            conteo = (
+                select(
+                    Pago.prestamo_id,
+                    func.count().filter(Pago.estado == EstadoPago.REALIZADO).label("pagadas"),
+                    func.count().filter(Pago.estado == EstadoPago.PENDIENTE).label("pendientes"),
+                    func.count().filter(Pago.estado == EstadoPago.VENCIDO).label("vencidas"),
+                    func.coalesce(func.sum(Pago.monto).filter(Pago.estado == EstadoPago.REALIZADO), 0).label("total"),
+                )
+                .where(Pago.prestamo_id >= desde, Pago.prestamo_id < hasta)
+                .group_by(Pago.prestamo_id)
+                .subquery()
+            )
+            corregidos += db.execute(
+                update(Prestamo)
+                .where(
+                    Prestamo.id == conteo.c.prestamo_id,
+                    or_(
+                        Prestamo.cuotas_pagadas != conteo.c.pagadas,
+                        Prestamo.cuotas_pendientes != conteo.c.pendientes,
+                        Prestamo.cuotas_vencidas != conteo.c.vencidas,
+                        func.abs(Prestamo.total_pagado - conteo.c.total) > 0.005,
+                    )
+                )
+                .values(
+                    cuotas_pagadas=conteo.c.pagadas,
+                    cuotas_pendientes=conteo.c.pendientes,
+                    cuotas_vencidas=conteo.c.vencidas,
+                    total_pagado=conteo.c.total,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            
+            # Préstamos sin ninguna cuota
+            corregidos += db.execute(
+                update(Prestamo)
+                .where(
+                    Prestamo.id >= desde,
+                    Prestamo.id < hasta,
+                    ~exists().where(Pago.prestamo_id == Prestamo.id),
+                    or_(
+                        Prestamo.cuotas_pagadas != 0,
+                        Prestamo.cuotas_pendientes != 0,
+                        Prestamo.cuotas_vencidas != 0,
+                        Prestamo.total_pagado != 0,
+                    )
+                )
+                .values(cuotas_pagadas=0, cuotas_pendientes=0, cuotas_vencidas=0, total_pagado=0)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+        
+        return corregidos
@@ -0,0 +1,66 @@
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.models import Prestamo, Pago
+from schemas.schemas import PrestamoCreate, CalculoCuota
+from services.prestamo_service import PrestamoService
+
+class PrestamoServiceAsync:
+    """
+    Versiones asíncronas de PrestamoService (modo DB_MODE=async).
+    Las operaciones de escritura reutilizan la lógica de PrestamoService mediante
+    AsyncSession.run_sync, que ejecuta sobre asyncpg sin pasar por el pool de hilos.
+    """
+
+    @staticmethod
+    def calcular_cuota_mensual(monto: float, tasa_interes: float, plazo_meses: int) -> CalculoCuota:
+        """
+        Calcula la cuota mensual (no accede a la base de datos)
+        """
+        return PrestamoService.calcular_cuota_mensual(monto, tasa_interes, plazo_meses)
+
+    @staticmethod
+    async def crear_prestamo(db: AsyncSession, prestamo_data: PrestamoCreate) -> Prestamo:
+        """
+        Crea un nuevo préstamo y genera las cuotas automáticamente
+        """
+        return await db.run_sync(PrestamoService.crear_prestamo, prestamo_data)
+
+    @staticmethod
+    async def crear_prestamos_lote(db: AsyncSession, prestamos_data: List[PrestamoCreate]) -> List[dict]:
+        """
+        Crea varios préstamos con sus cuotas en una sola transacción
+        """
+        return await db.run_sync(PrestamoService.crear_prestamos_lote, prestamos_data)
+
+    @staticmethod
+    async def generar_cuotas(db: AsyncSession, prestamo_id: int, cuota_mensual: float):
+        """
+        Genera las cuotas mensuales para un préstamo
+        """
+        await db.run_sync(PrestamoService.generar_cuotas, prestamo_id, cuota_mensual)
+
+    @staticmethod
+    async def registrar_pago(db: AsyncSession, prestamo_id: int, monto: float, numero_cuota: int) -> Pago:
+        """
+        Registra un pago de cuota
+        """
+        return await db.run_sync(PrestamoService.registrar_pago, prestamo_id, monto, numero_cuota)
+
+    @staticmethod
+    async def calcular_saldo_pendiente(db: AsyncSession, prestamo_id: int) -> float:
+        """
+        Calcula el saldo pendiente de un préstamo a partir de su contador total_pagado
+        """
+        prestamo = await db.get(Prestamo, prestamo_id)
+        if not prestamo:
+            return 0
+
+        saldo_pendiente = prestamo.monto - prestamo.total_pagado
+        return max(0, saldo_pendiente)
+
+    @staticmethod
+    async def actualizar_estado_prestamo(db: AsyncSession, prestamo_id: int):
+        """
+        Actualiza el estado del préstamo basado en pagos y fechas
+        """
+        await db.run_sync(PrestamoService.actualizar_estado_prestamo, prestamo_id)
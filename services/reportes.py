@@ -0,0 +1,414 @@
+"""
+Reporte de cartera: mora (PAR30/60/90), saldos por estado y por mes de
+originación y tasas de cobranza
+
+La foto de la cartera se calcula en una sola consulta: un CTE con la primera
+cuota impaga de cada préstamo (cuotas pendientes o vencidas antes del corte)
+da los días de atraso y el tramo de mora, y las filas se agregan por mes de
+originación, estado y tramo. GET /reportes/cartera lee esos agregados de las
+tablas de resumen y los combina con GROUPING SETS, sin recorrer préstamos ni
+cuotas en cada consulta.
+
+refrescar() mantiene los resúmenes (lo ejecuta el barrido diario programado y
+POST /reportes/cartera/refresco):
+
+* cartera_diaria: una foto por día (la del día se reemplaza si se repite).
+* cobranza_diaria: cuotas exigibles y cobradas por día de vencimiento. Solo se
+  recalculan los días vencidos desde el último refresco y los días de las
+  cuotas escritas desde entonces según pagos.actualizado, también los pagos con
+  una fecha de pago anterior (índices ix_pagos_vencimiento e
+  ix_pagos_actualizado); completo=True lo reconstruye entero.
+
+Las fechas son las de la zona horaria de la sesión de PostgreSQL. Requiere
+PostgreSQL (FILTER, GROUPING SETS, ON CONFLICT).
+"""
+
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Date, String, and_, case, cast, delete, func, literal, not_, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from models.models import CarteraDiaria, CobranzaDiaria, EstadoPago, EstadoPrestamo, Pago, Prestamo
+from services import particiones
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock que impide dos refrescos simultáneos
+CLAVE_BLOQUEO = 7_270_002
+
+# Margen al buscar cuotas escritas desde el último refresco: actualizado es el
+# inicio de la transacción que escribió la cuota (now()), que pudo confirmarse
+# después de que el refresco leyera pagos
+SOLAPE = timedelta(hours=1)
+
+# Tramos de mora por días de atraso de la primera cuota impaga; "cerrado" agrupa
+# los préstamos pagados o cancelados, fuera de la cartera vigente
+TRAMOS = [("al_dia", 0), ("1_30", 30), ("31_60", 60), ("61_90", 90), ("mas_90", None)]
+CERRADO = "cerrado"
+
+# Tramos que cuentan en cada indicador PAR (saldo con más de N días de atraso)
+PAR = {30: ["31_60", "61_90", "mas_90"], 60: ["61_90", "mas_90"], 90: ["mas_90"]}
+
+# Ventanas (días hasta el corte) de las tasas de cobranza; None es todo el histórico
+VENTANAS_COBRANZA = {"ultimos_30_dias": 30, "ultimos_90_dias": 90, "historico": None}
+
+# Meses del detalle mensual de cobranza
+MESES_COBRANZA = 12
+
+ABIERTOS = [EstadoPrestamo.ACTIVO, EstadoPrestamo.VENCIDO]
+
+class RefrescoEnCurso(RuntimeError):
+    """
+    Otro proceso está refrescando los resúmenes
+    """
+
+def consulta_cartera(corte: date):
+    """
+    Préstamos originados hasta el corte agregados por mes de originación,
+    estado y tramo de mora (mismas columnas que cartera_diaria, sin fecha)
+    """
+    atraso = (
+        select(Pago.prestamo_id, func.min(Pago.fecha_vencimiento).label("primera_impaga"))
+        .where(
+            Pago.estado.in_([EstadoPago.PENDIENTE, EstadoPago.VENCIDO]),
+            Pago.fecha_vencimiento < corte
+        )
+        .group_by(Pago.prestamo_id)
+        .cte("atraso")
+    )
+    dias = literal(corte, Date) - cast(atraso.c.primera_impaga, Date)
+    tramo = case(
+        (not_(Prestamo.estado.in_(ABIERTOS)), CERRADO),
+        (atraso.c.primera_impaga.is_(None), TRAMOS[0][0]),
+        *((dias <= limite, nombre) for nombre, limite in TRAMOS[1:-1]),
+        else_=TRAMOS[-1][0]
+    )
+    por_prestamo = (
+        select(
+            cast(func.date_trunc("month", Prestamo.fecha_inicio), Date).label("mes_originacion"),
+            cast(Prestamo.estado, String).label("estado"),
+            tramo.label("tramo"),
+            Prestamo.monto,
+            Prestamo.saldo_pendiente,
+            Prestamo.cuotas_vencidas,
+        )
+        .outerjoin(atraso, atraso.c.prestamo_id == Prestamo.id)
+        .where(Prestamo.fecha_inicio < corte + timedelta(days=1))
+        .subquery("por_prestamo")
+    )
+    return (
+        select(
+            por_prestamo.c.mes_originacion,
+            por_prestamo.c.estado,
+            por_prestamo.c.tramo,
+            func.count().label("prestamos"),
+            func.sum(por_prestamo.c.monto).label("monto_desembolsado"),
+            func.sum(por_prestamo.c.saldo_pendiente).label("saldo_pendiente"),
+            func.sum(por_prestamo.c.cuotas_vencidas).label("cuotas_vencidas"),
+        )
+        .group_by(por_prestamo.c.mes_originacion, por_prestamo.c.estado, por_prestamo.c.tramo)
+    )
+
+def consulta_cobranza(desde: Optional[date], hasta: date):
+    """
+    Cuotas exigibles y cobradas por día de vencimiento en [desde, hasta]
+    (mismas columnas que cobranza_diaria, sin actualizado)
+    """
+    dia = cast(Pago.fecha_vencimiento, Date)
+    cobrada = Pago.estado == EstadoPago.REALIZADO
+    consulta = (
+        select(
+            dia.label("fecha_vencimiento"),
+            func.count().label("cuotas"),
+            func.count().filter(cobrada).label("cuotas_cobradas"),
+            func.sum(Pago.monto).label("monto_exigible"),
+            func.coalesce(func.sum(Pago.monto).filter(cobrada), 0).label("monto_cobrado"),
+            func.coalesce(
+                func.sum(Pago.monto).filter(cobrada, cast(Pago.fecha_pago, Date) <= dia), 0
+            ).label("monto_cobrado_a_tiempo"),
+        )
+        .where(Pago.fecha_vencimiento < hasta + timedelta(days=1))
+        .group_by(dia)
+    )
+    if desde is not None:
+        consulta = consulta.where(Pago.fecha_vencimiento >= desde)
+    return consulta
+
+def consulta_dias_actualizados(desde: datetime, hasta: date):
+    """
+    Días de vencimiento (hasta el corte) de las cuotas escritas desde el
+    instante indicado, sea cual sea su fecha de pago
+    """
+    return (
+        select(cast(Pago.fecha_vencimiento, Date)).distinct()
+        .where(
+            Pago.actualizado >= desde,
+            Pago.fecha_vencimiento < hasta + timedelta(days=1)
+        )
+    )
+
+def _rangos(dias: List[date]) -> List[Tuple[date, date]]:
+    """
+    Días agrupados en rangos consecutivos [desde, hasta]
+    """
+    rangos = []
+    for dia in sorted(set(dias)):
+        if rangos and dia == rangos[-1][1] + timedelta(days=1):
+            rangos[-1] = (rangos[-1][0], dia)
+        else:
+            rangos.append((dia, dia))
+    return rangos
+
+def _refrescar_cobranza(conexion, hoy: date, completo: bool) -> int:
+    """
+    Recalcula los días de cobranza afectados desde el último refresco y
+    devuelve cuántos días se recalcularon
+    """
+    actualizado, ultimo_dia = conexion.execute(
+        select(func.max(CobranzaDiaria.actualizado), func.max(CobranzaDiaria.fecha_vencimiento))
+    ).one()
+
+    if completo or actualizado is None:
+        conexion.execute(delete(CobranzaDiaria))
+        rangos = [(None, hoy)]
+    else:
+        escritos = conexion.execute(consulta_dias_actualizados(actualizado - SOLAPE, hoy)).scalars().all()
+        nuevos = [ultimo_dia + timedelta(days=n) for n in range(1, (hoy - ultimo_dia).days + 1)]
+        rangos = _rangos(escritos + nuevos)
+
+    dias = 0
+    for desde, hasta in rangos:
+        consulta = consulta_cobranza(desde, hasta)
+        sentencia = insert(CobranzaDiaria).from_select(
+            [columna.name for columna in consulta.selected_columns], consulta
+        )
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=[CobranzaDiaria.fecha_vencimiento],
+            set_={
+                **{nombre: sentencia.excluded[nombre] for nombre in (
+                    "cuotas", "cuotas_cobradas", "monto_exigible", "monto_cobrado", "monto_cobrado_a_tiempo"
+                )},
+                "actualizado": func.now(),
+            }
+        )
+        dias += conexion.execute(sentencia, execution_options={"preserve_rowcount": True}).rowcount
+    return dias
+
+def refrescar(motor=None, completo: bool = False) -> dict:
+    """
+    Foto de la cartera de hoy y cobranza incremental, en una transacción.
+    Lanza RefrescoEnCurso si otro proceso está refrescando.
+    """
+    if motor is None:
+        from config.database import engine as motor
+
+    inicio = time.perf_counter()
+    with motor.begin() as conexion:
+        if not conexion.scalar(text("SELECT pg_try_advisory_xact_lock(:clave)"), {"clave": CLAVE_BLOQUEO}):
+            raise RefrescoEnCurso("Ya hay un refresco de los reportes en curso")
+
+        hoy = conexion.scalar(select(func.current_date()))
+
+        conexion.execute(delete(CarteraDiaria).where(CarteraDiaria.fecha == hoy))
+        cartera = consulta_cartera(hoy).subquery("cartera")
+        filas_cartera = conexion.execute(
+            insert(CarteraDiaria).from_select(
+                ["fecha", *(columna.name for columna in cartera.c)],
+                select(literal(hoy, Date), *cartera.c)
+            ),
+            execution_options={"preserve_rowcount": True}
+        ).rowcount
+
+        dias_cobranza = _refrescar_cobranza(conexion, hoy, completo)
+
+    resumen = {
+        "fecha": hoy.isoformat(),
+        "filas_cartera": filas_cartera,
+        "dias_cobranza": dias_cobranza,
+        "completo": completo,
+        "duracion_s": round(time.perf_counter() - inicio, 3),
+    }
+    logger.info("Resúmenes de reportes refrescados: %s", resumen)
+    return resumen
+
+def _tasa(parte, total) -> Optional[float]:
+    return round(parte / total, 4) if total else None
+
+def _importe(valor) -> float:
+    return round(float(valor or 0), 2)
+
+def _cartera(conexion, fuente) -> dict:
+    """
+    Indicadores de la cartera a partir de filas con las columnas de
+    cartera_diaria: una sola consulta con GROUPING SETS por estado, tramo,
+    mes de originación y total
+    """
+    en_par = {dias: fuente.c.tramo.in_(tramos) for dias, tramos in PAR.items()}
+    filas = conexion.execute(
+        select(
+            func.grouping(fuente.c.estado, fuente.c.tramo, fuente.c.mes_originacion).label("agrupacion"),
+            fuente.c.estado,
+            fuente.c.tramo,
+            fuente.c.mes_originacion,
+            func.sum(fuente.c.prestamos).label("prestamos"),
+            func.sum(fuente.c.monto_desembolsado).label("monto_desembolsado"),
+            func.sum(fuente.c.saldo_pendiente).label("saldo_pendiente"),
+            func.sum(fuente.c.cuotas_vencidas).label("cuotas_vencidas"),
+            func.sum(fuente.c.saldo_pendiente).filter(fuente.c.tramo != CERRADO).label("saldo_vigente"),
+            *(func.sum(fuente.c.saldo_pendiente).filter(condicion).label(f"saldo_par{dias}") for dias, condicion in en_par.items()),
+        )
+        .group_by(func.grouping_sets(
+            tuple_(fuente.c.estado), tuple_(fuente.c.tramo), tuple_(fuente.c.mes_originacion), tuple_()
+        ))
+    ).all()
+
+    # grouping(estado, tramo, mes_originacion): bit a 1 por columna agregada
+    por_agrupacion = {0b011: [], 0b101: [], 0b110: [], 0b111: []}
+    for fila in filas:
+        por_agrupacion[fila.agrupacion].append(fila)
+
+    total = por_agrupacion[0b111][0] if por_agrupacion[0b111] else None
+    vigente = float(total.saldo_vigente or 0) if total else 0.0
+    tramos = {fila.tramo: fila for fila in por_agrupacion[0b101]}
+    saldos_par = {dias: float(getattr(total, f"saldo_par{dias}") or 0) if total else 0.0 for dias in PAR}
+
+    return {
+        "cartera_vigente": {
+            "prestamos": int(sum(fila.prestamos for nombre, fila in tramos.items() if nombre != CERRADO)),
+            "saldo_pendiente": _importe(vigente),
+        },
+        "par": {
+            f"par{dias}": {
+                "saldo": _importe(saldo),
+                "porcentaje": _tasa(saldo, vigente),
+            }
+            for dias, saldo in saldos_par.items()
+        },
+        "tramos": [
+            {
+                "tramo": nombre,
+                "prestamos": int(tramos[nombre].prestamos) if nombre in tramos else 0,
+                "saldo_pendiente": _importe(tramos[nombre].saldo_pendiente if nombre in tramos else 0),
+                "porcentaje": _tasa(float(tramos[nombre].saldo_pendiente or 0), vigente) if nombre in tramos else None,
+            }
+            for nombre, _ in TRAMOS
+        ],
+        "por_estado": [
+            {
+                "estado": EstadoPrestamo[fila.estado].value,
+                "prestamos": int(fila.prestamos),
+                "monto_desembolsado": _importe(fila.monto_desembolsado),
+                "saldo_pendiente": _importe(fila.saldo_pendiente),
+                "cuotas_vencidas": int(fila.cuotas_vencidas or 0),
+            }
+            for fila in sorted(por_agrupacion[0b011], key=lambda fila: fila.estado)
+        ],
+        "por_mes_originacion": [
+            {
+                "mes": fila.mes_originacion.strftime("%Y-%m"),
+                "prestamos": int(fila.prestamos),
+                "monto_desembolsado": _importe(fila.monto_desembolsado),
+                "saldo_pendiente": _importe(fila.saldo_pendiente),
+                "par30": _tasa(float(fila.saldo_par30 or 0), float(fila.saldo_vigente or 0)),
+            }
+            for fila in sorted(por_agrupacion[0b110], key=lambda fila: fila.mes_originacion)
+        ],
+    }
+
+def _cobranza(conexion, fuente, corte: date) -> dict:
+    """
+    Tasas de cobranza por ventana y por mes de vencimiento a partir de filas
+    con las columnas de cobranza_diaria
+    """
+    def sumas(nombre, condicion):
+        return [
+            func.sum(fuente.c[columna]).filter(condicion).label(f"{nombre}_{columna}")
+            for columna in ("cuotas", "cuotas_cobradas", "monto_exigible", "monto_cobrado", "monto_cobrado_a_tiempo")
+        ]
+
+    vencidas = fuente.c.fecha_vencimiento <= corte
+    columnas = []
+    for nombre, dias in VENTANAS_COBRANZA.items():
+        condicion = vencidas if dias is None else and_(vencidas, fuente.c.fecha_vencimiento > corte - timedelta(days=dias))
+        columnas += sumas(nombre, condicion)
+    totales = conexion.execute(select(*columnas)).one()
+
+    inicio_meses = particiones.sumar_meses(corte.replace(day=1), -(MESES_COBRANZA - 1))
+    mes = cast(func.date_trunc("month", fuente.c.fecha_vencimiento), Date).label("mes")
+    meses = conexion.execute(
+        select(
+            mes,
+            func.sum(fuente.c.monto_exigible).label("monto_exigible"),
+            func.sum(fuente.c.monto_cobrado).label("monto_cobrado"),
+            func.sum(fuente.c.monto_cobrado_a_tiempo).label("monto_cobrado_a_tiempo"),
+        )
+        .where(vencidas, fuente.c.fecha_vencimiento >= inicio_meses)
+        .group_by(mes)
+        .order_by(mes)
+    ).all()
+
+    def indicadores(exigible, cobrado, a_tiempo) -> dict:
+        return {
+            "monto_exigible": _importe(exigible),
+            "monto_cobrado": _importe(cobrado),
+            "tasa_cobranza": _tasa(float(cobrado or 0), float(exigible or 0)),
+            "tasa_cobranza_a_tiempo": _tasa(float(a_tiempo or 0), float(exigible or 0)),
+        }
+
+    return {
+        "cobranza": {
+            nombre: {
+                "cuotas": int(getattr(totales, f"{nombre}_cuotas") or 0),
+                "cuotas_cobradas": int(getattr(totales, f"{nombre}_cuotas_cobradas") or 0),
+                **indicadores(
+                    getattr(totales, f"{nombre}_monto_exigible"),
+                    getattr(totales, f"{nombre}_monto_cobrado"),
+                    getattr(totales, f"{nombre}_monto_cobrado_a_tiempo"),
+                ),
+            }
+            for nombre in VENTANAS_COBRANZA
+        },
+        "cobranza_mensual": [
+            {"mes": fila.mes.strftime("%Y-%m"), **indicadores(fila.monto_exigible, fila.monto_cobrado, fila.monto_cobrado_a_tiempo)}
+            for fila in meses
+        ],
+    }
+
+def reporte_cartera(motor, fecha: Optional[date] = None, en_vivo: bool = False) -> dict:
+    """
+    Reporte de la cartera a la fecha indicada (por defecto, la última foto).
+    Sin fotos guardadas, o con en_vivo=True, se calcula sobre préstamos y
+    cuotas a la fecha de hoy. Lanza LookupError si no hay foto de esa fecha.
+    """
+    with motor.connect() as conexion:
+        generado = None
+        if not en_vivo:
+            corte = fecha if fecha is not None else select(func.max(CarteraDiaria.fecha)).scalar_subquery()
+            generado, ultima = conexion.execute(
+                select(func.max(CarteraDiaria.generado), func.max(CarteraDiaria.fecha))
+                .where(CarteraDiaria.fecha == corte)
+            ).one()
+            if ultima is None and fecha is not None:
+                raise LookupError(f"No hay resumen de la cartera del {fecha.isoformat()}")
+            en_vivo = ultima is None
+            fecha = ultima
+
+        if en_vivo:
+            fecha = conexion.scalar(select(func.current_date()))
+            cartera = consulta_cartera(fecha).subquery("cartera")
+            cobranza = consulta_cobranza(None, fecha).subquery("cobranza")
+        else:
+            cartera = select(CarteraDiaria).where(CarteraDiaria.fecha == fecha).subquery("cartera")
+            cobranza = select(CobranzaDiaria).subquery("cobranza")
+
+        reporte = {
+            "fecha_corte": fecha.isoformat(),
+            "origen": "en_vivo" if en_vivo else "resumen",
+            "generado": generado.isoformat() if generado else None,
+        }
+        reporte.update(_cartera(conexion, cartera))
+        reporte.update(_cobranza(conexion, cobranza, fecha))
+        return reporte
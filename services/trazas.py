@@ -0,0 +1,252 @@
+"""
+Trazas de SQL por petición y detector de N+1 (desarrollo y pruebas)
+
+Con TRAZAS_SQL=1 cada petición guarda las sentencias que ejecutó, con su
+duración y la función de la aplicación que la originó (router o servicio). Las
+sentencias con la misma forma (mismo SQL salvo los valores de los parámetros)
+repetidas TRAZAS_UMBRAL_N1 veces o más se marcan como posible N+1: el caso
+típico es una carga perezosa como prestamo.cliente dentro de un bucle.
+
+Cada respuesta lleva las cabeceras X-Request-Id, X-SQL-Consultas y
+X-SQL-Repetidas, y GET /debug/requests/{id} devuelve el detalle de las
+últimas TRAZAS_MAX_PETICIONES peticiones.
+
+Fuera de una petición (pruebas, scripts) registrar() recoge las consultas del
+bloque; services/trazas_pytest.py lo ofrece como fixture de pytest con un
+presupuesto máximo de consultas.
+
+No activar en producción: guarda el texto de todas las sentencias en memoria.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+
+def _env_bool(nombre: str) -> bool:
+    return os.getenv(nombre, "").strip().lower() in ("1", "true", "yes", "si", "on")
+
+HABILITADO = _env_bool("TRAZAS_SQL")
+
+# Repeticiones de una misma forma de sentencia a partir de las cuales se marca como N+1
+UMBRAL_N1 = int(os.getenv("TRAZAS_UMBRAL_N1", "5"))
+
+# Peticiones cuyo detalle se conserva para /debug/requests/{id}
+MAX_PETICIONES = int(os.getenv("TRAZAS_MAX_PETICIONES", "200"))
+
+CABECERA_ID = "X-Request-Id"
+
+# Directorio de la aplicación: el origen de una consulta es el primer marco de
+# pila dentro de él (fuera de este módulo)
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_ESTE_ARCHIVO = os.path.abspath(__file__)
+
+# Marcador de parámetro de cualquier driver (%(nombre)s, $1, ?, :nombre), con conversión opcional
+_MARCADOR = r"(?:%\(\w+\)s|\$\d+|\?|(?<!:):\w+)(?:::\w+)?"
+_PARAMETROS_LISTA = re.compile(rf"\(\s*{_MARCADOR}(?:\s*,\s*{_MARCADOR})+\s*\)")
+_PARAMETRO = re.compile(rf"{_MARCADOR}|\b\d+\b")
+_ESPACIOS = re.compile(r"\s+")
+
+def forma(sentencia: str) -> str:
+    """
+    SQL sin los valores de los parámetros: dos ejecuciones con la misma forma
+    solo difieren en los datos (listas IN de cualquier longitud incluidas)
+    """
+    sentencia = _ESPACIOS.sub(" ", sentencia).strip()
+    sentencia = _PARAMETROS_LISTA.sub("(?)", sentencia)
+    return _PARAMETRO.sub("?", sentencia)
+
+def _origen() -> Optional[str]:
+    marco = sys._getframe(2)
+    while marco is not None:
+        archivo = os.path.abspath(marco.f_code.co_filename)
+        if archivo.startswith(_RAIZ) and archivo != _ESTE_ARCHIVO and os.sep + "site-packages" + os.sep not in archivo:
+            relativo = archivo[len(_RAIZ):]
+            return f"{relativo}:{marco.f_lineno} {marco.f_code.co_name}"
+        marco = marco.f_back
+    return None
+
+class Traza:
+    """
+    Sentencias ejecutadas durante una petición o un bloque registrar()
+    """
+
+    def __init__(self, identificador: Optional[str] = None, metodo: str = None, ruta: str = None):
+        self.id = identificador or uuid.uuid4().hex[:16]
+        self.metodo = metodo
+        self.ruta = ruta
+        self.estado = None
+        self.duracion_ms = None
+        self.consultas = []
+        self._lock = threading.Lock()
+
+    def agregar(self, sentencia: str, duracion: float, origen: Optional[str]):
+        with self._lock:
+            self.consultas.append({
+                "sql": sentencia,
+                "forma": forma(sentencia),
+                "duracion_ms": round(duracion * 1000, 3),
+                "origen": origen,
+            })
+
+    @property
+    def total(self) -> int:
+        return len(self.consultas)
+
+    def repetidas(self, umbral: int = None) -> List[dict]:
+        """
+        Formas de sentencia ejecutadas umbral veces o más (posibles N+1), con
+        el número de ejecuciones y los orígenes que las lanzaron
+        """
+        umbral = umbral or UMBRAL_N1
+        with self._lock:
+            consultas = list(self.consultas)
+        conteo = Counter(consulta["forma"] for consulta in consultas)
+        resultado = []
+        for sql, veces in conteo.most_common():
+            if veces < umbral:
+                break
+            origenes = Counter(c["origen"] for c in consultas if c["forma"] == sql)
+            resultado.append({"forma": sql, "veces": veces, "origenes": dict(origenes)})
+        return resultado
+
+    def resumen(self) -> dict:
+        with self._lock:
+            consultas = list(self.consultas)
+        return {
+            "id": self.id,
+            "metodo": self.metodo,
+            "ruta": self.ruta,
+            "estado": self.estado,
+            "duracion_ms": self.duracion_ms,
+            "consultas": len(consultas),
+            "tiempo_db_ms": round(sum(c["duracion_ms"] for c in consultas), 3),
+            "repetidas": self.repetidas(),
+        }
+
+    def detalle(self) -> dict:
+        datos = self.resumen()
+        with self._lock:
+            datos["sentencias"] = list(self.consultas)
+        return datos
+
+    def informe(self) -> str:
+        """
+        Texto legible con las sentencias (para mensajes de aserciones)
+        """
+        lineas = [f"{self.total} consultas"]
+        for numero, consulta in enumerate(self.consultas, start=1):
+            lineas.append(f"  {numero}. [{consulta['origen']}] {consulta['forma'][:200]}")
+        for repetida in self.repetidas():
+            lineas.append(f"  posible N+1 ({repetida['veces']} veces): {repetida['forma'][:200]}")
+        return "\n".join(lineas)
+
+_traza_actual: ContextVar[Optional[Traza]] = ContextVar("traza_sql", default=None)
+
+# Trazas de las últimas peticiones, por id
+_recientes = OrderedDict()
+_lock_recientes = threading.Lock()
+
+# Funciones avisadas al terminar cada petición (registrar() las usa para ver
+# las peticiones que el cliente de pruebas atiende en otro hilo)
+_oyentes = []
+
+def _guardar(traza: Traza):
+    with _lock_recientes:
+        _recientes[traza.id] = traza
+        while len(_recientes) > MAX_PETICIONES:
+            _recientes.popitem(last=False)
+    for oyente in list(_oyentes):
+        oyente(traza)
+
+def obtener(identificador: str) -> Optional[Traza]:
+    with _lock_recientes:
+        return _recientes.get(identificador)
+
+def recientes(limite: int = 50) -> List[Traza]:
+    with _lock_recientes:
+        return list(reversed(_recientes.values()))[:limite]
+
+def instrumentar_motor(motor):
+    """
+    Registra los eventos de consultas de un motor síncrono (para el asíncrono,
+    pasar async_engine.sync_engine). Llamarlo dos veces no duplica el registro.
+    """
+    if event.contains(motor, "after_cursor_execute", _despues):
+        return
+    event.listen(motor, "before_cursor_execute", _antes)
+    event.listen(motor, "after_cursor_execute", _despues)
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    if _traza_actual.get() is not None:
+        context._inicio_traza = time.perf_counter()
+
+def _despues(conn, cursor, statement, parameters, context, executemany):
+    traza = _traza_actual.get()
+    inicio = getattr(context, "_inicio_traza", None)
+    if traza is None or inicio is None:
+        return
+    traza.agregar(statement, time.perf_counter() - inicio, _origen())
+
+class MiddlewareTrazas:
+    """
+    Middleware ASGI que abre una traza por petición y añade el resumen en cabeceras
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traza = Traza(metodo=scope["method"], ruta=scope["path"])
+        token = _traza_actual.set(traza)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                traza.estado = mensaje["status"]
+                cabeceras = list(mensaje.get("headers", []))
+                cabeceras.append((CABECERA_ID.lower().encode(), traza.id.encode()))
+                cabeceras.append((b"x-sql-consultas", str(traza.total).encode()))
+                cabeceras.append((b"x-sql-repetidas", str(len(traza.repetidas())).encode()))
+                mensaje = {**mensaje, "headers": cabeceras}
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _traza_actual.reset(token)
+            traza.duracion_ms = round((time.perf_counter() - inicio) * 1000, 3)
+            _guardar(traza)
+
+@contextmanager
+def registrar():
+    """
+    Traza con las consultas ejecutadas dentro del bloque, tanto en este hilo
+    como en las peticiones HTTP que terminen mientras tanto (por ejemplo las
+    del TestClient de FastAPI, que se atienden en otro hilo)
+    """
+    traza = Traza(metodo="bloque")
+    token = _traza_actual.set(traza)
+
+    def _al_terminar(peticion: Traza):
+        for consulta in peticion.consultas:
+            traza.agregar(consulta["sql"], consulta["duracion_ms"] / 1000, consulta["origen"])
+
+    _oyentes.append(_al_terminar)
+    try:
+        yield traza
+    finally:
+        _oyentes.remove(_al_terminar)
+        _traza_actual.reset(token)
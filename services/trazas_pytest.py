@@ -0,0 +1,56 @@
+"""
+Plugin de pytest con un presupuesto de consultas SQL por prueba
+
+Activarlo con `pytest -p services.trazas_pytest` (o `pytest_plugins =
+["services.trazas_pytest"]` en conftest.py). Activa TRAZAS_SQL antes de que
+se importe la aplicación e instrumenta los motores de config.database.
+
+    def test_detalle_prestamo(client, presupuesto_consultas):
+        with presupuesto_consultas(3):
+            client.get("/prestamos/1/detalle")
+
+El bloque falla si se superan las consultas indicadas o si alguna sentencia
+se repite TRAZAS_UMBRAL_N1 veces o más (posible N+1); el mensaje incluye
+cada sentencia con la función que la originó.
+"""
+
+import os
+from contextlib import contextmanager
+
+import pytest
+
+class PresupuestoExcedido(AssertionError):
+    """
+    El bloque ejecutó más consultas de las permitidas o un posible N+1
+    """
+
+def pytest_configure(config):
+    os.environ.setdefault("TRAZAS_SQL", "1")
+
+def _instrumentar():
+    from config import database
+    from services import trazas
+
+    trazas.instrumentar_motor(database.engine)
+    if database.async_engine is not None:
+        trazas.instrumentar_motor(database.async_engine.sync_engine)
+    return trazas
+
+@pytest.fixture
+def presupuesto_consultas():
+    """
+    presupuesto_consultas(maximo, permitir_repetidas=False): context manager que
+    devuelve la traza del bloque y falla al salir si se excede el presupuesto
+    """
+    trazas = _instrumentar()
+
+    @contextmanager
+    def presupuesto(maximo: int, permitir_repetidas: bool = False):
+        with trazas.registrar() as traza:
+            yield traza
+        if traza.total > maximo:
+            raise PresupuestoExcedido(f"Se esperaban como mucho {maximo} consultas y hubo {traza.informe()}")
+        if not permitir_repetidas and traza.repetidas():
+            raise PresupuestoExcedido(f"Sentencias repetidas (posible N+1): {traza.informe()}")
+
+    return presupuesto
@@ -0,0 +1,337 @@
+"""
+Barrido de vencimientos de la cartera
+
+Marca como vencidas las cuotas pendientes cuya fecha ya pasó y actualiza el
+estado y los contadores de cuotas de los préstamos con sentencias UPDATE ... FROM
+sobre toda la tabla, en lugar de recalcular préstamo por préstamo. Las filas se
+procesan por rangos de id, con una transacción por rango, para no mantener
+bloqueos largos. Requiere PostgreSQL (UPDATE ... RETURNING dentro de un CTE).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, func, literal, or_, select, text, update
+
+from config.database import engine
+from services import cache, particiones, reportes
+from models.models import Pago, Prestamo, EstadoPago, EstadoPrestamo
+
+logger = logging.getLogger(__name__)
+
+# Filas (por rango de id) procesadas en cada transacción
+TAMANO_LOTE = int(os.getenv("BARRIDO_TAMANO_LOTE", "50000"))
+
+# Hora diaria (HH:MM, hora local del servidor) del barrido programado; vacío lo desactiva
+HORA_BARRIDO = os.getenv("BARRIDO_VENCIDOS_HORA", "02:00").strip()
+
+# Clave del advisory lock de Postgres que impide ejecuciones simultáneas entre workers
+CLAVE_BLOQUEO = 7_270_001
+
+_pagos = Pago.__table__
+_prestamos = Prestamo.__table__
+
+class BarridoEnCurso(RuntimeError):
+    """
+    Ya hay un barrido en ejecución (en este proceso o en otro worker)
+    """
+
+class ProgresoBarrido:
+    """
+    Estado del último barrido ejecutado en este proceso
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.estado = "inactivo"
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.fase = None
+        self.iniciado = None
+        self.finalizado = None
+        self.lotes_procesados = 0
+        self.lotes_totales = 0
+        self.cuotas_vencidas = 0
+        self.prestamos_vencidos = 0
+        self.prestamos_pagados = 0
+        self.prestamos_reactivados = 0
+        self.error = None
+
+    @property
+    def en_curso(self) -> bool:
+        return self.estado == "en_curso"
+
+    def iniciar(self):
+        with self._lock:
+            self._reiniciar()
+            self.estado = "en_curso"
+            self.iniciado = datetime.now()
+
+    def fase_nueva(self, fase: str, lotes: int):
+        with self._lock:
+            self.fase = fase
+            self.lotes_procesados = 0
+            self.lotes_totales = lotes
+
+    def sumar(self, **contadores):
+        with self._lock:
+            self.lotes_procesados += 1
+            for nombre, valor in contadores.items():
+                setattr(self, nombre, getattr(self, nombre) + valor)
+
+    def terminar(self, error: str = None):
+        with self._lock:
+            self.estado = "error" if error else "completado"
+            self.error = error
+            self.finalizado = datetime.now()
+
+    def resumen(self) -> dict:
+        with self._lock:
+            fin = self.finalizado or datetime.now()
+            return {
+                "estado": self.estado,
+                "fase": self.fase,
+                "iniciado": self.iniciado.isoformat() if self.iniciado else None,
+                "finalizado": self.finalizado.isoformat() if self.finalizado else None,
+                "duracion_s": round((fin - self.iniciado).total_seconds(), 3) if self.iniciado else None,
+                "lotes_procesados": self.lotes_procesados,
+                "lotes_totales": self.lotes_totales,
+                "cuotas_vencidas": self.cuotas_vencidas,
+                "prestamos_vencidos": self.prestamos_vencidos,
+                "prestamos_pagados": self.prestamos_pagados,
+                "prestamos_reactivados": self.prestamos_reactivados,
+                "error": self.error,
+            }
+
+progreso = ProgresoBarrido()
+_ejecucion = threading.Lock()
+
+def _rangos(conexion, columna_id, condicion, tamano_lote: int) -> list:
+    """
+    Rangos [desde, hasta) de ids que cubren las filas que cumplen la condición
+    """
+    minimo, maximo = conexion.execute(
+        select(func.min(columna_id), func.max(columna_id)).where(condicion)
+    ).one()
+    if minimo is None:
+        return []
+    return [(desde, desde + tamano_lote) for desde in range(minimo, maximo + 1, tamano_lote)]
+
+def _marcar_cuotas(conexion, desde: int, hasta: int, corte=None) -> dict:
+    """
+    Marca como vencidas las cuotas pendientes del rango, traslada el conteo a
+    los contadores de cada préstamo y pasa a vencido el préstamo activo.
+    Todo en una sola sentencia (CTE con UPDATE ... RETURNING de PostgreSQL).
+    corte es el instante de referencia (por defecto, now() de la transacción).
+    """
+    if corte is None:
+        corte = func.now()
+    marcadas = (
+        update(_pagos)
+        .where(
+            _pagos.c.id >= desde,
+            _pagos.c.id < hasta,
+            _pagos.c.estado == EstadoPago.PENDIENTE,
+            _pagos.c.fecha_vencimiento < corte,
+            _pagos.c.prestamo_id == _prestamos.c.id,
+            _prestamos.c.estado.in_([EstadoPrestamo.ACTIVO, EstadoPrestamo.VENCIDO])
+        )
+        .values(estado=EstadoPago.VENCIDO, version=_pagos.c.version + 1)
+        .returning(_pagos.c.prestamo_id)
+        .cte("marcadas")
+    )
+    conteo = (
+        select(marcadas.c.prestamo_id, func.count().label("cuotas"))
+        .group_by(marcadas.c.prestamo_id)
+        .cte("conteo")
+    )
+
+    # En el FROM, "anterior" conserva la fila previa al UPDATE: permite devolver el estado anterior
+    anterior = _prestamos.alias("anterior")
+    actualizados = (
+        update(_prestamos)
+        .where(_prestamos.c.id == conteo.c.prestamo_id, anterior.c.id == _prestamos.c.id)
+        .values(
+            cuotas_pendientes=_prestamos.c.cuotas_pendientes - conteo.c.cuotas,
+            cuotas_vencidas=_prestamos.c.cuotas_vencidas + conteo.c.cuotas,
+            estado=case(
+                (_prestamos.c.estado == EstadoPrestamo.ACTIVO, literal(EstadoPrestamo.VENCIDO, _prestamos.c.estado.type)),
+                else_=_prestamos.c.estado
+            ),
+            version=_prestamos.c.version + 1
+        )
+        .returning(anterior.c.estado.label("estado_anterior"))
+        .cte("actualizados")
+    )
+
+    cuotas, prestamos = conexion.execute(
+        select(
+            select(func.count()).select_from(marcadas).scalar_subquery(),
+            select(func.count())
+            .select_from(actualizados)
+            .where(actualizados.c.estado_anterior == EstadoPrestamo.ACTIVO)
+            .scalar_subquery()
+        )
+    ).one()
+
+    return {"cuotas_vencidas": cuotas, "prestamos_vencidos": prestamos}
+
+def _actualizar_prestamos(conexion, desde: int, hasta: int) -> dict:
+    """
+    Recalcula el estado de los préstamos del rango según saldo, fechas y
+    contador de cuotas vencidas
+    """
+    en_rango = and_(_prestamos.c.id >= desde, _prestamos.c.id < hasta)
+    abiertos = _prestamos.c.estado.in_([EstadoPrestamo.ACTIVO, EstadoPrestamo.VENCIDO])
+
+    pagados = conexion.execute(
+        update(_prestamos)
+        .where(en_rango, abiertos, _prestamos.c.saldo_pendiente <= 0)
+        .values(estado=EstadoPrestamo.PAGADO, version=_prestamos.c.version + 1)
+    ).rowcount
+
+    vencidos = conexion.execute(
+        update(_prestamos)
+        .where(
+            en_rango,
+            _prestamos.c.estado == EstadoPrestamo.ACTIVO,
+            or_(_prestamos.c.fecha_vencimiento < func.now(), _prestamos.c.cuotas_vencidas > 0)
+        )
+        .values(estado=EstadoPrestamo.VENCIDO, version=_prestamos.c.version + 1)
+    ).rowcount
+
+    # Préstamos vencidos que ya regularizaron sus cuotas y no superaron la fecha final
+    reactivados = conexion.execute(
+        update(_prestamos)
+        .where(
+            en_rango,
+            _prestamos.c.estado == EstadoPrestamo.VENCIDO,
+            _prestamos.c.fecha_vencimiento >= func.now(),
+            _prestamos.c.cuotas_vencidas == 0
+        )
+        .values(estado=EstadoPrestamo.ACTIVO, version=_prestamos.c.version + 1)
+    ).rowcount
+
+    return {
+        "prestamos_pagados": pagados,
+        "prestamos_vencidos": vencidos,
+        "prestamos_reactivados": reactivados,
+    }
+
+def _procesar(fase: str, columna_id, condicion, paso, tamano_lote: int):
+    with engine.connect() as conexion:
+        rangos = _rangos(conexion, columna_id, condicion, tamano_lote)
+
+    progreso.fase_nueva(fase, len(rangos))
+    logger.info("Barrido de vencimientos: %s (%d lotes)", fase, len(rangos))
+
+    for desde, hasta in rangos:
+        # Una transacción por lote
+        with engine.begin() as conexion:
+            contadores = paso(conexion, desde, hasta)
+        progreso.sumar(**contadores)
+
+def _barrer(tamano_lote: int):
+    _procesar(
+        "cuotas",
+        _pagos.c.id,
+        and_(_pagos.c.estado == EstadoPago.PENDIENTE, _pagos.c.fecha_vencimiento < func.now()),
+        _marcar_cuotas,
+        tamano_lote
+    )
+    _procesar(
+        "prestamos",
+        _prestamos.c.id,
+        _prestamos.c.estado.in_([EstadoPrestamo.ACTIVO, EstadoPrestamo.VENCIDO]),
+        _actualizar_prestamos,
+        tamano_lote
+    )
+
+def ejecutar_barrido(tamano_lote: int = TAMANO_LOTE) -> dict:
+    """
+    Ejecuta el barrido completo y devuelve el resumen del progreso.
+    Lanza BarridoEnCurso si ya hay otro barrido en ejecución.
+    """
+    if not _ejecucion.acquire(blocking=False):
+        raise BarridoEnCurso("Ya hay un barrido de vencimientos en curso")
+
+    try:
+        # El advisory lock se mantiene en una conexión propia durante todo el barrido
+        with engine.connect() as bloqueo:
+            postgres = engine.dialect.name == "postgresql"
+            if postgres:
+                obtenido = bloqueo.scalar(text("SELECT pg_try_advisory_lock(:clave)"), {"clave": CLAVE_BLOQUEO})
+                bloqueo.commit()
+                if not obtenido:
+                    raise BarridoEnCurso("Otro proceso está ejecutando el barrido de vencimientos")
+
+            progreso.iniciar()
+            inicio = time.perf_counter()
+            try:
+                _barrer(tamano_lote)
+            except Exception as e:
+                logger.exception("Error en el barrido de vencimientos")
+                progreso.terminar(error=str(e))
+                raise
+            finally:
+                # El barrido cambia estados en toda la cartera
+                cache.invalidar_espacio(cache.PRESTAMO)
+                cache.invalidar_espacio(cache.PRESTAMO_DETALLE)
+                if postgres:
+                    bloqueo.execute(text("SELECT pg_advisory_unlock(:clave)"), {"clave": CLAVE_BLOQUEO})
+                    bloqueo.commit()
+
+            progreso.terminar()
+            logger.info(
+                "Barrido de vencimientos completado en %.1fs: %s",
+                time.perf_counter() - inicio, progreso.resumen()
+            )
+            return progreso.resumen()
+    finally:
+        _ejecucion.release()
+
+def _segundos_hasta(hora: str) -> float:
+    horas, minutos = (int(parte) for parte in hora.split(":"))
+    ahora = datetime.now()
+    proxima = ahora.replace(hour=horas, minute=minutos, second=0, microsecond=0)
+    if proxima <= ahora:
+        proxima += timedelta(days=1)
+    return (proxima - ahora).total_seconds()
+
+async def programar_barrido(hora: str = HORA_BARRIDO):
+    """
+    Tarea en segundo plano que ejecuta el barrido todos los días a la hora indicada:
+    antes crea las particiones futuras de pagos y, después, refresca los
+    resúmenes de los reportes.
+    Cada worker programa su propia ejecución; el advisory lock garantiza que
+    solo una se ejecute a la vez.
+    """
+    while True:
+        await asyncio.sleep(_segundos_hasta(hora))
+        # Particiones de los meses siguientes (pagos particionada por rango)
+        try:
+            await asyncio.to_thread(particiones.crear_particiones_futuras)
+        except Exception:
+            logger.exception("Error al crear las particiones futuras de pagos")
+
+        try:
+            await asyncio.to_thread(ejecutar_barrido)
+        except BarridoEnCurso as e:
+            logger.info("Barrido programado omitido: %s", e)
+            continue
+        except Exception:
+            # El error ya quedó registrado en el progreso; se reintenta al día siguiente
+            continue
+
+        # Con los estados al día, la foto diaria de la cartera para GET /reportes/cartera
+        try:
+            await asyncio.to_thread(reportes.refrescar)
+        except reportes.RefrescoEnCurso as e:
+            logger.info("Refresco de reportes omitido: %s", e)
+        except Exception:
+            logger.exception("Error al refrescar los resúmenes de reportes")
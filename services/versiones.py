@@ -0,0 +1,84 @@
+"""
+ETag a partir de las versiones de fila (columna version de cada modelo)
+
+Cada respuesta de detalle lleva un ETag formado por las versiones de las filas
+que la componen. Comprobar If-None-Match o If-Match solo requiere leer esas
+versiones por clave primaria, sin cargar ni serializar el objeto completo.
+
+Toda escritura en una cuota sube también la versión de su préstamo, así que la
+versión del préstamo cubre el listado de sus cuotas.
+"""
+
+from typing import Optional
+
+from fastapi import Response, status
+from sqlalchemy import select
+
+from models.models import Cliente, Prestamo, Pago
+
+def etag(*versiones) -> str:
+    return '"' + "-".join(str(version) for version in versiones) + '"'
+
+def coincide(cabecera: Optional[str], actual: str) -> bool:
+    """
+    True si la cabecera If-None-Match / If-Match incluye el ETag actual
+    (admite listas separadas por comas, "*" y ETags débiles W/"...")
+    """
+    if not cabecera:
+        return False
+    for valor in cabecera.split(","):
+        valor = valor.strip()
+        if valor == "*" or valor.removeprefix("W/") == actual:
+            return True
+    return False
+
+def no_modificado(cabeceras, actual: str) -> Optional[Response]:
+    """
+    Respuesta 304 si If-None-Match coincide con el ETag actual; None si hay que
+    devolver el recurso
+    """
+    if coincide(cabeceras.get("if-none-match"), actual):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": actual})
+    return None
+
+def precondicion_fallida(cabeceras, actual: str) -> bool:
+    """
+    True si la petición trae If-Match y no coincide con el ETag actual (412)
+    """
+    if_match = cabeceras.get("if-match")
+    return bool(if_match) and not coincide(if_match, actual)
+
+# Consultas de versiones (una fila o ninguna si el recurso no existe)
+
+def consulta_cliente(cliente_id: int):
+    return select(Cliente.version).where(Cliente.id == cliente_id)
+
+def consulta_prestamo(prestamo_id: int):
+    """
+    Versiones del préstamo y de su cliente, incluido en la respuesta
+    """
+    return (
+        select(Prestamo.version, Cliente.version)
+        .join(Cliente, Cliente.id == Prestamo.cliente_id)
+        .where(Prestamo.id == prestamo_id)
+    )
+
+def consulta_pago(pago_id: int):
+    return select(Pago.version).where(Pago.id == pago_id)
+
+def consulta_cuotas(prestamo_id: int):
+    """
+    Versión del listado de cuotas de un préstamo
+    """
+    return select(Prestamo.version).where(Prestamo.id == prestamo_id)
+
+# ETag de objetos ya cargados (mismo formato que las consultas)
+
+def etag_cliente(cliente: Cliente) -> str:
+    return etag(cliente.version)
+
+def etag_prestamo(prestamo: Prestamo) -> str:
+    return etag(prestamo.version, prestamo.cliente.version)
+
+def etag_pago(pago: Pago) -> str:
+    return etag(pago.version)
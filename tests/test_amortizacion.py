@@ -0,0 +1,79 @@
+"""
+Motor de amortización vectorizado frente al cálculo de un solo préstamo
+"""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from services import amortizacion
+from services.prestamo_service import PrestamoService
+
+CASOS = [
+    (10000, 12.5, 12),
+    (5000, 18, 24),
+    (1500, 0.5, 1),
+    (250000, 9.75, 360),
+    (800, 36, 6),
+]
+
+def test_cuotas_coinciden_con_calcular_cuota_mensual():
+    montos, tasas, plazos = zip(*CASOS)
+    cotizaciones = amortizacion.cotizaciones(montos, tasas, plazos)
+
+    for cotizacion, (monto, tasa, plazo) in zip(cotizaciones, CASOS):
+        esperado = PrestamoService.calcular_cuota_mensual(monto, tasa, plazo)
+        assert cotizacion["cuota_mensual"] == pytest.approx(esperado.cuota_mensual, abs=0.01)
+        assert cotizacion["total_a_pagar"] == pytest.approx(esperado.total_a_pagar, abs=0.01)
+        assert cotizacion["total_intereses"] == pytest.approx(esperado.total_intereses, abs=0.01)
+
+def test_tasa_cero():
+    calculo = amortizacion.calcular_cuotas([1200], [0], [12])
+    assert calculo["cuota_mensual"][0] == pytest.approx(100)
+    assert calculo["total_intereses"][0] == pytest.approx(0)
+
+def test_cronograma_amortiza_el_monto():
+    montos, tasas, plazos = zip(*CASOS)
+    calculo = amortizacion.calcular_cronogramas(montos, tasas, plazos)
+
+    for i, (monto, tasa, plazo) in enumerate(CASOS):
+        assert calculo["validos"][i].sum() == plazo
+        assert calculo["capital"][i].sum() == pytest.approx(monto, rel=1e-9)
+        assert calculo["saldo"][i][plazo - 1] == pytest.approx(0, abs=1e-6)
+        # Los períodos posteriores al plazo quedan a cero
+        assert not calculo["interes"][i][plazo:].any()
+
+        # Primer período: interés sobre el monto completo
+        assert calculo["interes"][i][0] == pytest.approx(monto * tasa / 100 / 12)
+
+def test_cronograma_en_cotizaciones():
+    cotizacion, = amortizacion.cotizaciones([10000], [12.5], [12], incluir_cronograma=True)
+    cronograma = cotizacion["cronograma"]
+    assert [cuota["numero_cuota"] for cuota in cronograma] == list(range(1, 13))
+    assert sum(cuota["capital"] for cuota in cronograma) == pytest.approx(10000, abs=0.05)
+    assert cronograma[-1]["saldo"] == 0
+
+@pytest.mark.parametrize("montos, tasas, plazos, mensaje", [
+    ([1000, 2000], [12], [12], "misma longitud"),
+    ([0], [12], [12], "monto debe ser mayor"),
+    ([1000], [-1], [12], "no puede ser negativa"),
+    ([1000], [12], [0], "plazo debe ser mayor"),
+    ([1000], [12], [amortizacion.MAX_PLAZO_MESES + 1], "no puede superar"),
+    ([float("inf")], [12], [12], "finitos"),
+    ([1000], [float("nan")], [12], "finitos"),
+    ([1] * 1000, [1] * 1000, [600] * 1000, "suma de los plazos"),
+])
+def test_validacion(montos, tasas, plazos, mensaje):
+    with pytest.raises(ValueError, match=mensaje):
+        amortizacion.calcular_cuotas(montos, tasas, plazos)
+
+def test_desbordamiento_indica_los_indices():
+    with pytest.raises(ValueError, match=r"índices: 1\)"):
+        amortizacion.calcular_cuotas([1000, 1000], [12, 1e6], [12, 600])
+
+def test_celdas_del_cronograma():
+    plazos = [600] + [1] * 9999
+    # Sin cronograma solo se calculan vectores
+    assert len(amortizacion.calcular_cuotas([1000] * 10000, [12] * 10000, plazos)["cuota_mensual"]) == 10000
+    with pytest.raises(ValueError, match="plazo máximo"):
+        amortizacion.calcular_cronogramas([1000] * 10000, [12] * 10000, plazos)
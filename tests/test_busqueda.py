@@ -0,0 +1,66 @@
+"""
+Términos y consultas de la búsqueda de clientes (sin base de datos)
+"""
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from services import busqueda
+
+def _sql(consulta) -> str:
+    return str(consulta.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+def test_terminos_del_mas_largo_al_mas_corto():
+    assert busqueda.terminos("Ana  GARCIA lopez") == ["garcia", "lopez", "ana"]
+
+def test_terminos_descarta_cortos_y_repetidos():
+    assert busqueda.terminos("de la garcia Garcia y") == ["garcia"]
+    assert busqueda.terminos("a bc") == []
+
+def test_terminos_como_mucho_max_terminos():
+    palabras = busqueda.terminos("uno dos tres cuatro cinco seis")
+    assert len(palabras) == busqueda.MAX_TERMINOS
+    assert palabras[:2] == ["cuatro", "cinco"]
+
+def test_consultas_documento_antes_que_trigramas():
+    consultas = busqueda.consultas("12345678")
+    assert len(consultas) == 2
+    assert 'COLLATE "C"' in _sql(consultas[0])
+    assert "<->>" in _sql(consultas[1])
+
+def test_consultas_solo_trigramas_sin_digitos():
+    consultas = busqueda.consultas("maria gomez")
+    assert len(consultas) == 1
+    assert 'COLLATE "C"' not in _sql(consultas[0])
+
+def test_consultas_documento_corto_sin_trigramas():
+    # "12" no llega a MIN_CARACTERES, pero es un número de documento válido
+    consultas = busqueda.consultas("12")
+    assert len(consultas) == 1
+    assert 'COLLATE "C"' in _sql(consultas[0])
+
+def test_consultas_email_no_es_documento():
+    consultas = busqueda.consultas("ana1@example.com")
+    assert len(consultas) == 1
+    assert 'COLLATE "C"' not in _sql(consultas[0])
+
+def test_trigramas_candidatos_por_distancia_al_termino_principal(monkeypatch):
+    monkeypatch.setattr(busqueda, "MAX_CANDIDATOS", 50)
+    sql = _sql(busqueda.consulta_trigramas(["garcia", "ana"], True, 20))
+    # Un recorrido KNN (subcadena y aproximado) por columna, solo con el término más largo
+    for columna in ("nombre", "apellido", "email", "documento_identidad"):
+        assert sql.count(f"ORDER BY clientes.{columna} <->> 'garcia'") == 2
+    assert "<->> 'ana'" not in sql
+    assert sql.count("LIMIT 50") == 8
+    assert sql.rstrip().endswith("LIMIT 20")
+
+def test_subcadena_escapa_comodines():
+    assert busqueda._patron_subcadena("50%_a/b") == "%50/%/_a//b%"
+
+def test_trigramas_sin_filtro_de_activo():
+    assert "activo =" not in _sql(busqueda.consulta_trigramas(["garcia"], None, 20))
+
+@pytest.mark.parametrize("q, limite", [("ab", 20), ("   ", 20), ("garcia", 0), ("garcia", busqueda.LIMITE_MAXIMO + 1)])
+def test_consultas_invalidas(q, limite):
+    with pytest.raises(ValueError):
+        busqueda.consultas(q, limite=limite)
@@ -0,0 +1,145 @@
+"""
+Caché de lectura con el backend Redis sobre un servidor simulado (fakeredis)
+"""
+
+import threading
+import time
+
+import pytest
+
+from services import cache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+@pytest.fixture
+def redis(monkeypatch):
+    """
+    Backend CacheRedis sobre fakeredis; devuelve el cliente para inspeccionar las claves
+    """
+    servidor = fakeredis.FakeRedis()
+    monkeypatch.setattr(cache, "estadisticas", cache.Estadisticas())
+    anterior, ttl = cache.backend, cache.TTL
+    cache.configurar(cache.CacheRedis(cliente=servidor), ttl=30)
+    yield servidor
+    cache.configurar(anterior, ttl)
+
+class Cargador:
+    """
+    Función cargar() que cuenta sus llamadas y devuelve {"etag": ..., "datos": ...}
+    """
+
+    def __init__(self, etag: str = "v1", esperar: threading.Event = None):
+        self.etag = etag
+        self.esperar = esperar
+        self.llamadas = 0
+        self.iniciada = threading.Event()
+
+    def __call__(self):
+        self.llamadas += 1
+        self.iniciada.set()
+        if self.esperar is not None:
+            assert self.esperar.wait(5)
+        return {"etag": self.etag, "datos": {"id": 1, "llamada": self.llamadas}}
+
+def test_guarda_en_redis_y_acierta(redis):
+    clave = cache.clave_de(cache.CLIENTE, 1)
+    cargar = Cargador()
+
+    assert cache.obtener_o_cargar(clave, cargar)["datos"]["llamada"] == 1
+    assert redis.exists("microcreditos:" + clave)
+    assert cache.obtener_o_cargar(clave, cargar)["datos"]["llamada"] == 1
+    assert cargar.llamadas == 1
+    assert cache.estadisticas.resumen()[cache.CLIENTE]["aciertos"] == 1
+
+def test_single_flight(redis):
+    clave = cache.clave_de(cache.PRESTAMO, 1)
+    liberar = threading.Event()
+    cargar = Cargador(esperar=liberar)
+    resultados = []
+
+    def leer():
+        resultados.append(cache.obtener_o_cargar(clave, cargar))
+
+    hilos = [threading.Thread(target=leer) for _ in range(8)]
+    hilos[0].start()
+    assert cargar.iniciada.wait(5)
+    for hilo in hilos[1:]:
+        hilo.start()
+
+    # Los demás hilos esperan a la carga en curso en lugar de cargar por su cuenta
+    limite = time.monotonic() + 5
+    while cache.estadisticas.resumen()[cache.PRESTAMO]["compartidas"] < len(hilos) - 1:
+        assert time.monotonic() < limite
+        time.sleep(0.01)
+    liberar.set()
+    for hilo in hilos:
+        hilo.join(5)
+
+    assert cargar.llamadas == 1
+    assert len(resultados) == len(hilos)
+    assert all(resultado == resultados[0] for resultado in resultados)
+
+def test_single_flight_propaga_errores(redis):
+    clave = cache.clave_de(cache.PRESTAMO, 2)
+
+    def cargar():
+        raise LookupError("no existe")
+
+    with pytest.raises(LookupError):
+        cache.obtener_o_cargar(clave, cargar)
+    assert not redis.exists("microcreditos:" + clave)
+
+def test_expira_con_el_ttl(redis):
+    cache.configurar(cache.backend, ttl=0.05)
+    clave = cache.clave_de(cache.CLIENTE, 2)
+    cargar = Cargador()
+
+    cache.obtener_o_cargar(clave, cargar)
+    assert 0 < redis.pttl("microcreditos:" + clave) <= 50
+    cache.obtener_o_cargar(clave, cargar)
+    assert cargar.llamadas == 1
+
+    time.sleep(0.1)
+    assert cache.obtener_o_cargar(clave, cargar)["datos"]["llamada"] == 2
+
+def test_etag_distinto_recarga(redis):
+    clave = cache.clave_de(cache.PRESTAMO_DETALLE, 1)
+    cache.obtener_vigente(clave, "v1", Cargador("v1"))
+
+    # Otro worker escribió sin invalidar esta clave: la versión actual es v2
+    cargar = Cargador("v2")
+    valor = cache.obtener_vigente(clave, "v2", cargar)
+    assert valor["etag"] == "v2"
+    assert cargar.llamadas == 1
+    assert cache.obtener_vigente(clave, "v2", cargar)["etag"] == "v2"
+    assert cargar.llamadas == 1
+
+def test_invalidar_cliente_y_prestamos(redis):
+    for clave in (cache.clave_de(cache.CLIENTE, 3), cache.clave_de(cache.PRESTAMO, 3),
+                  cache.clave_de(cache.PRESTAMO_DETALLE, 3), cache.clave_de(cache.PRESTAMO, 4)):
+        cache.obtener_o_cargar(clave, Cargador())
+
+    cache.invalidar_cliente(3, [3])
+    assert sorted(redis.keys()) == [b"microcreditos:prestamo:4"]
+
+def test_invalidar_espacio(redis):
+    for identificador in range(5):
+        cache.obtener_o_cargar(cache.clave_de(cache.PRESTAMO, identificador), Cargador())
+    cache.obtener_o_cargar(cache.clave_de(cache.CLIENTE, 1), Cargador())
+
+    cache.invalidar_espacio(cache.PRESTAMO)
+    assert redis.keys() == [b"microcreditos:cliente:1"]
+
+def test_invalidar_durante_la_carga_no_guarda(redis):
+    clave = cache.clave_de(cache.CLIENTE, 4)
+    liberar = threading.Event()
+    cargar = Cargador(esperar=liberar)
+    hilo = threading.Thread(target=cache.obtener_o_cargar, args=(clave, cargar))
+    hilo.start()
+    assert cargar.iniciada.wait(5)
+
+    # La escritura termina mientras se carga el valor anterior
+    cache.invalidar(clave)
+    liberar.set()
+    hilo.join(5)
+    assert not redis.exists("microcreditos:" + clave)
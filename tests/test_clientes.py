@@ -0,0 +1,40 @@
+"""
+Número de consultas SQL de los listados y detalles de clientes
+
+El número de consultas no debe crecer con el número de filas devueltas (N+1).
+"""
+
+from tests.conftest import crear_cliente
+
+def test_listar_clientes_una_consulta(client, cliente_con_prestamos, presupuesto_consultas):
+    for _ in range(3):
+        crear_cliente(client)
+
+    with presupuesto_consultas(1):
+        response = client.get("/clientes/", params={"limit": 50})
+    assert response.status_code == 200
+    assert len(response.json()) >= 4
+
+def test_detalle_cliente(client, cliente_con_prestamos, presupuesto_consultas):
+    cliente, _ = cliente_con_prestamos
+
+    # Versión de la fila para el ETag y carga del cliente
+    with presupuesto_consultas(2):
+        response = client.get(f"/clientes/{cliente['id']}")
+    assert response.status_code == 200
+    assert response.json()["id"] == cliente["id"]
+
+    # Desde la caché: solo la consulta de la versión
+    with presupuesto_consultas(1):
+        response = client.get(f"/clientes/{cliente['id']}")
+    assert response.status_code == 200
+
+def test_cliente_con_prestamos_dos_consultas(client, cliente_con_prestamos, presupuesto_consultas):
+    cliente, prestamos = cliente_con_prestamos
+
+    with presupuesto_consultas(2):
+        response = client.get(f"/clientes/{cliente['id']}/prestamos")
+    assert response.status_code == 200
+    datos = response.json()
+    assert [prestamo["id"] for prestamo in datos["prestamos"]] == [prestamo["id"] for prestamo in prestamos]
+    assert all(prestamo["cliente"]["id"] == cliente["id"] for prestamo in datos["prestamos"])
@@ -0,0 +1,62 @@
+"""
+Lectura y validación de archivos de pagos (sin base de datos)
+"""
+
+import io
+
+import pytest
+
+from services import importacion
+
+def _leer(contenido: str, formato: str):
+    return importacion.leer_pagos(io.BytesIO(contenido.encode("utf-8")), formato)
+
+def test_fila_valida():
+    fila = importacion._validar(2, {"prestamo_id": "7", "numero_cuota": "3", "monto": "150.5"})
+    assert fila == {"linea": 2, "prestamo_id": 7, "numero_cuota": 3, "monto": 150.5}
+
+def test_fecha_pago_opcional():
+    fila = importacion._validar(2, {
+        "prestamo_id": 1, "numero_cuota": 1, "monto": 10, "fecha_pago": "2024-03-01T10:30:00",
+    })
+    assert fila["fecha_pago"].isoformat() == "2024-03-01T10:30:00"
+
+@pytest.mark.parametrize("monto", ["inf", "-inf", "nan", "1e309", float("inf"), float("nan")])
+def test_monto_no_finito(monto):
+    fila = importacion._validar(2, {"prestamo_id": 1, "numero_cuota": 1, "monto": monto})
+    assert fila["error"] == "El monto debe ser un número finito"
+    assert "monto" not in fila
+
+@pytest.mark.parametrize("datos, error", [
+    ({"prestamo_id": 1, "numero_cuota": 1}, "Falta el campo monto"),
+    ({"prestamo_id": "x", "numero_cuota": 1, "monto": 10}, "prestamo_id, numero_cuota y monto deben ser numéricos"),
+    ({"prestamo_id": float("inf"), "numero_cuota": 1, "monto": 10}, "prestamo_id, numero_cuota y monto deben ser numéricos"),
+    ({"prestamo_id": 1, "numero_cuota": 1, "monto": 0}, "El monto debe ser mayor a 0"),
+    ({"prestamo_id": 1, "numero_cuota": 1, "monto": 10, "fecha_pago": "ayer"}, "fecha_pago debe tener formato ISO 8601"),
+    ([1, 1, 10], "La fila debe ser un objeto con prestamo_id, numero_cuota y monto"),
+])
+def test_fila_invalida(datos, error):
+    fila = importacion._validar(5, datos)
+    assert fila["linea"] == 5
+    assert fila["error"] == error
+
+def test_csv_numera_lineas_del_archivo():
+    filas = _leer("prestamo_id,numero_cuota,monto\n1,1,100\n1,2,inf\n", "csv")
+    assert filas[0] == {"linea": 2, "prestamo_id": 1, "numero_cuota": 1, "monto": 100.0}
+    assert filas[1]["linea"] == 3 and "error" in filas[1]
+
+def test_csv_mal_formado_es_value_error():
+    with pytest.raises(ValueError, match="CSV mal formado"):
+        # Un campo mayor que csv.field_size_limit() hace fallar al lector
+        _leer("prestamo_id,numero_cuota,monto\n1,1,\"" + "9" * 200000 + "\"\n", "csv")
+
+def test_ndjson_json_invalido_no_detiene_la_lectura():
+    filas = _leer('{"prestamo_id": 1, "numero_cuota": 1, "monto": 5}\n{roto\n\n{"prestamo_id": 1, "numero_cuota": 2, "monto": NaN}\n', "ndjson")
+    assert [f["linea"] for f in filas] == [1, 2, 4]
+    assert filas[1]["error"] == "JSON inválido"
+    assert filas[2]["error"] == "El monto debe ser un número finito"
+
+def test_archivo_demasiado_grande(monkeypatch):
+    monkeypatch.setattr(importacion, "MAX_FILAS_ARCHIVO", 2)
+    with pytest.raises(importacion.ArchivoDemasiadoGrande):
+        _leer("prestamo_id,numero_cuota,monto\n1,1,1\n1,2,1\n1,3,1\n", "csv")
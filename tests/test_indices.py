@@ -0,0 +1,154 @@
+"""
+Índices de las consultas frecuentes
+
+Ejecuta EXPLAIN sobre cada consulta frecuente y comprueba que el plan use el
+índice esperado (por ejemplo, tras cambiar un filtro o eliminar un índice en
+una migración). Con tablas pequeñas PostgreSQL prefiere los recorridos
+secuenciales, por eso se desactivan (enable_seqscan = off) para comprobar que
+el índice es utilizable.
+"""
+
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, text
+
+from models.models import Pago, Prestamo, EstadoPago, EstadoPrestamo
+from services import busqueda, particiones, reportes
+
+# (descripción, consulta, índice esperado o tupla de índices aceptables)
+CONSULTAS = [
+    (
+        "registrar_pago: cuota por préstamo y número",
+        select(Pago).where(Pago.prestamo_id == 1, Pago.numero_cuota == 1, particiones.ventana_prestamo(1)),
+        "ux_pagos_prestamo_cuota",
+    ),
+    (
+        "cuotas de un préstamo por estado",
+        select(Pago.id).where(Pago.prestamo_id == 1, Pago.estado == EstadoPago.VENCIDO, particiones.ventana_prestamo(1)),
+        "ix_pagos_prestamo_estado",
+    ),
+    (
+        "cuotas pendientes vencidas (barrido de vencimientos)",
+        select(Pago.id).where(Pago.estado == EstadoPago.PENDIENTE, Pago.fecha_vencimiento < func.now()),
+        "ix_pagos_pendientes_vencimiento",
+    ),
+    (
+        # min/max se resuelven igual de bien recorriendo el índice de id desde
+        # cada extremo hasta la primera cuota pendiente vencida
+        "rango de ids del barrido de vencimientos",
+        select(func.min(Pago.id), func.max(Pago.id)).where(
+            Pago.estado == EstadoPago.PENDIENTE,
+            Pago.fecha_vencimiento < func.now()
+        ),
+        ("ix_pagos_pendientes_vencimiento", "ix_pagos_id", "pagos_pkey"),
+    ),
+    (
+        "listado de préstamos por cliente y estado",
+        select(Prestamo).where(Prestamo.cliente_id == 1, Prestamo.estado == EstadoPrestamo.ACTIVO),
+        "ix_prestamos_cliente_estado",
+    ),
+    (
+        "préstamos activos con la fecha final superada",
+        select(Prestamo.id).where(
+            Prestamo.estado == EstadoPrestamo.ACTIVO,
+            Prestamo.fecha_vencimiento < func.now()
+        ),
+        "ix_prestamos_estado_vencimiento",
+    ),
+    (
+        "búsqueda de clientes por prefijo de documento",
+        busqueda.consulta_documento("1234", True, 20),
+        "ix_clientes_documento_prefijo",
+    ),
+    (
+        "búsqueda de clientes por trigramas (nombre, apellido, email, documento)",
+        busqueda.consulta_trigramas(["garcia"], True, 20),
+        "ix_clientes_apellido_trgm",
+    ),
+    (
+        "cobranza de un rango de días de vencimiento (refresco de reportes)",
+        reportes.consulta_cobranza(date(2025, 1, 1), date(2025, 1, 7)),
+        "ix_pagos_vencimiento",
+    ),
+    (
+        "cuotas escritas desde el último refresco de reportes",
+        reportes.consulta_dias_actualizados(datetime.now() - timedelta(hours=1), date.today()),
+        "ix_pagos_actualizado",
+    ),
+]
+
+def indices_del_plan(nodo: dict) -> set:
+    """
+    Nombres de los índices usados en un nodo del plan y sus hijos
+    """
+    indices = {nodo["Index Name"]} if "Index Name" in nodo else set()
+    for hijo in nodo.get("Plans", []):
+        indices |= indices_del_plan(hijo)
+    return indices
+
+# Préstamos de ejemplo con sus cuotas, una de cada 20 pendiente, para que las
+# estadísticas se parezcan a las de producción (con las tablas casi vacías el
+# planificador elige entre índices casi al azar)
+PRESTAMOS_EJEMPLO = 1000
+CUOTAS_POR_PRESTAMO = 20
+
+def _poblar(conexion):
+    cliente_id = conexion.scalar(text("""
+        INSERT INTO clientes (nombre, apellido, email, telefono, direccion, documento_identidad, activo)
+        VALUES ('Indices', 'Prueba', 'indices-' || gen_random_uuid() || '@example.com', '1', '-',
+                left(gen_random_uuid()::text, 20), true)
+        RETURNING id
+    """))
+    conexion.execute(text("""
+        WITH prestamos_nuevos AS (
+            INSERT INTO prestamos (cliente_id, monto, tasa_interes, plazo_meses, fecha_inicio, fecha_vencimiento,
+                                   estado, saldo_pendiente, cuota_mensual)
+            SELECT :cliente_id, 1000, 12, :cuotas, now() - interval '2 years', now() + interval '1 year',
+                   'ACTIVO', 1000, 50
+            FROM generate_series(1, :prestamos)
+            RETURNING id
+        )
+        INSERT INTO pagos (prestamo_id, monto, fecha_pago, fecha_vencimiento, estado, numero_cuota, actualizado)
+        SELECT p.id, 50,
+               CASE WHEN (p.id + n) % 20 = 0 THEN NULL ELSE now() - ((p.id * n) % 700) * interval '1 day' END,
+               now() - ((p.id * n) % 700) * interval '1 day',
+               CASE WHEN (p.id + n) % 20 = 0 THEN 'PENDIENTE' ELSE 'REALIZADO' END::estadopago, n,
+               now() - ((p.id * n) % 700) * interval '1 day'
+        FROM prestamos_nuevos AS p, generate_series(1, :cuotas) AS n
+    """), {"cliente_id": cliente_id, "prestamos": PRESTAMOS_EJEMPLO, "cuotas": CUOTAS_POR_PRESTAMO})
+    conexion.execute(text("ANALYZE clientes, prestamos, pagos"))
+
+@pytest.fixture(scope="module")
+def conexion(app):
+    """
+    Conexión a la base de datos de pruebas con datos de ejemplo (se deshacen al
+    terminar) y los recorridos secuenciales desactivados
+    """
+    from config.database import engine
+
+    with engine.connect() as conexion:
+        _poblar(conexion)
+        conexion.execute(text("SET enable_seqscan = off"))
+        yield conexion
+        conexion.rollback()
+
+@pytest.mark.parametrize("descripcion, consulta, esperado", CONSULTAS, ids=[caso[0] for caso in CONSULTAS])
+def test_consulta_usa_su_indice(conexion, descripcion, consulta, esperado):
+    aceptables = {esperado} if isinstance(esperado, str) else set(esperado)
+    if any(indice.endswith("_trgm") for indice in aceptables) and not conexion.scalar(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")):
+        pytest.skip("pg_trgm no está instalada en esta base de datos")
+
+    # El SQL compilado ya escapa los % para el driver: se ejecuta tal cual
+    sql = str(consulta.compile(conexion.engine, compile_kwargs={"literal_binds": True}))
+    plan = conexion.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    usados = {
+        # En una tabla particionada el plan nombra el índice de cada partición
+        conexion.scalar(text("SELECT coalesce(pg_partition_root(to_regclass(:indice))::text, :indice)"), {"indice": indice})
+        for indice in indices_del_plan(plan[0]["Plan"])
+    }
+
+    assert aceptables & usados, f"{descripcion}: el plan usa {sorted(usados) or 'recorrido secuencial'}"
@@ -0,0 +1,64 @@
+"""
+Registro de pagos de cuota: códigos de respuesta de POST /pagos/
+"""
+
+from datetime import datetime
+
+def _pago(prestamo_id: int, numero_cuota: int, monto: float = 100) -> dict:
+    return {
+        "prestamo_id": prestamo_id, "monto": monto,
+        "fecha_vencimiento": datetime.now().isoformat(), "numero_cuota": numero_cuota,
+    }
+
+def test_registrar_pago(client, cliente_con_prestamos, presupuesto_consultas):
+    _, prestamos = cliente_con_prestamos
+    prestamo = prestamos[0]
+
+    # Cuota y préstamo se actualizan en una sola sentencia
+    with presupuesto_consultas(1):
+        response = client.post("/pagos/", json=_pago(prestamo["id"], 1, prestamo["cuota_mensual"]))
+    assert response.status_code == 201, response.text
+    assert response.json()["estado"] == "realizado"
+
+    response = client.post("/pagos/", json=_pago(prestamo["id"], 1, prestamo["cuota_mensual"]))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Esta cuota ya fue pagada"
+
+def test_registrar_pago_no_encontrado(client, cliente_con_prestamos):
+    _, prestamos = cliente_con_prestamos
+
+    response = client.post("/pagos/", json=_pago(2_000_000_000, 1))
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Préstamo no encontrado"
+
+    response = client.post("/pagos/", json=_pago(prestamos[0]["id"], 99))
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Cuota no encontrada"
+
+def test_registrar_pago_prestamo_cerrado(client, cliente_con_prestamos):
+    _, prestamos = cliente_con_prestamos
+    prestamo_id = prestamos[1]["id"]
+
+    response = client.put(f"/prestamos/{prestamo_id}", json={"estado": "cancelado"})
+    assert response.status_code == 200, response.text
+
+    response = client.post("/pagos/", json=_pago(prestamo_id, 1))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "No se pueden registrar pagos en un préstamo pagado o cancelado"
+
+def test_obtener_pago_no_modificado(client, cliente_con_prestamos, presupuesto_consultas):
+    _, prestamos = cliente_con_prestamos
+    pago = client.post("/pagos/", json=_pago(prestamos[0]["id"], 2, prestamos[0]["cuota_mensual"])).json()
+
+    response = client.get(f"/pagos/{pago['id']}")
+    assert response.status_code == 200, response.text
+    etag = response.headers["ETag"]
+
+    # Con el ETag vigente solo se lee la versión, sin cargar la fila
+    with presupuesto_consultas(1):
+        response = client.get(f"/pagos/{pago['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    response = client.get("/pagos/2000000000")
+    assert response.status_code == 404
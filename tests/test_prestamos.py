@@ -0,0 +1,40 @@
+"""
+Número de consultas SQL de los listados y detalles de préstamos
+
+El cliente embebido y los pagos se cargan con un número fijo de consultas,
+sin cargas perezosas por fila (N+1).
+"""
+
+def test_listar_prestamos_una_consulta(client, cliente_con_prestamos, presupuesto_consultas):
+    cliente, prestamos = cliente_con_prestamos
+
+    with presupuesto_consultas(1):
+        response = client.get("/prestamos/", params={"cliente_id": cliente["id"]})
+    assert response.status_code == 200
+    datos = response.json()
+    assert len(datos) == len(prestamos)
+    assert all(prestamo["cliente"]["id"] == cliente["id"] for prestamo in datos)
+
+def test_detalle_prestamo(client, cliente_con_prestamos, presupuesto_consultas):
+    _, prestamos = cliente_con_prestamos
+    prestamo_id = prestamos[0]["id"]
+
+    # Versión para el ETag y préstamo con su cliente (JOIN)
+    with presupuesto_consultas(2):
+        response = client.get(f"/prestamos/{prestamo_id}")
+    assert response.status_code == 200
+    assert response.json()["cliente"]["id"] == prestamos[0]["cliente_id"]
+
+def test_detalle_prestamo_con_pagos(client, cliente_con_prestamos, presupuesto_consultas):
+    _, prestamos = cliente_con_prestamos
+    prestamo_id = prestamos[0]["id"]
+
+    # Versión, préstamo con su cliente y los pagos en una sola consulta adicional
+    with presupuesto_consultas(3):
+        response = client.get(f"/prestamos/{prestamo_id}/detalle")
+    assert response.status_code == 200
+    assert len(response.json()["pagos"]) == 6
+
+    with presupuesto_consultas(1):
+        response = client.get(f"/prestamos/{prestamo_id}/detalle")
+    assert response.status_code == 200
@@ -0,0 +1,55 @@
+"""
+Refresco incremental de los resúmenes de cobranza
+"""
+
+from sqlalchemy import select, text
+
+from models.models import CobranzaDiaria
+
+# Días que se retrasa el préstamo de prueba: todas sus cuotas quedan vencidas
+DIAS_ATRASO = 400
+
+def _cobranza_del_dia(dia) -> CobranzaDiaria:
+    from config.database import SessionLocal
+
+    with SessionLocal() as db:
+        return db.scalars(select(CobranzaDiaria).where(CobranzaDiaria.fecha_vencimiento == dia)).one()
+
+def test_refresco_incremental_incluye_pagos_con_fecha_anterior(client, cliente_con_prestamos):
+    from config.database import engine
+
+    _, prestamos = cliente_con_prestamos
+    prestamo_id = prestamos[0]["id"]
+    with engine.begin() as conexion:
+        conexion.execute(text("""
+            UPDATE prestamos SET fecha_inicio = fecha_inicio - make_interval(days => :dias),
+                                 fecha_vencimiento = fecha_vencimiento - make_interval(days => :dias)
+            WHERE id = :prestamo_id
+        """), {"dias": DIAS_ATRASO, "prestamo_id": prestamo_id})
+        conexion.execute(text("""
+            UPDATE pagos SET fecha_vencimiento = fecha_vencimiento - make_interval(days => :dias)
+            WHERE prestamo_id = :prestamo_id
+        """), {"dias": DIAS_ATRASO, "prestamo_id": prestamo_id})
+        # El día de vencimiento en la zona horaria de la sesión, como en el resumen
+        vencimiento, dia = conexion.execute(text(
+            "SELECT fecha_vencimiento, fecha_vencimiento::date FROM pagos "
+            "WHERE prestamo_id = :prestamo_id AND numero_cuota = 1"
+        ), {"prestamo_id": prestamo_id}).one()
+
+    response = client.post("/reportes/cartera/refresco", params={"completo": True})
+    assert response.status_code == 200, response.text
+    antes = _cobranza_del_dia(dia)
+
+    # Pago conciliado hoy con la fecha de pago real, más de un año anterior al refresco
+    archivo = f"prestamo_id,numero_cuota,monto,fecha_pago\n{prestamo_id},1,{prestamos[0]['cuota_mensual']},{vencimiento.isoformat()}\n"
+    response = client.post("/pagos/bulk", params={"formato": "csv"}, files={"archivo": ("pagos.csv", archivo)})
+    assert response.status_code == 200, response.text
+    assert response.json()["aplicados"] == 1
+
+    response = client.post("/reportes/cartera/refresco")
+    assert response.status_code == 200, response.text
+    assert response.json()["completo"] is False
+
+    despues = _cobranza_del_dia(dia)
+    assert despues.cuotas_cobradas == antes.cuotas_cobradas + 1
+    assert despues.monto_cobrado_a_tiempo > antes.monto_cobrado_a_tiempo